@@ -0,0 +1,19 @@
+from django.contrib import admin
+
+from .models import Category, Product
+
+
+@admin.register(Category)
+class CategoryAdmin(admin.ModelAdmin):
+    list_display = ('name', 'slug')
+    prepopulated_fields = {'slug': ('name',)}
+
+
+@admin.register(Product)
+class ProductAdmin(admin.ModelAdmin):
+    list_display = ('name', 'category_name', 'price', 'is_active')
+    list_filter = ('is_active',)
+    search_fields = ('^slug',)
+    prepopulated_fields = {'slug': ('name',)}
+    raw_id_fields = ('category',)
+    show_full_result_count = False
@@ -0,0 +1,55 @@
+"""
+Cache for catalog listing responses.
+
+Listings are cached in the 'catalog' namespace of the two-tier cache (see
+online_shop/cache.py), so each worker also keeps the hot pages in memory. A
+product or category write invalidates the namespace (see signals.py), and so
+does a SKU selling out or coming back into stock (apps/orders/inventory.py):
+all older pages become unreachable at once and expire on their own; no write
+ever has to find and delete the pages it affects.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+
+NAMESPACE = 'catalog'
+
+
+def bump_listing_version():
+    cache.invalidate(NAMESPACE)
+
+
+def listing_cache_key(request):
+    query = sorted(request.GET.lists())
+    # Pagination links are absolute, so the host is part of the page.
+    raw = f'{request.get_host()}{request.path}?{query}'
+    return f'{NAMESPACE}:listing:{hashlib.md5(raw.encode()).hexdigest()}'
+
+
+def cached_json_response(request, render):
+    """
+    Returns the cached JSON body for this request, rendering and storing it
+    with `render()` on a miss. `render` returns the body, or None for a
+    response that must not be cached. Concurrent misses in a worker render
+    once. Answers a matching If-None-Match with 304.
+    """
+    def render_entry():
+        body = render()
+        if body is None:
+            return None
+        return body, '"%s"' % hashlib.md5(body).hexdigest()
+
+    cached = cache.get_or_set(listing_cache_key(request), render_entry, settings.CATALOG_CACHE_TIMEOUT)
+    if cached is None:
+        return None
+
+    body, etag = cached
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = HttpResponse(body, content_type='application/json')
+    response.headers['ETag'] = etag
+    patch_cache_control(response, public=True, no_cache=True)
+    return response
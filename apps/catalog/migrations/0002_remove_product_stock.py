@@ -0,0 +1,17 @@
+# Generated by Django 5.1 on 2026-10-18 05:44
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("catalog", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name="product",
+            name="stock",
+        ),
+    ]
@@ -0,0 +1,61 @@
+from django.db import models
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+
+
+class Category(models.Model):
+    name = models.CharField(_('name'), max_length=100)
+    slug = models.SlugField(_('slug'), max_length=100, unique=True)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name_plural = _('categories')
+
+    def __str__(self):
+        return self.name
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        # Keep the copies on the product rows in step, so listings never join.
+        self.products.exclude(category_name=self.name, category_slug=self.slug).update(
+            category_name=self.name, category_slug=self.slug,
+        )
+
+
+class Product(models.Model):
+    """
+    A product. `category_name` and `category_slug` duplicate the category so
+    that a listing page is one query on this table; Category.save keeps them
+    up to date. Stock is kept per SKU by apps.orders, whose
+    inventory.with_stock annotates it onto products.
+    """
+    name = models.CharField(_('name'), max_length=200)
+    slug = models.SlugField(_('slug'), max_length=200, unique=True)
+    description = models.TextField(_('description'), blank=True)
+    category = models.ForeignKey(Category, on_delete=models.PROTECT, related_name='products')
+    category_name = models.CharField(max_length=100, editable=False)
+    category_slug = models.SlugField(max_length=100, editable=False, db_index=False)
+    price = models.DecimalField(_('price'), max_digits=10, decimal_places=2)
+    is_active = models.BooleanField(_('active'), default=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # Listing pages walk these backwards from a cursor: WHERE is_active AND id < ? ORDER BY id DESC.
+            models.Index(fields=['-id'], condition=Q(is_active=True), name='catalog_product_list_idx'),
+            models.Index(fields=['category_slug', '-id'], condition=Q(is_active=True),
+                         name='catalog_product_cat_list_idx'),
+        ]
+
+    def __str__(self):
+        return self.name
+
+    def save(self, *args, **kwargs):
+        self.category_name = self.category.name
+        self.category_slug = self.category.slug
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'category' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'category_name', 'category_slug'}
+        super().save(*args, **kwargs)
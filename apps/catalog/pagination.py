@@ -0,0 +1,12 @@
+from rest_framework.pagination import CursorPagination
+
+
+class ProductCursorPagination(CursorPagination):
+    """
+    Keyset pagination on the primary key: a page is `id < cursor ORDER BY id
+    DESC LIMIT n`, as fast on page 10,000 as on page one, and nothing is counted.
+    """
+    ordering = '-id'
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 100
@@ -0,0 +1,29 @@
+from rest_framework import serializers
+from .models import Category, Product
+
+
+class CategorySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Category
+        fields = ('id', 'name', 'slug')
+
+
+class ProductListSerializer(serializers.ModelSerializer):
+    """Only columns of the product row and `in_stock`, so a page needs no join"""
+    columns = ('id', 'name', 'slug', 'price', 'category_name', 'category_slug')
+    in_stock = serializers.BooleanField(read_only=True)
+
+    class Meta:
+        model = Product
+        fields = ('id', 'name', 'slug', 'price', 'in_stock', 'category_name', 'category_slug')
+
+
+class ProductDetailSerializer(serializers.ModelSerializer):
+    in_stock = serializers.BooleanField(read_only=True)
+
+    class Meta:
+        model = Product
+        fields = (
+            'id', 'name', 'slug', 'description', 'price', 'in_stock', 'category_name', 'category_slug',
+            'created_at', 'updated_at',
+        )
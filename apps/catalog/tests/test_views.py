@@ -0,0 +1,107 @@
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.response import Response
+
+from apps.catalog.models import Category, Product
+from apps.catalog.views import ProductDetailView
+
+
+class CatalogViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.shoes = Category.objects.create(name='Shoes', slug='shoes')
+        self.hats = Category.objects.create(name='Hats', slug='hats')
+        for i in range(5):
+            self.create_product(f'shoe-{i}', self.shoes)
+        for i in range(3):
+            self.create_product(f'hat-{i}', self.hats)
+
+    def create_product(self, slug, category, **kwargs):
+        return Product.objects.create(name=slug.title(), slug=slug, category=category, price=Decimal('9.99'), **kwargs)
+
+    def test_listing_pages_with_cursor(self):
+        """Test that pages link with a cursor, newest first, without a total count"""
+        response = self.client.get(reverse('catalog:product-list'), {'page_size': 3})
+
+        data = response.json()
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('count', data)
+        self.assertEqual([p['slug'] for p in data['results']], ['hat-2', 'hat-1', 'hat-0'])
+        self.assertEqual(data['results'][0]['category_name'], 'Hats')
+
+        seen = [p['slug'] for p in data['results']]
+        while data['next']:
+            data = self.client.get(data['next']).json()
+            seen += [p['slug'] for p in data['results']]
+        self.assertEqual(len(seen), 8)
+        self.assertEqual(len(set(seen)), 8)
+
+    def test_page_is_one_query(self):
+        with self.assertNumQueries(1):
+            self.client.get(reverse('catalog:product-list'), {'category': 'shoes'})
+
+    def test_category_filter_and_inactive_products(self):
+        Product.objects.filter(slug='shoe-0').update(is_active=False)
+
+        data = self.client.get(reverse('catalog:product-list'), {'category': 'shoes'}).json()
+
+        self.assertEqual([p['slug'] for p in data['results']], ['shoe-4', 'shoe-3', 'shoe-2', 'shoe-1'])
+
+    def test_listing_is_cached_until_a_product_changes(self):
+        url = reverse('catalog:product-list')
+        self.client.get(url)
+        with self.assertNumQueries(0):
+            self.client.get(url)
+
+        product = Product.objects.get(slug='hat-2')
+        product.price = Decimal('1.00')
+        product.save()
+
+        data = self.client.get(url).json()
+        self.assertEqual(data['results'][0]['price'], '1.00')
+
+    def test_not_modified(self):
+        url = reverse('catalog:product-list')
+        etag = self.client.get(url).headers['ETag']
+
+        response = self.client.get(url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+
+        self.create_product('hat-3', self.hats)
+        response = self.client.get(url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers['ETag'], etag)
+
+    def test_category_rename_updates_products(self):
+        """Test that the denormalized category columns follow the category"""
+        self.hats.name = 'Caps'
+        self.hats.slug = 'caps'
+        self.hats.save()
+
+        data = self.client.get(reverse('catalog:product-list'), {'category': 'caps'}).json()
+        self.assertEqual({p['category_name'] for p in data['results']}, {'Caps'})
+        self.assertEqual(len(data['results']), 3)
+
+    def test_product_detail(self):
+        response = self.client.get(reverse('catalog:product-detail', args=['shoe-1']))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['category_slug'], 'shoes')
+
+        response = self.client.get(reverse('catalog:product-detail', args=['missing']))
+        self.assertEqual(response.status_code, 404)
+
+    def test_uncached_responses_run_the_view_once(self):
+        """Test that a response that is not cached is returned, not rendered a second time"""
+        with patch.object(ProductDetailView, 'retrieve', return_value=Response(status=400)) as retrieve:
+            response = self.client.get(reverse('catalog:product-detail', args=['shoe-1']))
+
+        self.assertEqual(response.status_code, 400)
+        retrieve.assert_called_once()
+
+    def test_categories(self):
+        data = self.client.get(reverse('catalog:category-list')).json()
+        self.assertEqual([c['slug'] for c in data], ['hats', 'shoes'])
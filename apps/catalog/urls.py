@@ -0,0 +1,9 @@
+from django.urls import path
+from . import views
+
+app_name = 'catalog'
+urlpatterns = [
+    path("categories/", views.CategoryListView.as_view(), name='category-list'),
+    path("products/", views.ProductListView.as_view(), name='product-list'),
+    path("products/<slug:slug>/", views.ProductDetailView.as_view(), name='product-detail'),
+]
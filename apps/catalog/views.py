@@ -0,0 +1,70 @@
+from drf_yasg import openapi
+from drf_yasg.utils import swagger_auto_schema
+from rest_framework import generics
+from rest_framework.renderers import JSONRenderer
+
+from apps.orders.inventory import with_stock
+
+from .cache import cached_json_response
+from .models import Category, Product
+from .pagination import ProductCursorPagination
+from .serializers import CategorySerializer, ProductDetailSerializer, ProductListSerializer
+
+
+class CachedResponseMixin:
+    """Serves GET from the versioned listing cache, with ETag/304 support"""
+    authentication_classes = ()
+
+    def get(self, request, *args, **kwargs):
+        get = super().get
+        uncached = None
+
+        def render():
+            nonlocal uncached
+            response = get(request, *args, **kwargs)
+            if response.status_code != 200:
+                uncached = response
+                return None
+            return JSONRenderer().render(response.data)
+
+        # Responses that are not cached, such as errors, are returned as the view made them.
+        return cached_json_response(request, render) or uncached or get(request, *args, **kwargs)
+
+
+class CategoryListView(CachedResponseMixin, generics.ListAPIView):
+    queryset = Category.objects.order_by('name')
+    serializer_class = CategorySerializer
+    pagination_class = None
+
+
+class ProductListView(CachedResponseMixin, generics.ListAPIView):
+    """
+    View to list active products, newest first, optionally within one category.
+    """
+    serializer_class = ProductListSerializer
+    pagination_class = ProductCursorPagination
+
+    @swagger_auto_schema(
+        manual_parameters=[
+            openapi.Parameter('category', openapi.IN_QUERY, description="Category slug.", type=openapi.TYPE_STRING),
+        ],
+        responses={
+            200: ProductListSerializer(many=True),
+            304: openapi.Response(description="Not modified."),
+        }
+    )
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
+    def get_queryset(self):
+        products = with_stock(Product.objects.filter(is_active=True).only(*ProductListSerializer.columns))
+        category = self.request.query_params.get('category')
+        if category:
+            products = products.filter(category_slug=category)
+        return products
+
+
+class ProductDetailView(CachedResponseMixin, generics.RetrieveAPIView):
+    queryset = with_stock(Product.objects.filter(is_active=True))
+    serializer_class = ProductDetailSerializer
+    lookup_field = 'slug'
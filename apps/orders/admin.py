@@ -0,0 +1,35 @@
+from django.contrib import admin
+
+from .models import Order, OrderLine, StockItem
+
+
+@admin.register(StockItem)
+class StockItemAdmin(admin.ModelAdmin):
+    list_display = ('sku', 'product', 'available', 'updated_at')
+    search_fields = ('^sku',)
+    raw_id_fields = ('product',)
+    # Stock only changes through apps/orders/inventory.py, so that no sale is lost.
+    readonly_fields = ('available',)
+    show_full_result_count = False
+
+    def get_readonly_fields(self, request, obj=None):
+        # A new SKU starts with the stock it is created with.
+        return () if obj is None else self.readonly_fields
+
+
+class OrderLineInline(admin.TabularInline):
+    model = OrderLine
+    raw_id_fields = ('stock_item',)
+    readonly_fields = ('stock_item', 'quantity', 'unit_price')
+    can_delete = False
+    extra = 0
+
+
+@admin.register(Order)
+class OrderAdmin(admin.ModelAdmin):
+    list_display = ('id', 'user', 'status', 'total', 'created_at', 'reserved_until')
+    list_filter = ('status',)
+    raw_id_fields = ('user',)
+    readonly_fields = ('status', 'total', 'created_at', 'reserved_until')
+    inlines = (OrderLineInline,)
+    show_full_result_count = False
@@ -0,0 +1,160 @@
+"""
+Stock reservation for checkout.
+
+Stock is never read, changed in Python and written back. Reserving is one
+conditional statement per SKU,
+
+    UPDATE orders_stockitem SET available = available - n WHERE id = ? AND available >= n
+
+which either takes the stock or matches no row, so concurrent checkouts of
+the last unit cannot both succeed. The row stays locked until the order
+commits; the SKUs of a cart are updated in ascending id order, so two carts
+sharing SKUs always lock them in the same order and never deadlock.
+
+Orders hold their stock until `reserved_until`. Everything that closes an
+order, paying, cancelling or the release_expired_reservations sweeper, first
+flips its status with a conditional update on the order row, then returns
+stock in id order. Locks are therefore always taken order first, stock
+second, and an order is closed exactly once.
+
+Catalog listings show whether a product is in stock, read from these rows.
+A SKU selling out or coming back invalidates the cached listings once the
+transaction commits; other stock changes leave them alone.
+"""
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef, Sum
+from django.utils import timezone
+
+from apps.catalog.cache import bump_listing_version
+
+from .models import Cart, CartLine, Order, OrderLine, StockItem
+
+
+class EmptyCart(Exception):
+    pass
+
+
+class OutOfStock(Exception):
+    def __init__(self, sku):
+        super().__init__(f"Not enough stock of {sku}.")
+        self.sku = sku
+
+
+def take_stock(stock_item_id, quantity):
+    """Takes `quantity` units of a SKU if that many are available; returns whether it did"""
+    items = StockItem.objects.filter(pk=stock_item_id)
+    # Most takes leave units behind and are one statement.
+    if items.filter(available__gt=quantity).update(available=F('available') - quantity):
+        return True
+    # Short of a concurrent return, this one takes the last units.
+    if items.filter(available__gte=quantity).update(available=F('available') - quantity):
+        transaction.on_commit(bump_listing_version)
+        return True
+    return False
+
+
+def return_stock(quantities):
+    """Puts back {stock item id: quantity}, in id order"""
+    restocked = False
+    for stock_item_id in sorted(quantities):
+        items = StockItem.objects.filter(pk=stock_item_id)
+        quantity = quantities[stock_item_id]
+        if not items.filter(available__gt=0).update(available=F('available') + quantity):
+            restocked |= items.update(available=F('available') + quantity) == 1
+    if restocked:
+        transaction.on_commit(bump_listing_version)
+
+
+def with_stock(products):
+    """Annotates a Product queryset with `in_stock`: whether any SKU of the product can still be reserved"""
+    return products.annotate(in_stock=Exists(StockItem.objects.filter(product=OuterRef('pk'), available__gt=0)))
+
+
+def place_order(user_id, quantities):
+    """
+    Reserves {stock item id: quantity} for the user and returns the new
+    order. Raises OutOfStock, having reserved nothing, if any SKU runs short.
+    """
+    quantities = {item: quantity for item, quantity in quantities.items() if quantity > 0}
+    if not quantities:
+        raise EmptyCart()
+    with transaction.atomic():
+        items = StockItem.objects.filter(pk__in=quantities).select_related('product').only('sku', 'product__price')
+        items = {item.pk: item for item in items}
+        for stock_item_id in sorted(quantities):
+            if stock_item_id not in items or not take_stock(stock_item_id, quantities[stock_item_id]):
+                # Leaving the block rolls back the stock taken so far.
+                raise OutOfStock(items[stock_item_id].sku if stock_item_id in items else stock_item_id)
+
+        now = timezone.now()
+        lines = [
+            OrderLine(stock_item_id=stock_item_id, quantity=quantity, unit_price=items[stock_item_id].product.price)
+            for stock_item_id, quantity in sorted(quantities.items())
+        ]
+        order = Order.objects.create(
+            user_id=user_id, total=sum(line.quantity * line.unit_price for line in lines),
+            created_at=now, reserved_until=now + settings.ORDER_RESERVATION_TTL,
+        )
+        for line in lines:
+            line.order = order
+        OrderLine.objects.bulk_create(lines)
+    return order
+
+
+def checkout(user_id):
+    """Places an order for the user's cart and empties it"""
+    with transaction.atomic():
+        # Locking the cart makes a double-submitted checkout wait, then find the cart empty.
+        cart = Cart.objects.select_for_update().filter(user_id=user_id).first()
+        quantities = dict(CartLine.objects.filter(cart=cart).values_list('stock_item_id', 'quantity')) if cart else {}
+        if not quantities:
+            raise EmptyCart()
+        order = place_order(user_id, quantities)
+        CartLine.objects.filter(cart=cart).delete()
+    return order
+
+
+def ordered_quantities(order_ids):
+    rows = (
+        OrderLine.objects.filter(order_id__in=order_ids)
+        .values('stock_item_id').annotate(quantity=Sum('quantity')).order_by()
+    )
+    return {row['stock_item_id']: row['quantity'] for row in rows}
+
+
+def close_order(order_id, status, **filters):
+    """Moves a reserved order to `status`, giving its stock back unless it was paid; returns whether it did"""
+    with transaction.atomic():
+        closed = Order.objects.filter(pk=order_id, status=Order.RESERVED, **filters).update(status=status)
+        if closed and status != Order.PAID:
+            return_stock(ordered_quantities([order_id]))
+    return bool(closed)
+
+
+def confirm_payment(order_id):
+    """Marks a reserved order paid, keeping its stock; False once the reservation has run out"""
+    return close_order(order_id, Order.PAID, reserved_until__gt=timezone.now())
+
+
+def cancel_order(order_id, user_id):
+    return close_order(order_id, Order.CANCELLED, user_id=user_id)
+
+
+def release_expired(now, batch_size):
+    """
+    Expires one batch of reservations that ran out before `now` and returns
+    their stock. Returns the number of orders expired; 0 once none is left.
+    """
+    with transaction.atomic():
+        # Orders being paid or cancelled right now are locked; the next sweep gets them.
+        order_ids = list(
+            Order.objects.filter(status=Order.RESERVED, reserved_until__lte=now)
+            .select_for_update(skip_locked=True)
+            .order_by('reserved_until', 'id')
+            .values_list('id', flat=True)[:batch_size]
+        )
+        if order_ids:
+            Order.objects.filter(pk__in=order_ids).update(status=Order.EXPIRED)
+            return_stock(ordered_quantities(order_ids))
+    return len(order_ids)
@@ -0,0 +1,37 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from apps.orders.inventory import release_expired
+
+
+class Command(BaseCommand):
+    help = "Expires orders whose stock reservation ran out and puts their stock back, in small batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=settings.RESERVATION_SWEEP_BATCH_SIZE)
+        parser.add_argument('--pause', type=float, default=0.1,
+                            help="Seconds to sleep between batches, to leave room for checkouts.")
+        parser.add_argument('--interval', type=float, default=30.0,
+                            help="Seconds to sleep once no expired reservation is left.")
+        parser.add_argument('--once', action='store_true',
+                            help="Release what is currently expired and exit.")
+
+    def handle(self, *args, **options):
+        try:
+            while True:
+                now = timezone.now()
+                total = 0
+                while released := release_expired(now, options['batch_size']):
+                    total += released
+                    time.sleep(options['pause'])
+
+                if total and options['verbosity']:
+                    self.stdout.write(f"Released {total} expired reservations.")
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,83 @@
+from django.conf import settings
+from django.db import models
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+
+
+class StockItem(models.Model):
+    """
+    A sellable SKU of a catalog product. `available` is what can still be
+    reserved: stock on hand minus the quantities held by open reservations.
+    It only ever changes through the conditional updates in inventory.py.
+    """
+    sku = models.CharField(_('SKU'), max_length=64, unique=True)
+    product = models.ForeignKey('catalog.Product', on_delete=models.PROTECT, related_name='stock_items')
+    available = models.PositiveIntegerField(_('available'), default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return self.sku
+
+
+class Cart(models.Model):
+    user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='cart')
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'Cart of {self.user_id}'
+
+
+class CartLine(models.Model):
+    cart = models.ForeignKey(Cart, on_delete=models.CASCADE, related_name='lines')
+    stock_item = models.ForeignKey(StockItem, on_delete=models.CASCADE, related_name='+')
+    quantity = models.PositiveIntegerField(_('quantity'))
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['cart', 'stock_item'], name='orders_cartline_unique_item'),
+        ]
+
+
+class Order(models.Model):
+    """
+    An order. Placing it reserves its stock until `reserved_until`; paying
+    keeps the stock, while cancelling or letting the reservation run out
+    gives it back.
+    """
+    RESERVED = 'reserved'
+    PAID = 'paid'
+    CANCELLED = 'cancelled'
+    EXPIRED = 'expired'
+    STATUS_CHOICES = [
+        (RESERVED, _('reserved')),
+        (PAID, _('paid')),
+        (CANCELLED, _('cancelled')),
+        (EXPIRED, _('expired')),
+    ]
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.PROTECT, related_name='orders', db_index=False,
+    )
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=RESERVED)
+    total = models.DecimalField(_('total'), max_digits=12, decimal_places=2)
+    created_at = models.DateTimeField(default=timezone.now)
+    reserved_until = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-id'], name='orders_order_user_idx'),
+            # Only open reservations, for release_expired_reservations.
+            models.Index(fields=['reserved_until', 'id'], condition=Q(status='reserved'),
+                         name='orders_open_reservation_idx'),
+        ]
+
+    def __str__(self):
+        return f'Order {self.pk}'
+
+
+class OrderLine(models.Model):
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='lines')
+    stock_item = models.ForeignKey(StockItem, on_delete=models.PROTECT, related_name='+')
+    quantity = models.PositiveIntegerField(_('quantity'))
+    unit_price = models.DecimalField(_('unit price'), max_digits=10, decimal_places=2)
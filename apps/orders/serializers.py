@@ -0,0 +1,32 @@
+from rest_framework import serializers
+from .models import CartLine, Order, OrderLine
+
+
+class CartLineSerializer(serializers.ModelSerializer):
+    sku = serializers.CharField(source='stock_item.sku')
+    name = serializers.CharField(source='stock_item.product.name')
+    unit_price = serializers.DecimalField(source='stock_item.product.price', max_digits=10, decimal_places=2)
+
+    class Meta:
+        model = CartLine
+        fields = ('sku', 'name', 'unit_price', 'quantity')
+
+
+class CartQuantitySerializer(serializers.Serializer):
+    quantity = serializers.IntegerField(min_value=0, max_value=1000)
+
+
+class OrderLineSerializer(serializers.ModelSerializer):
+    sku = serializers.CharField(source='stock_item.sku')
+
+    class Meta:
+        model = OrderLine
+        fields = ('sku', 'quantity', 'unit_price')
+
+
+class OrderSerializer(serializers.ModelSerializer):
+    lines = OrderLineSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = Order
+        fields = ('id', 'status', 'total', 'created_at', 'reserved_until', 'lines')
@@ -0,0 +1,13 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.catalog.cache import bump_listing_version
+
+from .models import StockItem
+
+
+@receiver(post_save, sender=StockItem)
+@receiver(post_delete, sender=StockItem)
+def invalidate_listings(sender, **kwargs):
+    """A SKU added or removed can change whether its product is in stock"""
+    bump_listing_version()
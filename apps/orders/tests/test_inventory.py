@@ -0,0 +1,129 @@
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from apps.catalog.models import Category, Product
+from apps.orders import inventory
+from apps.orders.models import Cart, CartLine, Order, StockItem
+from apps.users.models import User
+
+
+class InventoryTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(email='buyer@example.com', username='buyer@example.com')
+        category = Category.objects.create(name='Shoes', slug='shoes')
+        self.boot = self.create_item('BOOT-42', category, '50.00', 3)
+        self.sock = self.create_item('SOCK-1', category, '2.50', 10)
+
+    def create_item(self, sku, category, price, available):
+        product = Product.objects.create(name=sku, slug=sku.lower(), category=category, price=Decimal(price))
+        return StockItem.objects.create(sku=sku, product=product, available=available)
+
+    def available(self, item):
+        item.refresh_from_db()
+        return item.available
+
+    def test_place_order_reserves_stock(self):
+        order = inventory.place_order(self.user.id, {self.boot.id: 2, self.sock.id: 4})
+
+        self.assertEqual(order.status, Order.RESERVED)
+        self.assertEqual(order.total, Decimal('110.00'))
+        self.assertEqual(self.available(self.boot), 1)
+        self.assertEqual(self.available(self.sock), 6)
+        self.assertEqual(sorted(order.lines.values_list('quantity', flat=True)), [2, 4])
+
+    def test_out_of_stock_reserves_nothing(self):
+        with self.assertRaises(inventory.OutOfStock) as cm:
+            inventory.place_order(self.user.id, {self.sock.id: 4, self.boot.id: 4})
+
+        self.assertEqual(cm.exception.sku, 'BOOT-42')
+        self.assertEqual(self.available(self.boot), 3)
+        self.assertEqual(self.available(self.sock), 10)
+        self.assertFalse(Order.objects.exists())
+
+    def test_reserves_with_conditional_updates_in_id_order(self):
+        with CaptureQueriesContext(connection) as queries:
+            inventory.place_order(self.user.id, {self.sock.id: 1, self.boot.id: 1})
+
+        updates = [q['sql'] for q in queries.captured_queries if q['sql'].startswith('UPDATE')]
+        self.assertEqual(len(updates), 2)
+        self.assertIn(f'"id" = {self.boot.id}', updates[0])
+        self.assertIn('"available" > 1', updates[0])
+        self.assertIn(f'"id" = {self.sock.id}', updates[1])
+
+    def test_selling_out_and_restocking_invalidate_listings(self):
+        with patch.object(inventory, 'bump_listing_version') as bump:
+            with self.captureOnCommitCallbacks(execute=True):
+                inventory.place_order(self.user.id, {self.sock.id: 9})
+            bump.assert_not_called()
+
+            with self.captureOnCommitCallbacks(execute=True):
+                order = inventory.place_order(self.user.id, {self.boot.id: 3})
+            self.assertEqual(self.available(self.boot), 0)
+            bump.assert_called_once()
+
+            with self.captureOnCommitCallbacks(execute=True):
+                inventory.cancel_order(order.id, self.user.id)
+            self.assertEqual(self.available(self.boot), 3)
+            self.assertEqual(bump.call_count, 2)
+
+    def test_checkout_empties_the_cart(self):
+        cart = Cart.objects.create(user=self.user)
+        CartLine.objects.create(cart=cart, stock_item=self.boot, quantity=1)
+
+        order = inventory.checkout(self.user.id)
+
+        self.assertEqual(order.lines.get().stock_item, self.boot)
+        self.assertFalse(cart.lines.exists())
+        with self.assertRaises(inventory.EmptyCart):
+            inventory.checkout(self.user.id)
+
+    def test_cancel_and_pay_close_an_order_once(self):
+        cancelled = inventory.place_order(self.user.id, {self.boot.id: 2})
+        paid = inventory.place_order(self.user.id, {self.sock.id: 2})
+
+        self.assertTrue(inventory.cancel_order(cancelled.id, self.user.id))
+        self.assertFalse(inventory.cancel_order(cancelled.id, self.user.id))
+        self.assertTrue(inventory.confirm_payment(paid.id))
+        self.assertFalse(inventory.cancel_order(paid.id, self.user.id))
+
+        self.assertEqual(self.available(self.boot), 3)
+        self.assertEqual(self.available(self.sock), 8)
+
+    def test_payment_after_the_reservation_ran_out_fails(self):
+        order = inventory.place_order(self.user.id, {self.boot.id: 1})
+        Order.objects.filter(pk=order.pk).update(reserved_until=timezone.now())
+
+        self.assertFalse(inventory.confirm_payment(order.id))
+
+    def test_sweeper_releases_expired_reservations_in_batches(self):
+        now = timezone.now()
+        orders = [inventory.place_order(self.user.id, {self.sock.id: 2}) for _ in range(3)]
+        kept = inventory.place_order(self.user.id, {self.boot.id: 1})
+        Order.objects.filter(pk__in=[o.pk for o in orders]).update(reserved_until=now - timedelta(minutes=1))
+
+        self.assertEqual(inventory.release_expired(now, batch_size=2), 2)
+        self.assertEqual(inventory.release_expired(now, batch_size=2), 1)
+        self.assertEqual(inventory.release_expired(now, batch_size=2), 0)
+
+        self.assertEqual(self.available(self.sock), 10)
+        self.assertEqual(self.available(self.boot), 2)
+        self.assertEqual(Order.objects.filter(status=Order.EXPIRED).count(), 3)
+        self.assertEqual(Order.objects.get(pk=kept.pk).status, Order.RESERVED)
+
+    def test_release_expired_reservations_command(self):
+        order = inventory.place_order(self.user.id, {self.boot.id: 3})
+        Order.objects.filter(pk=order.pk).update(reserved_until=timezone.now() - timedelta(seconds=1))
+
+        out = StringIO()
+        call_command('release_expired_reservations', once=True, pause=0, verbosity=0, stdout=out)
+
+        self.assertEqual(self.available(self.boot), 3)
+        self.assertEqual(out.getvalue(), '')
@@ -0,0 +1,90 @@
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from apps.catalog.models import Category, Product
+from apps.orders.models import Order, StockItem
+from apps.users.models import User
+from apps.users.tokens import UserRefreshToken
+
+
+class OrderViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(email='buyer@example.com', username='buyer@example.com', is_active=True)
+        category = Category.objects.create(name='Shoes', slug='shoes')
+        product = Product.objects.create(name='Boot', slug='boot', category=category, price=Decimal('50.00'))
+        self.boot = StockItem.objects.create(sku='BOOT-42', product=product, available=2)
+        self.client = APIClient()
+        token = UserRefreshToken.for_user(self.user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def set_quantity(self, sku, quantity):
+        return self.client.put(reverse('orders:cart-line', args=[sku]), {'quantity': quantity}, format='json')
+
+    def test_requires_authentication(self):
+        self.client.credentials()
+        self.assertEqual(self.client.get(reverse('orders:cart')).status_code, 401)
+
+    def test_cart_lines(self):
+        self.assertEqual(self.set_quantity('BOOT-42', 2).json()['lines'][0]['quantity'], 2)
+        self.assertEqual(self.set_quantity('BOOT-42', 1).json()['lines'][0]['quantity'], 1)
+        self.assertEqual(self.client.get(reverse('orders:cart')).json()['lines'][0]['sku'], 'BOOT-42')
+        self.assertEqual(self.set_quantity('BOOT-42', 0).json()['lines'], [])
+        self.assertEqual(self.set_quantity('NOPE', 1).status_code, 404)
+        self.assertEqual(self.set_quantity('BOOT-42', -1).status_code, 400)
+
+    def test_checkout(self):
+        self.set_quantity('BOOT-42', 2)
+
+        response = self.client.post(reverse('orders:checkout'))
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['total'], '100.00')
+        self.assertEqual(response.json()['lines'], [{'sku': 'BOOT-42', 'quantity': 2, 'unit_price': '50.00'}])
+        self.assertEqual(self.client.post(reverse('orders:checkout')).status_code, 400)
+
+        orders = self.client.get(reverse('orders:order-list')).json()['results']
+        self.assertEqual([order['status'] for order in orders], ['reserved'])
+
+    def test_checkout_out_of_stock(self):
+        self.set_quantity('BOOT-42', 3)
+
+        response = self.client.post(reverse('orders:checkout'))
+
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['sku'], 'BOOT-42')
+        self.assertEqual(len(self.client.get(reverse('orders:cart')).json()['lines']), 1)
+
+    def test_cancel(self):
+        self.set_quantity('BOOT-42', 2)
+        order_id = self.client.post(reverse('orders:checkout')).json()['id']
+
+        response = self.client.post(reverse('orders:order-cancel', args=[order_id]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['status'], Order.CANCELLED)
+        self.assertEqual(self.client.post(reverse('orders:order-cancel', args=[order_id])).status_code, 409)
+        self.boot.refresh_from_db()
+        self.assertEqual(self.boot.available, 2)
+
+        other = User.objects.create(email='other@example.com', username='other@example.com')
+        order = Order.objects.create(user=other, total=0, reserved_until=self.boot.updated_at)
+        self.assertEqual(self.client.post(reverse('orders:order-cancel', args=[order.id])).status_code, 404)
+
+    def test_catalog_follows_the_stock(self):
+        """Test that cached listings change when a SKU sells out and when it is back"""
+        listing = reverse('catalog:product-list')
+        self.assertTrue(self.client.get(listing).json()['results'][0]['in_stock'])
+
+        self.set_quantity('BOOT-42', 2)
+        with self.captureOnCommitCallbacks(execute=True):
+            order = self.client.post(reverse('orders:checkout')).json()
+        self.assertFalse(self.client.get(listing).json()['results'][0]['in_stock'])
+        self.assertFalse(self.client.get(reverse('catalog:product-detail', args=['boot'])).json()['in_stock'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('orders:order-cancel', args=[order['id']]))
+        self.assertTrue(self.client.get(listing).json()['results'][0]['in_stock'])
@@ -0,0 +1,11 @@
+from django.urls import path
+from . import views
+
+app_name = 'orders'
+urlpatterns = [
+    path("", views.OrderListView.as_view(), name='order-list'),
+    path("<int:pk>/cancel/", views.OrderCancelView.as_view(), name='order-cancel'),
+    path("cart/", views.CartView.as_view(), name='cart'),
+    path("cart/lines/<str:sku>/", views.CartLineView.as_view(), name='cart-line'),
+    path("checkout/", views.CheckoutView.as_view(), name='checkout'),
+]
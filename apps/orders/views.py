@@ -0,0 +1,125 @@
+from django.shortcuts import get_object_or_404
+from drf_yasg import openapi
+from drf_yasg.utils import swagger_auto_schema
+from rest_framework import generics, status
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from online_shop.db.routers import follow_pin, pin_primary
+from . import inventory
+from .models import Cart, CartLine, Order, StockItem
+from .pagination import OrderCursorPagination
+from .serializers import CartLineSerializer, CartQuantitySerializer, OrderSerializer
+
+
+def pin_key(request):
+    """Key pinning a user's reads to the primary after they change their cart or orders"""
+    return f'orders_{request.user.id}'
+
+
+def cart_response(request):
+    lines = CartLine.objects.filter(cart__user_id=request.user.id).select_related('stock_item__product').order_by('id')
+    return Response({'lines': CartLineSerializer(lines, many=True).data})
+
+
+class CartView(APIView):
+    """
+    View to show the user's cart.
+    """
+    permission_classes = (IsAuthenticated,)
+
+    @swagger_auto_schema(responses={200: CartLineSerializer(many=True)})
+    def get(self, request):
+        follow_pin(pin_key(request))
+        return cart_response(request)
+
+
+class CartLineView(APIView):
+    """
+    View to set how many of a SKU the cart holds; 0 removes it.
+    """
+    permission_classes = (IsAuthenticated,)
+
+    @swagger_auto_schema(
+        request_body=CartQuantitySerializer,
+        responses={
+            200: CartLineSerializer(many=True),
+            400: openapi.Response(description="Invalid quantity."),
+            404: openapi.Response(description="Unknown SKU."),
+        }
+    )
+    def put(self, request, sku):
+        serializer = CartQuantitySerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        stock_item = get_object_or_404(StockItem.objects.only('id'), sku=sku)
+        cart, _ = Cart.objects.get_or_create(user_id=request.user.id)
+        quantity = serializer.validated_data['quantity']
+        if quantity:
+            CartLine.objects.update_or_create(cart=cart, stock_item=stock_item, defaults={'quantity': quantity})
+        else:
+            CartLine.objects.filter(cart=cart, stock_item=stock_item).delete()
+        pin_primary(pin_key(request))
+        return cart_response(request)
+
+
+class CheckoutView(APIView):
+    """
+    View to place an order for the cart, reserving its stock.
+    """
+    permission_classes = (IsAuthenticated,)
+
+    @swagger_auto_schema(
+        responses={
+            201: OrderSerializer,
+            400: openapi.Response(description="The cart is empty."),
+            409: openapi.Response(description="A SKU in the cart is out of stock."),
+        }
+    )
+    def post(self, request):
+        try:
+            order = inventory.checkout(request.user.id)
+        except inventory.EmptyCart:
+            return Response({'error': 'The cart is empty.'}, status=status.HTTP_400_BAD_REQUEST)
+        except inventory.OutOfStock as e:
+            return Response({'error': str(e), 'sku': e.sku}, status=status.HTTP_409_CONFLICT)
+        finally:
+            pin_primary(pin_key(request))
+        return Response(OrderSerializer(order).data, status=status.HTTP_201_CREATED)
+
+
+class OrderListView(generics.ListAPIView):
+    """
+    View to list the user's orders, newest first.
+    """
+    permission_classes = (IsAuthenticated,)
+    serializer_class = OrderSerializer
+    pagination_class = OrderCursorPagination
+
+    def get_queryset(self):
+        follow_pin(pin_key(self.request))
+        return Order.objects.filter(user_id=self.request.user.id).prefetch_related('lines__stock_item')
+
+
+class OrderCancelView(APIView):
+    """
+    View to cancel a reserved order, giving its stock back.
+    """
+    permission_classes = (IsAuthenticated,)
+
+    @swagger_auto_schema(
+        responses={
+            200: OrderSerializer,
+            404: openapi.Response(description="No such order."),
+            409: openapi.Response(description="The order is no longer reserved."),
+        }
+    )
+    def post(self, request, pk):
+        cancelled = inventory.cancel_order(pk, request.user.id)
+        pin_primary(pin_key(request))
+        order = get_object_or_404(Order.objects.prefetch_related('lines__stock_item'), pk=pk, user_id=request.user.id)
+        if not cancelled:
+            return Response({'error': f'The order is {order.status}.'}, status=status.HTTP_409_CONFLICT)
+        return Response(OrderSerializer(order).data)
@@ -0,0 +1,11 @@
+from django.contrib import admin
+
+from .models import SearchDocument
+
+
+@admin.register(SearchDocument)
+class SearchDocumentAdmin(admin.ModelAdmin):
+    list_display = ('name', 'category_name', 'price', 'updated_at')
+    search_fields = ('^slug',)
+    raw_id_fields = ('product',)
+    show_full_result_count = False
@@ -0,0 +1,167 @@
+"""
+In-memory prefix trie for autocomplete.
+
+Each worker holds a trie of the indexed product names, keyed from the start
+of every word, so "sho" suggests both "Shoe Rack" and "Running Shoes". Every
+node stores its best suggestions, newest products first, so a lookup walks
+at most AUTOCOMPLETE_MAX_PREFIX nodes and runs no query.
+
+The trie holds the AUTOCOMPLETE_MAX_NAMES newest products, which bounds the
+memory and build time of every worker. The first lookup starts building it
+in a background thread and is answered with one bounded, indexed query
+meanwhile, as is every lookup until the build is done; that query only
+matches the start of a name. After that, a lookup checks the
+index version at most every AUTOCOMPLETE_REFRESH_SECONDS and, when the index
+has changed, rebuilds the trie in the background while the old one keeps
+answering.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.db import connection
+
+from .backends import query_terms
+from .indexing import index_version
+from .models import SearchDocument
+
+
+def normalize(text):
+    return ' '.join(query_terms(text))
+
+
+class Node:
+    __slots__ = ('children', 'suggestions')
+
+    def __init__(self):
+        self.children = {}
+        self.suggestions = []
+
+
+class Trie:
+    def __init__(self, max_prefix, limit):
+        self.max_prefix = max_prefix
+        self.limit = limit
+        self.root = Node()
+        self.size = 0
+
+    def add(self, name, slug):
+        """Adds a suggestion; suggestions must be added best first"""
+        normalized = normalize(name)
+        suggestion = (name, slug, normalized)
+        starts = [0] + [i + 1 for i, char in enumerate(normalized) if char == ' ']
+        for start in starts:
+            node = self.root
+            for char in normalized[start:start + self.max_prefix]:
+                child = node.children.get(char)
+                if child is None:
+                    child = node.children[char] = Node()
+                node = child
+                # A name reaches a node twice when two of its words share a prefix.
+                if len(node.suggestions) < self.limit and suggestion not in node.suggestions:
+                    node.suggestions.append(suggestion)
+        self.size += 1
+
+    def lookup(self, prefix):
+        """Returns (name, slug) suggestions for `prefix`, best first"""
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+        node = self.root
+        for char in prefix[:self.max_prefix]:
+            node = node.children.get(char)
+            if node is None:
+                return []
+        suggestions = node.suggestions
+        if len(prefix) > self.max_prefix:
+            # The trie stops at max_prefix; check the rest of a longer prefix on the candidates.
+            prefix = ' ' + prefix
+            suggestions = [s for s in suggestions if prefix in ' ' + s[2]]
+        return [(name, slug) for name, slug, _ in suggestions]
+
+
+def query_suggestions(prefix, limit):
+    """
+    Returns (name, slug) suggestions for `prefix` from the database, newest
+    first. Only names that start with the prefix match: a match inside a name
+    would need a LIKE '%...%' scan, which migration 0003's index cannot serve.
+    """
+    prefix = normalize(prefix)
+    if not prefix:
+        return []
+    documents = SearchDocument.objects.filter(name__istartswith=prefix)
+    return list(documents.order_by('-product_id').values_list('name', 'slug')[:limit])
+
+
+class Autocomplete:
+    def __init__(self, max_prefix=None, limit=None, refresh_interval=None, background=True):
+        self.max_prefix = max_prefix or settings.AUTOCOMPLETE_MAX_PREFIX
+        self.limit = limit or settings.AUTOCOMPLETE_LIMIT
+        self.refresh_interval = (
+            settings.AUTOCOMPLETE_REFRESH_SECONDS if refresh_interval is None else refresh_interval
+        )
+        self.background = background
+        self.trie = None
+        self.version = None
+        self.checked_at = 0.0
+        self.lock = threading.Lock()
+        self.building = False
+
+    def build(self):
+        """Builds a trie from the index, streaming it newest first; returns (trie, index version)"""
+        version = index_version()
+        trie = Trie(self.max_prefix, self.limit)
+        documents = SearchDocument.objects.order_by('-product_id').values_list('name', 'slug')
+        documents = documents[:settings.AUTOCOMPLETE_MAX_NAMES]
+        for name, slug in documents.iterator(chunk_size=settings.AUTOCOMPLETE_BUILD_BATCH_SIZE):
+            trie.add(name, slug)
+        return trie, version
+
+    def refresh(self):
+        self.trie, self.version = self.build()
+        self.checked_at = time.monotonic()
+
+    def _refresh_in_background(self):
+        try:
+            self.refresh()
+        finally:
+            self.building = False
+            connection.close()
+
+    def start_build(self):
+        with self.lock:
+            if self.building:
+                return
+            self.building = True
+        threading.Thread(target=self._refresh_in_background, daemon=True).start()
+
+    def maybe_refresh(self):
+        if self.trie is None:
+            if self.background:
+                self.start_build()
+                return
+            with self.lock:
+                if self.trie is None:
+                    self.refresh()
+            return
+        now = time.monotonic()
+        if now - self.checked_at < self.refresh_interval or self.building:
+            return
+        self.checked_at = now
+        if index_version() == self.version:
+            return
+        if not self.background:
+            self.refresh()
+            return
+        self.start_build()
+
+    def suggest(self, prefix, limit=None):
+        self.maybe_refresh()
+        limit = limit or self.limit
+        trie = self.trie
+        if trie is None:
+            return query_suggestions(prefix, limit)
+        return trie.lookup(prefix)[:limit]
+
+
+autocomplete = Autocomplete()
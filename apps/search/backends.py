@@ -0,0 +1,72 @@
+"""
+Ranked full-text queries against the search index.
+
+PostgreSQL matches the generated `search_vector` column through its GIN
+index and ranks with ts_rank_cd; SQLite matches the FTS5 table and ranks
+with bm25. In both, a match needs every term, the last term also matches as
+a prefix, and names weigh more than category names, which weigh more than
+descriptions. Other databases fall back to an unranked name lookup.
+"""
+import re
+
+from django.db import connections, router
+
+from .models import SearchDocument
+
+TERM = re.compile(r'[^\W_]+')
+
+RESULT_COLUMNS = 'd.product_id, d.name, d.slug, d.category_name, d.price'
+
+POSTGRESQL_QUERY = f"""
+    SELECT {RESULT_COLUMNS}, ts_rank_cd(d.search_vector, q) AS rank
+    FROM search_searchdocument d, to_tsquery('english', %s) q
+    WHERE d.search_vector @@ q
+    ORDER BY rank DESC, d.product_id DESC
+    LIMIT %s OFFSET %s
+"""
+
+# bm25() is lower for better matches; its arguments weigh the FTS5 columns.
+SQLITE_QUERY = f"""
+    SELECT {RESULT_COLUMNS}, -bm25(search_searchdocument_fts, 10.0, 4.0, 1.0) AS rank
+    FROM search_searchdocument_fts f
+    JOIN search_searchdocument d ON d.product_id = f.rowid
+    WHERE search_searchdocument_fts MATCH %s
+    ORDER BY rank DESC, d.product_id DESC
+    LIMIT %s OFFSET %s
+"""
+
+
+def query_terms(query):
+    return TERM.findall(query.casefold())
+
+
+def postgresql_query(terms):
+    return ' & '.join(terms) + ':*'
+
+
+def sqlite_query(terms):
+    return ' '.join('"%s"' % term for term in terms) + '*'
+
+
+def search(query, limit, offset=0):
+    """Returns up to `limit` documents matching `query`, best first, each with a `rank`"""
+    terms = query_terms(query)
+    if not terms:
+        return []
+
+    using = router.db_for_read(SearchDocument)
+    vendor = connections[using].vendor
+    if vendor == 'postgresql':
+        params = (postgresql_query(terms), limit, offset)
+        return list(SearchDocument.objects.raw(POSTGRESQL_QUERY, params, using=using))
+    if vendor == 'sqlite':
+        params = (sqlite_query(terms), limit, offset)
+        return list(SearchDocument.objects.raw(SQLITE_QUERY, params, using=using))
+
+    documents = SearchDocument.objects.using(using).only('name', 'slug', 'category_name', 'price')
+    for term in terms:
+        documents = documents.filter(name__icontains=term)
+    documents = list(documents.order_by('-product_id')[offset:offset + limit])
+    for document in documents:
+        document.rank = 0.0
+    return documents
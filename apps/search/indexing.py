@@ -0,0 +1,68 @@
+"""
+Keeps the search table in step with the catalog.
+
+Product writes reach the index through signals.py, one row at a time.
+Bulk writes send no signals, so after one run `manage.py build_search_index`,
+which upserts the whole catalog in batches.
+
+Every index write bumps the index version, which tells the autocomplete
+tries of all workers that they are out of date.
+"""
+import time
+
+from django.core.cache import cache
+
+from .models import SearchDocument
+
+VERSION_KEY = 'search_index_version'
+
+DOCUMENT_FIELDS = ('name', 'slug', 'category_name', 'description', 'price', 'updated_at')
+
+
+def index_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # Start from the clock, so a version lost to eviction never reuses an old number.
+        cache.add(VERSION_KEY, time.time_ns(), None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def bump_index_version():
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.add(VERSION_KEY, time.time_ns(), None)
+
+
+def document_for(product):
+    return SearchDocument(
+        product_id=product.pk, name=product.name, slug=product.slug, category_name=product.category_name,
+        description=product.description, price=product.price,
+    )
+
+
+def upsert_documents(products):
+    """Indexes the active `products` and drops the inactive ones from the index"""
+    documents = [document_for(product) for product in products if product.is_active]
+    if documents:
+        SearchDocument.objects.bulk_create(
+            documents, update_conflicts=True, unique_fields=['product'], update_fields=DOCUMENT_FIELDS,
+        )
+    inactive = [product.pk for product in products if not product.is_active]
+    if inactive:
+        SearchDocument.objects.filter(product_id__in=inactive).delete()
+
+
+def index_product(product):
+    upsert_documents([product])
+    bump_index_version()
+
+
+def rename_category(category):
+    """Copies a renamed category onto its documents"""
+    updated = SearchDocument.objects.filter(product__category=category).exclude(
+        category_name=category.name,
+    ).update(category_name=category.name)
+    if updated:
+        bump_index_version()
@@ -0,0 +1,37 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from apps.catalog.models import Product
+from apps.search.indexing import bump_index_version, upsert_documents
+
+
+class Command(BaseCommand):
+    help = "Indexes the whole catalog for search, walking the products in id order in small batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=settings.SEARCH_INDEX_BATCH_SIZE)
+        parser.add_argument('--pause', type=float, default=0.0,
+                            help="Seconds to sleep between batches, to leave room for other writers.")
+
+    def handle(self, *args, **options):
+        fields = ('name', 'slug', 'category_name', 'description', 'price', 'is_active')
+        products = Product.objects.only(*fields).order_by('id')
+        total, last = 0, 0
+        while True:
+            batch = list(products.filter(id__gt=last)[:options['batch_size']])
+            if not batch:
+                break
+            last = batch[-1].id
+            with transaction.atomic():
+                upsert_documents(batch)
+            total += len(batch)
+            if options['verbosity'] > 1:
+                self.stdout.write(f"Indexed {total} products (up to id {last}).")
+            time.sleep(options['pause'])
+
+        bump_index_version()
+        if options['verbosity']:
+            self.stdout.write(f"Indexed {total} products.")
@@ -0,0 +1,90 @@
+from django.db import migrations
+
+# PostgreSQL: a stored tsvector column, recomputed by the database on every
+# write to the row, under a GIN index.
+POSTGRESQL_FORWARD = [
+    """
+    ALTER TABLE search_searchdocument ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('english'::regconfig, coalesce(name, '')), 'A')
+        || setweight(to_tsvector('english'::regconfig, coalesce(category_name, '')), 'B')
+        || setweight(to_tsvector('english'::regconfig, coalesce(description, '')), 'C')
+    ) STORED
+    """,
+    "CREATE INDEX search_document_vector_idx ON search_searchdocument USING gin (search_vector)",
+]
+POSTGRESQL_BACKWARD = [
+    "DROP INDEX IF EXISTS search_document_vector_idx",
+    "ALTER TABLE search_searchdocument DROP COLUMN IF EXISTS search_vector",
+]
+
+# SQLite: an external-content FTS5 table over the documents, kept in step by
+# triggers. SQLite rebuilds a table to alter it, which drops its triggers, so
+# a later migration that alters search_searchdocument must recreate them.
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE search_searchdocument_fts USING fts5(
+        name, category_name, description,
+        content='search_searchdocument', content_rowid='product_id',
+        tokenize='porter unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER search_searchdocument_fts_insert AFTER INSERT ON search_searchdocument BEGIN
+        INSERT INTO search_searchdocument_fts (rowid, name, category_name, description)
+        VALUES (new.product_id, new.name, new.category_name, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER search_searchdocument_fts_delete AFTER DELETE ON search_searchdocument BEGIN
+        INSERT INTO search_searchdocument_fts (search_searchdocument_fts, rowid, name, category_name, description)
+        VALUES ('delete', old.product_id, old.name, old.category_name, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER search_searchdocument_fts_update AFTER UPDATE ON search_searchdocument BEGIN
+        INSERT INTO search_searchdocument_fts (search_searchdocument_fts, rowid, name, category_name, description)
+        VALUES ('delete', old.product_id, old.name, old.category_name, old.description);
+        INSERT INTO search_searchdocument_fts (rowid, name, category_name, description)
+        VALUES (new.product_id, new.name, new.category_name, new.description);
+    END
+    """,
+    "INSERT INTO search_searchdocument_fts (search_searchdocument_fts) VALUES ('rebuild')",
+]
+SQLITE_BACKWARD = [
+    "DROP TRIGGER IF EXISTS search_searchdocument_fts_insert",
+    "DROP TRIGGER IF EXISTS search_searchdocument_fts_delete",
+    "DROP TRIGGER IF EXISTS search_searchdocument_fts_update",
+    "DROP TABLE IF EXISTS search_searchdocument_fts",
+]
+
+STATEMENTS = {
+    "postgresql": (POSTGRESQL_FORWARD, POSTGRESQL_BACKWARD),
+    "sqlite": (SQLITE_FORWARD, SQLITE_BACKWARD),
+}
+
+
+def run_statements(schema_editor, direction):
+    # Other databases get no index; apps/search/backends.py falls back to a name lookup there.
+    statements = STATEMENTS.get(schema_editor.connection.vendor)
+    if statements:
+        for sql in statements[direction]:
+            schema_editor.execute(sql, params=None)
+
+
+def create_index(apps, schema_editor):
+    run_statements(schema_editor, 0)
+
+
+def drop_index(apps, schema_editor):
+    run_statements(schema_editor, 1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("search", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
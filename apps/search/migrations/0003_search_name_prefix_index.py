@@ -0,0 +1,45 @@
+from django.db import migrations
+
+# The autocomplete fallback filters on name__istartswith, which PostgreSQL runs
+# as UPPER(name::text) LIKE 'PREFIX%'. A text_pattern_ops index on that
+# expression serves it under any collation. Built concurrently, so writes to
+# the table carry on meanwhile.
+POSTGRESQL_FORWARD = [
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS search_document_name_prefix_idx "
+    "ON search_searchdocument (UPPER(name::text) text_pattern_ops)",
+]
+POSTGRESQL_BACKWARD = [
+    "DROP INDEX CONCURRENTLY IF EXISTS search_document_name_prefix_idx",
+]
+
+STATEMENTS = {
+    "postgresql": (POSTGRESQL_FORWARD, POSTGRESQL_BACKWARD),
+}
+
+
+def run_statements(schema_editor, direction):
+    # SQLite, used in development, keeps its small tables unindexed for this.
+    statements = STATEMENTS.get(schema_editor.connection.vendor)
+    if statements:
+        for sql in statements[direction]:
+            schema_editor.execute(sql, params=None)
+
+
+def create_index(apps, schema_editor):
+    run_statements(schema_editor, 0)
+
+
+def drop_index(apps, schema_editor):
+    run_statements(schema_editor, 1)
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ("search", "0002_search_index"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
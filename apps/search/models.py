@@ -0,0 +1,21 @@
+from django.db import models
+
+
+class SearchDocument(models.Model):
+    """
+    The searchable copy of an active product. Migration 0002 adds the inverted
+    index on top of this table: a generated, GIN-indexed tsvector column on
+    PostgreSQL, and an FTS5 table kept in step by triggers on SQLite.
+    """
+    product = models.OneToOneField(
+        'catalog.Product', on_delete=models.CASCADE, primary_key=True, related_name='search_document',
+    )
+    name = models.CharField(max_length=200)
+    slug = models.SlugField(max_length=200, db_index=False)
+    category_name = models.CharField(max_length=100)
+    description = models.TextField(blank=True)
+    price = models.DecimalField(max_digits=10, decimal_places=2)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return self.name
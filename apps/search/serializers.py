@@ -0,0 +1,16 @@
+from rest_framework import serializers
+from .models import SearchDocument
+
+
+class SearchResultSerializer(serializers.ModelSerializer):
+    id = serializers.IntegerField(source='product_id')
+    rank = serializers.FloatField()
+
+    class Meta:
+        model = SearchDocument
+        fields = ('id', 'name', 'slug', 'category_name', 'price', 'rank')
+
+
+class SuggestionSerializer(serializers.Serializer):
+    name = serializers.CharField()
+    slug = serializers.SlugField()
@@ -0,0 +1,24 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.catalog.models import Category, Product
+
+from .indexing import bump_index_version, index_product, rename_category
+
+
+@receiver(post_save, sender=Product)
+def update_document(sender, instance, raw=False, **kwargs):
+    if not raw:
+        index_product(instance)
+
+
+@receiver(post_delete, sender=Product)
+def drop_document(sender, **kwargs):
+    # The document itself goes with the product, by cascade.
+    bump_index_version()
+
+
+@receiver(post_save, sender=Category)
+def update_category_name(sender, instance, raw=False, **kwargs):
+    if not raw:
+        rename_category(instance)
@@ -0,0 +1,102 @@
+import threading
+import time
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from apps.catalog.models import Category, Product
+from apps.search.autocomplete import Autocomplete, Trie
+
+
+class TrieTests(SimpleTestCase):
+    def setUp(self):
+        self.trie = Trie(max_prefix=6, limit=3)
+        for name in ('Running Shoes', 'Shoe Rack', 'Shoe Shine Kit', 'Shorts', 'Café Crème'):
+            self.trie.add(name, name.lower().replace(' ', '-'))
+
+    def names(self, prefix):
+        return [name for name, slug in self.trie.lookup(prefix)]
+
+    def test_matches_the_start_of_any_word_best_first(self):
+        self.assertEqual(self.names('sho'), ['Running Shoes', 'Shoe Rack', 'Shoe Shine Kit'])
+        self.assertEqual(self.names('RUNNING  s'), ['Running Shoes'])
+        self.assertEqual(self.names('caf'), ['Café Crème'])
+        self.assertEqual(self.names('unning'), [])
+        self.assertEqual(self.names(''), [])
+
+    def test_a_name_is_suggested_once_per_node(self):
+        self.assertEqual(self.names('shoe'), ['Running Shoes', 'Shoe Rack', 'Shoe Shine Kit'])
+        self.assertEqual(self.names('shoe s'), ['Shoe Shine Kit'])
+
+    def test_prefix_longer_than_the_trie(self):
+        self.assertEqual(self.names('shoe shine'), ['Shoe Shine Kit'])
+        self.assertEqual(self.names('shoe shone'), [])
+
+
+class AutocompleteViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.shoes = Category.objects.create(name='Shoes', slug='shoes')
+        for name in ('Running Shoes', 'Shoe Rack'):
+            Product.objects.create(
+                name=name, slug=name.lower().replace(' ', '-'), category=self.shoes, price=Decimal('9.99'),
+            )
+        self.autocomplete = Autocomplete(refresh_interval=0, background=False)
+        patcher = patch('apps.search.views.autocomplete', self.autocomplete)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def suggest(self, q, **params):
+        response = self.client.get(reverse('search:autocomplete'), {'q': q, **params})
+        self.assertEqual(response.status_code, 200)
+        return [suggestion['slug'] for suggestion in response.json()['suggestions']]
+
+    def test_suggests_from_memory(self):
+        self.assertEqual(self.suggest('sho'), ['shoe-rack', 'running-shoes'])
+        with self.assertNumQueries(0):
+            self.assertEqual(self.suggest('run', limit=1), ['running-shoes'])
+
+    def test_picks_up_index_changes(self):
+        self.suggest('sho')
+        Product.objects.create(name='Shoe Horn', slug='shoe-horn', category=self.shoes, price=Decimal('1.00'))
+
+        self.assertEqual(self.suggest('shoe h'), ['shoe-horn'])
+
+    def test_waits_for_the_refresh_interval(self):
+        self.autocomplete.refresh_interval = 60
+        self.suggest('sho')
+        Product.objects.create(name='Shoe Horn', slug='shoe-horn', category=self.shoes, price=Decimal('1.00'))
+
+        self.assertEqual(self.suggest('shoe h'), [])
+
+    def test_first_lookup_does_not_wait_for_the_build(self):
+        """Test that lookups are answered from the database while the trie builds in the background"""
+        building = threading.Event()
+        built = Trie(max_prefix=12, limit=10)
+        built.add('Shoe Horn', 'shoe-horn')
+
+        def build():
+            building.wait(5)
+            return built, 'v1'
+
+        background = Autocomplete(refresh_interval=60, background=True)
+        with patch.object(background, 'build', build), patch('apps.search.views.autocomplete', background):
+            # The fallback matches the start of names only, which an index serves.
+            self.assertEqual(self.suggest('sho'), ['shoe-rack'])
+            self.assertEqual(self.suggest('rack'), [])
+            building.set()
+            for _ in range(100):
+                if background.trie is not None:
+                    break
+                time.sleep(0.01)
+            with self.assertNumQueries(0):
+                self.assertEqual(self.suggest('sho'), ['shoe-horn'])
+
+    @override_settings(AUTOCOMPLETE_MAX_NAMES=1)
+    def test_trie_holds_the_newest_names(self):
+        trie, _ = self.autocomplete.build()
+        self.assertEqual(trie.size, 1)
+        self.assertEqual(trie.lookup('sho'), [('Shoe Rack', 'shoe-rack')])
@@ -0,0 +1,97 @@
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from apps.catalog.models import Category, Product
+from apps.search.indexing import index_version
+from apps.search.models import SearchDocument
+
+
+class SearchTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.shoes = Category.objects.create(name='Shoes', slug='shoes')
+        self.bags = Category.objects.create(name='Bags', slug='bags')
+
+    def create_product(self, name, category, **kwargs):
+        return Product.objects.create(
+            name=name, slug=name.lower().replace(' ', '-'), category=category, price=Decimal('9.99'), **kwargs
+        )
+
+    def search(self, q, **params):
+        response = self.client.get(reverse('search:search'), {'q': q, **params})
+        self.assertEqual(response.status_code, 200)
+        return [result['slug'] for result in response.json()['results']]
+
+    def test_ranks_name_matches_first(self):
+        self.create_product('Leather Bag', self.bags, description="Fits a pair of running shoes.")
+        self.create_product('Running Shoes', self.shoes)
+
+        self.assertEqual(self.search('running shoes'), ['running-shoes', 'leather-bag'])
+
+    def test_matches_stems_and_a_prefix_of_the_last_term(self):
+        self.create_product('Running Shoes', self.shoes)
+
+        self.assertEqual(self.search('run'), ['running-shoes'])
+        self.assertEqual(self.search('shoe'), ['running-shoes'])
+        self.assertEqual(self.search('runs sho'), ['running-shoes'])
+        self.assertEqual(self.search('running boots'), [])
+
+    def test_query_syntax_is_not_interpreted(self):
+        self.create_product('Running Shoes', self.shoes)
+
+        self.assertEqual(self.search('"running" OR NOT (shoes*'), [])
+        self.assertEqual(self.search('running: & shoes!'), ['running-shoes'])
+        self.assertEqual(self.search('  '), [])
+
+    def test_index_follows_product_writes(self):
+        product = self.create_product('Running Shoes', self.shoes)
+        version = index_version()
+
+        product.name = 'Trail Boots'
+        product.save()
+        self.assertEqual(self.search('boots'), ['running-shoes'])
+        self.assertEqual(self.search('running'), [])
+        self.assertNotEqual(index_version(), version)
+
+        self.shoes.name = 'Footwear'
+        self.shoes.save()
+        self.assertEqual(self.search('footwear'), ['running-shoes'])
+
+        product.is_active = False
+        product.save()
+        self.assertEqual(self.search('boots'), [])
+
+        product.is_active = True
+        product.save()
+        product.delete()
+        self.assertFalse(SearchDocument.objects.exists())
+        self.assertEqual(self.search('boots'), [])
+
+    def test_limit_and_offset(self):
+        for i in range(5):
+            self.create_product(f'Shoe {i}', self.shoes)
+
+        self.assertEqual(len(self.search('shoe', limit=2)), 2)
+        self.assertEqual(len(self.search('shoe', limit=2, offset=4)), 1)
+
+    def test_build_search_index(self):
+        products = Product.objects.bulk_create(
+            Product(name=f'Boot {i}', slug=f'boot-{i}', category=self.shoes, category_name='Shoes',
+                    category_slug='shoes', price=Decimal('1.00'), is_active=i != 3)
+            for i in range(7)
+        )
+        self.assertEqual(self.search('boot'), [])
+
+        call_command('build_search_index', batch_size=2, verbosity=0)
+
+        self.assertEqual(SearchDocument.objects.count(), 6)
+        self.assertEqual(len(self.search('boot')), 6)
+        self.assertNotIn('boot-3', self.search('boot'))
+
+        Product.objects.filter(pk=products[0].pk).update(name='Sandal 0')
+        call_command('build_search_index', verbosity=0)
+        self.assertEqual(self.search('sandal'), ['boot-0'])
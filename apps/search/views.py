@@ -0,0 +1,60 @@
+from drf_yasg import openapi
+from drf_yasg.utils import swagger_auto_schema
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from django.conf import settings
+from django.utils.cache import patch_cache_control
+
+from . import backends
+from .autocomplete import autocomplete
+from .serializers import SearchResultSerializer, SuggestionSerializer
+
+
+def int_param(request, name, default, maximum):
+    try:
+        value = int(request.query_params.get(name, default))
+    except ValueError:
+        return default
+    return min(max(value, 0), maximum)
+
+
+class SearchView(APIView):
+    """
+    View to search active products, best match first.
+    """
+    authentication_classes = ()
+
+    @swagger_auto_schema(
+        manual_parameters=[
+            openapi.Parameter('q', openapi.IN_QUERY, description="Search terms.", type=openapi.TYPE_STRING),
+            openapi.Parameter('limit', openapi.IN_QUERY, type=openapi.TYPE_INTEGER),
+            openapi.Parameter('offset', openapi.IN_QUERY, type=openapi.TYPE_INTEGER),
+        ],
+        responses={200: SearchResultSerializer(many=True)}
+    )
+    def get(self, request):
+        limit = int_param(request, 'limit', settings.SEARCH_PAGE_SIZE, settings.SEARCH_MAX_PAGE_SIZE)
+        offset = int_param(request, 'offset', 0, settings.SEARCH_MAX_OFFSET)
+        documents = backends.search(request.query_params.get('q', ''), limit, offset)
+        return Response({'results': SearchResultSerializer(documents, many=True).data})
+
+
+class AutocompleteView(APIView):
+    """
+    View to suggest product names for what the user has typed so far, from the in-memory trie.
+    """
+    authentication_classes = ()
+
+    @swagger_auto_schema(
+        manual_parameters=[
+            openapi.Parameter('q', openapi.IN_QUERY, description="Prefix typed so far.", type=openapi.TYPE_STRING),
+            openapi.Parameter('limit', openapi.IN_QUERY, type=openapi.TYPE_INTEGER),
+        ],
+        responses={200: SuggestionSerializer(many=True)}
+    )
+    def get(self, request):
+        limit = int_param(request, 'limit', settings.AUTOCOMPLETE_LIMIT, settings.AUTOCOMPLETE_LIMIT)
+        suggestions = autocomplete.suggest(request.query_params.get('q', ''), limit)
+        response = Response({'suggestions': [{'name': name, 'slug': slug} for name, slug in suggestions]})
+        patch_cache_control(response, public=True, max_age=settings.AUTOCOMPLETE_REFRESH_SECONDS)
+        return response
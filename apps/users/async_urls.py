@@ -0,0 +1,10 @@
+from django.urls import path
+from . import async_views
+
+app_name = 'users-async'
+urlpatterns = [
+    path('request-code/', async_views.RequestCodeView.as_view(), name='request-code'),
+    path("verify-code/", async_views.CodeVerificationView.as_view(), name='verify-code'),
+    path("sign-up/", async_views.SignUpView.as_view(), name='sign-up'),
+    path("active-user/", async_views.ActiveUserView.as_view(), name='active-user'),
+]
@@ -0,0 +1,194 @@
+"""
+Native async versions of the users auth views, for the ASGI deployment.
+
+DRF's APIView is synchronous, so under ASGI every request to views.py is run
+in a worker thread through sync_to_async. These views are plain Django async
+views instead: they reuse the serializers for validation and the response
+builders from views.py, and do their I/O through the async ORM so the event
+loop is free while a request waits on the database.
+"""
+import json
+import math
+
+from django.http import JsonResponse
+from django.utils import timezone
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import status
+from rest_framework.exceptions import APIException, Throttled
+
+from online_shop.db.routers import afollow_pin, apin_primary
+
+from . import otp, views
+from .authentication import ClaimsJWTAuthentication
+from .models import User
+from .outbox import aenqueue_mail
+from .serializers import EmailSerializer, CodeVerificationSerializer, SignUpSerializer
+from .throttling import EmailWindowThrottle, IPWindowThrottle
+from .views import (
+    code_sent_response_data, login_code_message, login_response_data, new_user_defaults, NEW_USER_UPSERT,
+    signup_response_data,
+)
+
+
+class AsyncAPIView(View):
+    """Base class for the async views: CSRF-exempt like APIView, JSON in and out."""
+    throttle_classes = ()
+    throttle_scope = None
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        return csrf_exempt(super().as_view(**initkwargs))
+
+    def get_data(self, request):
+        """Returns the parsed request body, or None if it is not valid JSON"""
+        if request.content_type == 'application/json':
+            try:
+                return json.loads(request.body or b'{}')
+            except ValueError:
+                return None
+        return request.POST
+
+    def parse_error(self):
+        return JsonResponse({'detail': 'JSON parse error.'}, status=status.HTTP_400_BAD_REQUEST)
+
+    async def check_throttles(self, request, data):
+        """Returns a 429 response if any throttle rejects the request, like APIView.check_throttles"""
+        durations = []
+        for throttle_class in self.throttle_classes:
+            throttle = throttle_class()
+            if not await throttle.aallow_request(request, data, self.throttle_scope):
+                durations.append(throttle.wait())
+        if not durations:
+            return None
+
+        wait = max((d for d in durations if d is not None), default=None)
+        exc = Throttled(wait)
+        headers = {'Retry-After': str(math.ceil(wait))} if wait is not None else {}
+        return JsonResponse({'detail': exc.detail}, status=exc.status_code, headers=headers)
+
+
+class RequestCodeView(AsyncAPIView):
+    throttle_classes = (IPWindowThrottle, EmailWindowThrottle)
+    throttle_scope = 'request_code'
+    query_budget = views.RequestCodeView.query_budget
+
+    async def post(self, request):
+        data = self.get_data(request)
+        if data is None:
+            return self.parse_error()
+
+        throttled = await self.check_throttles(request, data)
+        if throttled is not None:
+            return throttled
+
+        serializer = EmailSerializer(data=data)
+        if serializer.is_valid():
+            email = serializer.validated_data['email']
+            now = timezone.now()
+
+            await User.objects.abulk_create([User(email=email, **new_user_defaults(email, now))], **NEW_USER_UPSERT)
+
+            code = await otp.aissue_code(email)
+            await apin_primary(email)
+
+            await aenqueue_mail(*login_code_message(email, code))
+
+            return JsonResponse(code_sent_response_data(request), status=status.HTTP_201_CREATED)
+
+        return JsonResponse(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+class CodeVerificationView(AsyncAPIView):
+    throttle_classes = (IPWindowThrottle, EmailWindowThrottle)
+    throttle_scope = 'verify_code'
+    query_budget = views.CodeVerificationView.query_budget
+
+    async def post(self, request):
+        data = self.get_data(request)
+        if data is None:
+            return self.parse_error()
+
+        throttled = await self.check_throttles(request, data)
+        if throttled is not None:
+            return throttled
+
+        serializer = CodeVerificationSerializer(data=data)
+        if serializer.is_valid():
+            email = serializer.validated_data['email']
+            code = serializer.validated_data['code']
+            await afollow_pin(email)
+
+            try:
+                user = await User.objects.aget(email=email)
+            except User.DoesNotExist:
+                return JsonResponse({"error": "Invalid email or code."}, status=status.HTTP_400_BAD_REQUEST)
+
+            result = await otp.averify_code(email, code)
+            if result == otp.EXPIRED:
+                return JsonResponse({'error': 'The code has expired. Please request a new code.'},
+                                    status=status.HTTP_400_BAD_REQUEST)
+
+            if result == otp.VALID:
+                if user.is_active:
+                    return JsonResponse(login_response_data(request, user), status=status.HTTP_302_FOUND)
+                else:
+                    return JsonResponse(signup_response_data(request), status=status.HTTP_200_OK)
+            else:
+                return JsonResponse({'error': 'Invalid email or code.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        return JsonResponse(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+class SignUpView(AsyncAPIView):
+    query_budget = views.SignUpView.query_budget
+
+    async def post(self, request):
+        data = self.get_data(request)
+        if data is None:
+            return self.parse_error()
+
+        email = data.get('email')
+        await afollow_pin(email)
+        try:
+            user = await User.objects.aget(email=email)
+        except User.DoesNotExist:
+            return JsonResponse({'error': 'User does not exist.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        if user.is_active:
+            return JsonResponse({'error': 'User is already active.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        serializer = SignUpSerializer(user, data=data)
+        if serializer.is_valid():
+            if not await User.objects.aactivate(user, **serializer.validated_data):
+                return JsonResponse({'error': 'User is already active.'}, status=status.HTTP_400_BAD_REQUEST)
+
+            return JsonResponse(login_response_data(request, user), status=status.HTTP_200_OK)
+        return JsonResponse(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+class ActiveUserView(AsyncAPIView):
+    authentication = ClaimsJWTAuthentication()
+    query_budget = views.ActiveUserView.query_budget
+
+    async def get(self, request):
+        try:
+            authenticated = await self.authentication.aauthenticate(request)
+        except APIException as e:
+            return JsonResponse(
+                e.detail if isinstance(e.detail, dict) else {'detail': e.detail},
+                status=e.status_code,
+                headers={'WWW-Authenticate': self.authentication.authenticate_header(request)},
+            )
+        if authenticated is None:
+            return JsonResponse(
+                {'detail': 'Authentication credentials were not provided.'},
+                status=status.HTTP_401_UNAUTHORIZED,
+                headers={'WWW-Authenticate': self.authentication.authenticate_header(request)},
+            )
+
+        user, _ = authenticated
+        if user.is_active:
+            return JsonResponse({'message': f'User {user.email} is active.'}, status=status.HTTP_200_OK)
+        else:
+            return JsonResponse({'message': f'User {user.email} is not active.'}, status=status.HTTP_403_FORBIDDEN)
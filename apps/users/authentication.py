@@ -0,0 +1,85 @@
+from django.utils.functional import cached_property
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication, JWTStatelessUserAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+
+from .tokens import REVOKED, VERSION_CLAIM, aget_token_version, get_token_version
+
+
+class ClaimsTokenUser(TokenUser):
+    """A TokenUser that also exposes the email and active flag embedded by UserRefreshToken"""
+
+    def __str__(self):
+        return self.email
+
+    @cached_property
+    def email(self):
+        return self.token.get('email', '')
+
+    @cached_property
+    def is_active(self):
+        return self.token.get('is_active', True)
+
+
+class ClaimsJWTAuthentication(JWTStatelessUserAuthentication):
+    """
+    Authenticates from the token's claims instead of loading the user row.
+
+    The only per-request lookup is the user's token version, normally a cache
+    hit. Tokens minted without a version claim fall back to the regular
+    database-backed JWTAuthentication.
+    """
+
+    def get_user(self, validated_token):
+        if VERSION_CLAIM not in validated_token:
+            return JWTAuthentication.get_user(self, validated_token)
+
+        user = super().get_user(validated_token)
+        self.check_version(validated_token, get_token_version(user.id))
+        return user
+
+    def check_version(self, validated_token, current_version):
+        if current_version == REVOKED or not validated_token.get('is_active', True):
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        if validated_token[VERSION_CLAIM] != current_version:
+            raise AuthenticationFailed(_("Token has been revoked"), code="token_revoked")
+
+    async def aauthenticate(self, request):
+        """authenticate() for the async views, which run outside DRF's request cycle"""
+        header = self.get_header(request)
+        if header is None:
+            return None
+
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+
+        validated_token = self.get_validated_token(raw_token)
+
+        return await self.aget_user(validated_token), validated_token
+
+    async def aget_user(self, validated_token):
+        if VERSION_CLAIM not in validated_token:
+            return await self._aget_db_user(validated_token)
+
+        user = super().get_user(validated_token)
+        self.check_version(validated_token, await aget_token_version(user.id))
+        return user
+
+    async def _aget_db_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        try:
+            user = await self.user_model.objects.aget(**{api_settings.USER_ID_FIELD: user_id})
+        except self.user_model.DoesNotExist:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+
+        if not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        return user
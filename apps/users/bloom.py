@@ -0,0 +1,96 @@
+"""
+A Bloom filter over any writable or read-only byte buffer.
+
+The buffer can be a bytearray for in-memory filters or an mmap for filters
+kept on disk. Positions are derived from one BLAKE2b digest with double
+hashing, so each lookup costs a single hash regardless of `num_hashes`.
+
+On disk a filter is a fixed header followed by the bit array. `open()` maps
+the file read-only, so every process using it shares the same page-cache
+pages and only the pages a lookup touches are ever read.
+"""
+import hashlib
+import math
+import mmap
+import struct
+
+MAGIC = b'OSBLOOM1'
+# magic, num_hashes, flags, num_bits, items
+HEADER = struct.Struct('<8sIIQQ')
+
+
+def optimal_parameters(capacity, error_rate):
+    """Returns (num_bits, num_hashes) for `capacity` items at the given false-positive rate"""
+    num_bits = math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2))
+    num_bits = max(8, (num_bits + 7) // 8 * 8)
+    num_hashes = max(1, round(num_bits / capacity * math.log(2)))
+    return num_bits, num_hashes
+
+
+class BloomFilter:
+    def __init__(self, num_bits, num_hashes, buffer=None):
+        self.num_bits = num_bits
+        self.num_hashes = num_hashes
+        self.bits = buffer if buffer is not None else bytearray(num_bits // 8)
+        # Set for file-backed filters: free-form flags stored in the header, and the item count.
+        self.flags = 0
+        self.items = 0
+        self._mmap = None
+
+    @classmethod
+    def for_capacity(cls, capacity, error_rate):
+        return cls(*optimal_parameters(capacity, error_rate))
+
+    @classmethod
+    def create(cls, path, num_bits, num_hashes, flags=0):
+        """Creates an empty filter file at `path` and returns it mapped for writing"""
+        with open(path, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, num_hashes, flags, num_bits, 0))
+            f.truncate(HEADER.size + num_bits // 8)
+        return cls.open(path, writable=True)
+
+    @classmethod
+    def open(cls, path, writable=False):
+        """Maps the filter file at `path`; raises ValueError if it is not one"""
+        with open(path, 'r+b' if writable else 'rb') as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ)
+        if len(mapped) < HEADER.size:
+            mapped.close()
+            raise ValueError(f"{path} is not a Bloom filter file.")
+        magic, num_hashes, flags, num_bits, items = HEADER.unpack_from(mapped)
+        if magic != MAGIC or len(mapped) != HEADER.size + num_bits // 8:
+            mapped.close()
+            raise ValueError(f"{path} is not a Bloom filter file.")
+        bloom = cls(num_bits, num_hashes, memoryview(mapped)[HEADER.size:])
+        bloom.flags = flags
+        bloom.items = items
+        bloom._mmap = mapped
+        return bloom
+
+    def flush(self):
+        """Writes the item count into the header and syncs a writable filter file"""
+        HEADER.pack_into(self._mmap, 0, MAGIC, self.num_hashes, self.flags, self.num_bits, self.items)
+        self._mmap.flush()
+
+    def close(self):
+        if self._mmap is not None:
+            self.bits.release()
+            self._mmap.close()
+            self._mmap = None
+
+    def _positions(self, item):
+        if isinstance(item, str):
+            item = item.encode()
+        digest = hashlib.blake2b(item, digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return ((h1 + i * h2) % self.num_bits for i in range(self.num_hashes))
+
+    def add(self, item):
+        bits = self.bits
+        for position in self._positions(item):
+            bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, item):
+        bits = self.bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
@@ -0,0 +1,42 @@
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+from django.utils.module_loading import import_string
+
+from online_shop.cache import LockingFileBasedCache, TwoTierCache
+
+# Backends whose add() and incr() are atomic for every process that shares them
+ATOMIC_COUNTER_BACKENDS = (
+    'django.core.cache.backends.redis.RedisCache',
+    'django.core.cache.backends.memcached.PyMemcacheCache',
+    'django.core.cache.backends.memcached.PyLibMCCache',
+    'django.core.cache.backends.locmem.LocMemCache',
+    LockingFileBasedCache,
+)
+
+
+def counter_backend(alias='default'):
+    """Returns the backend class that counts for cache `alias`, looking through a TwoTierCache"""
+    config = settings.CACHES[alias]
+    backend = import_string(config['BACKEND'])
+    if issubclass(backend, TwoTierCache):
+        return counter_backend(config.get('OPTIONS', {}).get('SHARED', 'shared'))
+    return backend
+
+
+@register(Tags.caches)
+def check_throttle_cache(app_configs, **kwargs):
+    """Throttle counts are only exact when the default cache increments atomically"""
+    if not settings.REST_FRAMEWORK.get('DEFAULT_THROTTLE_RATES'):
+        return []
+    backend = counter_backend()
+    atomic = tuple(
+        import_string(path) if isinstance(path, str) else path for path in ATOMIC_COUNTER_BACKENDS
+    )
+    if issubclass(backend, atomic):
+        return []
+    return [Error(
+        f"{backend.__module__}.{backend.__qualname__} does not increment atomically, so concurrent "
+        "requests would get past the login-code throttles.",
+        hint="Set CACHE_URL to redis://, file:// (one host) or locmem:// (one process).",
+        id='users.E001',
+    )]
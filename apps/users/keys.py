@@ -0,0 +1,239 @@
+"""
+Asymmetric JWT signing keys, and the key set that publishes them.
+
+With JWT_ALGORITHM set to EdDSA or RS256, tokens are signed with a private
+key from JWT_KEYS_DIR and name it in their `kid` header. Other services
+verify them offline against the public keys at /.well-known/jwks.json,
+without sharing a secret or calling this service. With the default HS256,
+tokens are signed with SECRET_KEY as before and the key set is empty.
+
+Each key is a PEM file named `<kid>.pem`, and a kid starts with the time
+the key becomes active: `20261019T120000Z-<thumbprint>`. Tokens are signed
+with the newest active key. A key is published as soon as its file exists,
+and rotate_signing_keys schedules new keys further ahead than JWKS_MAX_AGE,
+so every service has cached a key before the first token signed with it.
+A key superseded for longer than the refresh token lifetime signs no live
+token any more; rotate_signing_keys deletes it, which unpublishes it.
+
+Each process loads the directory once and keeps the serialized key set in
+memory, rechecking the directory's mtime every JWT_KEYS_RELOAD_SECONDS.
+"""
+import base64
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import datetime, timezone as dt_timezone
+from pathlib import Path
+
+import jwt
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ed25519, rsa
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.translation import gettext_lazy as _
+from jwt.algorithms import get_default_algorithms
+from rest_framework_simplejwt.backends import TokenBackend
+from rest_framework_simplejwt.exceptions import TokenBackendError
+from rest_framework_simplejwt.settings import api_settings
+
+ASYMMETRIC_ALGORITHMS = ('EdDSA', 'RS256')
+
+ACTIVATION_FORMAT = '%Y%m%dT%H%M%SZ'
+
+RSA_KEY_SIZE = 3072
+
+
+def generate_private_key(algorithm):
+    if algorithm == 'EdDSA':
+        return ed25519.Ed25519PrivateKey.generate()
+    if algorithm == 'RS256':
+        return rsa.generate_private_key(public_exponent=65537, key_size=RSA_KEY_SIZE)
+    raise ValueError(f"Not an asymmetric algorithm: {algorithm}")
+
+
+def algorithm_of(private_key):
+    return 'EdDSA' if isinstance(private_key, ed25519.Ed25519PrivateKey) else 'RS256'
+
+
+def public_jwk(algorithm, public_key):
+    return get_default_algorithms()[algorithm].to_jwk(public_key, as_dict=True)
+
+
+def thumbprint(jwk):
+    """The RFC 7638 thumbprint of a public key, base64url"""
+    members = {name: jwk[name] for name in ('crv', 'e', 'kty', 'n', 'x') if name in jwk}
+    digest = hashlib.sha256(json.dumps(members, sort_keys=True, separators=(',', ':')).encode()).digest()
+    return base64.urlsafe_b64encode(digest).rstrip(b'=').decode()
+
+
+class SigningKey:
+    def __init__(self, kid, private_key):
+        self.kid = kid
+        self.private_key = private_key
+        self.public_key = private_key.public_key()
+        self.algorithm = algorithm_of(private_key)
+        self.activates_at = datetime.strptime(kid.partition('-')[0], ACTIVATION_FORMAT).replace(tzinfo=dt_timezone.utc)
+
+    @property
+    def jwk(self):
+        return {**public_jwk(self.algorithm, self.public_key), 'kid': self.kid, 'alg': self.algorithm, 'use': 'sig'}
+
+
+def write_key(directory, algorithm, activates_at):
+    """Creates a key that signs from `activates_at` on and returns its kid"""
+    private_key = generate_private_key(algorithm)
+    jwk = public_jwk(algorithm, private_key.public_key())
+    kid = f'{activates_at.astimezone(dt_timezone.utc):{ACTIVATION_FORMAT}}-{thumbprint(jwk)[:16]}'
+    pem = private_key.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption(),
+    )
+    directory = Path(directory)
+    directory.mkdir(mode=0o700, parents=True, exist_ok=True)
+    # Written aside and renamed, so a process reloading the directory never reads half a key.
+    partial = directory / f'.{kid}.partial'
+    fd = os.open(partial, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, 'wb') as f:
+        f.write(pem)
+    os.replace(partial, directory / f'{kid}.pem')
+    return kid
+
+
+def load_keys(directory):
+    """Returns the keys in `directory`, oldest activation first"""
+    keys = []
+    for path in sorted(Path(directory).glob('*.pem')):
+        private_key = serialization.load_pem_private_key(path.read_bytes(), password=None)
+        keys.append(SigningKey(path.stem, private_key))
+    return keys
+
+
+def retired_keys(keys, now, lifetime):
+    """Returns the keys superseded by one active for longer than `lifetime`: no live token is signed with them"""
+    active = [key for key in keys if key.activates_at <= now]
+    return [key for key, successor in zip(active, active[1:]) if successor.activates_at + lifetime <= now]
+
+
+def key_set_document(keys):
+    """Returns the JWKS body and its ETag"""
+    body = json.dumps({'keys': [key.jwk for key in keys]}, separators=(',', ':')).encode()
+    return body, '"%s"' % hashlib.md5(body).hexdigest()
+
+
+EMPTY_KEY_SET = key_set_document([])
+
+
+class KeyRing:
+    """The keys of one directory, as loaded by this process"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.lock = threading.Lock()
+        self.checked_at = None
+        self.mtime = None
+        self.keys = []
+        self.by_kid = {}
+        self.key_set = EMPTY_KEY_SET
+
+    def refresh(self):
+        now = time.monotonic()
+        if self.checked_at is not None and now - self.checked_at < settings.JWT_KEYS_RELOAD_SECONDS:
+            return
+        with self.lock:
+            if self.checked_at is not None and now - self.checked_at < settings.JWT_KEYS_RELOAD_SECONDS:
+                return
+            try:
+                mtime = os.stat(self.directory).st_mtime_ns
+            except FileNotFoundError:
+                mtime = None
+            if mtime != self.mtime:
+                keys = load_keys(self.directory) if mtime is not None else []
+                self.keys, self.by_kid = keys, {key.kid: key for key in keys}
+                self.key_set = key_set_document(keys)
+                self.mtime = mtime
+            self.checked_at = now
+
+    def signing_key(self):
+        """Returns the newest key that is active"""
+        self.refresh()
+        now = datetime.now(dt_timezone.utc)
+        active = [key for key in self.keys if key.activates_at <= now]
+        if not active:
+            raise ImproperlyConfigured(
+                f"No active JWT signing key in {self.directory}; run `manage.py rotate_signing_keys --activate-in 0`."
+            )
+        return active[-1]
+
+    def verifying_key(self, kid):
+        self.refresh()
+        return self.by_kid.get(kid)
+
+
+class KeyRingTokenBackend(TokenBackend):
+    """Signs with the key ring's current key, naming it in the `kid` header, and verifies with the key named"""
+
+    def __init__(self, ring):
+        self.ring = ring
+        super().__init__(
+            settings.JWT_ALGORITHM, audience=api_settings.AUDIENCE, issuer=api_settings.ISSUER,
+            leeway=api_settings.LEEWAY, json_encoder=api_settings.JSON_ENCODER,
+        )
+
+    def _validate_algorithm(self, algorithm):
+        if algorithm not in ASYMMETRIC_ALGORITHMS:
+            raise TokenBackendError(_("Unrecognized algorithm type '{}'").format(algorithm))
+
+    def encode(self, payload):
+        key = self.ring.signing_key()
+        jwt_payload = payload.copy()
+        if self.audience is not None:
+            jwt_payload['aud'] = self.audience
+        if self.issuer is not None:
+            jwt_payload['iss'] = self.issuer
+        return jwt.encode(
+            jwt_payload, key.private_key, algorithm=key.algorithm, headers={'kid': key.kid},
+            json_encoder=self.json_encoder,
+        )
+
+    def decode(self, token, verify=True):
+        try:
+            if verify:
+                key = self.ring.verifying_key(jwt.get_unverified_header(token).get('kid'))
+                if key is None:
+                    raise jwt.InvalidTokenError("Unknown key")
+                verifying_key, algorithms = key.public_key, [key.algorithm]
+            else:
+                verifying_key, algorithms = None, list(ASYMMETRIC_ALGORITHMS)
+            return jwt.decode(
+                token, verifying_key, algorithms=algorithms, audience=self.audience, issuer=self.issuer,
+                leeway=self.get_leeway(),
+                options={'verify_aud': self.audience is not None, 'verify_signature': verify},
+            )
+        except jwt.InvalidTokenError as ex:
+            raise TokenBackendError(_("Token is invalid or expired")) from ex
+
+
+_backends = {}
+_backends_lock = threading.Lock()
+
+
+def token_backend():
+    """Returns the backend tokens are signed and verified with"""
+    if settings.JWT_ALGORITHM not in ASYMMETRIC_ALGORITHMS:
+        from rest_framework_simplejwt.state import token_backend
+        return token_backend
+    key = (str(settings.JWT_KEYS_DIR), settings.JWT_ALGORITHM)
+    with _backends_lock:
+        if key not in _backends:
+            _backends[key] = KeyRingTokenBackend(KeyRing(key[0]))
+        return _backends[key]
+
+
+def key_set():
+    """Returns the JWKS body and ETag of the public keys; empty when tokens are signed with SECRET_KEY"""
+    if settings.JWT_ALGORITHM not in ASYMMETRIC_ALGORITHMS:
+        return EMPTY_KEY_SET
+    ring = token_backend().ring
+    ring.refresh()
+    return ring.key_set
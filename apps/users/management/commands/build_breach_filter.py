@@ -0,0 +1,75 @@
+import gzip
+import os
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.users.bloom import BloomFilter, optimal_parameters
+from apps.users.validators import SHA1_KEYS
+
+
+class Command(BaseCommand):
+    help = (
+        "Builds the breached-password Bloom filter used by BreachedPasswordValidator "
+        "from local corpus files, streaming them so the corpus never has to fit in memory."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='+', help="Corpus files; .gz files are decompressed on the fly.")
+        parser.add_argument('--format', choices=['plain', 'sha1'], default='plain',
+                            help="plain: one password per line. sha1: `SHA1:count` lines, "
+                                 "as in the Have I Been Pwned password dumps.")
+        parser.add_argument('--output', default=str(settings.BREACH_FILTER_PATH))
+        parser.add_argument('--capacity', type=int,
+                            help="Expected number of entries. Defaults to counting the corpus lines first.")
+        parser.add_argument('--error-rate', type=float, default=settings.BREACH_FILTER_ERROR_RATE)
+
+    def handle(self, *args, **options):
+        paths = options['paths']
+        for path in paths:
+            if not os.path.exists(path):
+                raise CommandError(f"{path} does not exist.")
+
+        capacity = options['capacity'] or sum(1 for path in paths for _ in self.read_lines(path))
+        num_bits, num_hashes = optimal_parameters(max(capacity, 1), options['error_rate'])
+        self.stdout.write(f"Sizing for {capacity} entries: {num_bits // 8 // 2 ** 20} MiB, {num_hashes} hashes.")
+
+        output = options['output']
+        os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+        tmp = f'{output}.tmp'
+        sha1 = options['format'] == 'sha1'
+        bloom = BloomFilter.create(tmp, num_bits, num_hashes, flags=SHA1_KEYS if sha1 else 0)
+        started = time.monotonic()
+        try:
+            for path in paths:
+                for line in self.read_lines(path):
+                    key = self.parse(line, sha1)
+                    if key is None:
+                        continue
+                    bloom.add(key)
+                    bloom.items += 1
+                    if bloom.items % 1_000_000 == 0:
+                        self.stdout.write(f"{bloom.items} entries, {bloom.items / (time.monotonic() - started):.0f}/s")
+            bloom.flush()
+        finally:
+            bloom.close()
+        # Running workers keep their mapping of the previous file until they restart.
+        os.replace(tmp, output)
+
+        if bloom.items > capacity:
+            self.stderr.write(f"{bloom.items} entries exceed the capacity of {capacity}; "
+                              f"the false-positive rate is higher than {options['error_rate']}.")
+        self.stdout.write(f"Wrote {bloom.items} entries to {output}.")
+
+    def read_lines(self, path):
+        opener = gzip.open if path.endswith('.gz') else open
+        with opener(path, 'rb') as f:
+            yield from f
+
+    def parse(self, line, sha1):
+        line = line.rstrip(b'\r\n')
+        if sha1:
+            digest = line.split(b':', 1)[0].strip().upper()
+            return digest if len(digest) == 40 else None
+        return line or None
@@ -0,0 +1,55 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.users.export import EXPORT_FIELDS, UserExport, format_watermark, gzip_chunks
+from apps.users.serializers import UserExportSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        "Streams accounts, oldest first, as CSV or JSONL to a file or stdout. Prints the watermark "
+        "to pass as --after next time to export only newer accounts."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', choices=('csv', 'jsonl'), default='csv')
+        parser.add_argument('--fields', help="Comma-separated fields to export; all by default.")
+        parser.add_argument('--after', help="Watermark: export accounts after this `<date_joined>,<id>`.")
+        parser.add_argument('--joined-after', help="Joined at or after, ISO 8601.")
+        parser.add_argument('--joined-before', help="Joined before, ISO 8601.")
+        parser.add_argument('--active', dest='is_active', action='store_true', default=None)
+        parser.add_argument('--inactive', dest='is_active', action='store_false')
+        parser.add_argument('--gzip', action='store_true', help="Compress the output.")
+        parser.add_argument('--file', help="Write to this file instead of stdout.")
+        parser.add_argument('--database', help="Read from this database; EXPORT_DATABASE by default.")
+
+    def handle(self, *args, **options):
+        params = {
+            name: options[name] for name in ('output', 'fields', 'after', 'joined_after', 'joined_before', 'is_active')
+            if options[name] is not None
+        }
+        serializer = UserExportSerializer(data=params)
+        if not serializer.is_valid():
+            raise CommandError(serializer.errors)
+        params = serializer.validated_data
+        output = params.pop('output')
+        export = UserExport(**{'fields': EXPORT_FIELDS, **params}, using=options['database'])
+
+        chunks = export.chunks(output)
+        if options['gzip']:
+            chunks = gzip_chunks(chunks)
+        out = open(options['file'], 'wb') if options['file'] else sys.stdout.buffer
+        try:
+            for chunk in chunks:
+                out.write(chunk)
+        finally:
+            if options['file']:
+                out.close()
+            else:
+                out.flush()
+
+        watermark = format_watermark(export.watermark) if export.watermark else options['after']
+        self.stderr.write(f"Exported {export.exported} accounts.")
+        if watermark:
+            self.stderr.write(f"Next incremental export: --after {watermark}")
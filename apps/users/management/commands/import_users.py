@@ -0,0 +1,145 @@
+import csv
+import gzip
+import io
+import itertools
+import json
+import os
+import time
+
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.core.validators import validate_email
+from django.db import transaction
+
+from apps.users.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        "Imports users from a CSV or JSON Lines file with `email` and optional "
+        "`first_name`/`last_name` columns. Rows are streamed and inserted with "
+        "bulk_create in batches; imported users get unusable passwords and log in "
+        "through the email code flow."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Input file; .gz files are decompressed on the fly.")
+        parser.add_argument('--format', choices=['csv', 'jsonl'],
+                            help="Input format. Defaults to the file extension.")
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--checkpoint',
+                            help="File recording progress after each batch, used to resume a failed import.")
+        parser.add_argument('--inactive', action='store_true',
+                            help="Import users as inactive so they go through sign-up on first login.")
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if not os.path.exists(path):
+            raise CommandError(f"{path} does not exist.")
+        fmt = options['format'] or self.guess_format(path)
+        checkpoint = options['checkpoint']
+
+        done = self.read_checkpoint(checkpoint, path)
+        if done:
+            self.stdout.write(f"Resuming after row {done}.")
+
+        read = done
+        created = invalid = 0
+        started = time.monotonic()
+        with self.open(path) as stream:
+            rows = itertools.islice(self.read_rows(stream, fmt), done, None)
+            while True:
+                batch = list(itertools.islice(rows, options['batch_size']))
+                if not batch:
+                    break
+                users, skipped = self.build_users(batch, is_active=not options['inactive'])
+                with transaction.atomic():
+                    created += self.insert(users)
+                read += len(batch)
+                invalid += skipped
+                self.write_checkpoint(checkpoint, path, read)
+
+                elapsed = time.monotonic() - started
+                self.stdout.write(
+                    f"{read} rows read, {created} created, {invalid} invalid "
+                    f"({(read - done) / elapsed:.0f} rows/s)"
+                )
+
+        if checkpoint and os.path.exists(checkpoint):
+            os.remove(checkpoint)
+        self.stdout.write(self.style.SUCCESS(f"Imported {created} users from {read} rows."))
+
+    def guess_format(self, path):
+        name = path[:-3] if path.endswith('.gz') else path
+        if name.endswith('.jsonl') or name.endswith('.ndjson'):
+            return 'jsonl'
+        if name.endswith('.csv'):
+            return 'csv'
+        raise CommandError("Cannot tell the input format from the file name, pass --format.")
+
+    def open(self, path):
+        if path.endswith('.gz'):
+            return io.TextIOWrapper(gzip.open(path), encoding='utf-8', newline='')
+        return open(path, encoding='utf-8', newline='')
+
+    def read_rows(self, stream, fmt):
+        if fmt == 'csv':
+            yield from csv.DictReader(stream)
+            return
+        for line in stream:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                row = None
+            yield row if isinstance(row, dict) else {}
+
+    def build_users(self, batch, is_active):
+        """Returns the valid, de-duplicated User instances of a batch and the number of invalid rows"""
+        users = {}
+        invalid = 0
+        for row in batch:
+            email = User.objects.normalize_email(str(row.get('email') or '').strip())
+            try:
+                validate_email(email)
+            except ValidationError:
+                invalid += 1
+                continue
+            users.setdefault(email, User(
+                email=email,
+                username=email,
+                first_name=str(row.get('first_name') or '')[:50],
+                last_name=str(row.get('last_name') or '')[:50],
+                password=make_password(None),
+                is_active=is_active,
+            ))
+        return users, invalid
+
+    def insert(self, users):
+        """Inserts the users whose email is not taken yet and returns how many that was"""
+        existing = set(User.objects.filter(email__in=users).values_list('email', flat=True))
+        new = [user for email, user in users.items() if email not in existing]
+        # ignore_conflicts covers rows inserted concurrently since the lookup above, and
+        # rows whose username is taken. It drops them silently, so count what is there now.
+        User.objects.bulk_create(new, ignore_conflicts=True)
+        return User.objects.filter(email__in=[user.email for user in new]).count() if new else 0
+
+    def read_checkpoint(self, checkpoint, path):
+        if not checkpoint or not os.path.exists(checkpoint):
+            return 0
+        with open(checkpoint) as f:
+            state = json.load(f)
+        if state.get('source') != os.path.abspath(path):
+            raise CommandError(f"Checkpoint {checkpoint} belongs to {state.get('source')}.")
+        return state['rows']
+
+    def write_checkpoint(self, checkpoint, path, rows):
+        if not checkpoint:
+            return
+        tmp = f'{checkpoint}.tmp'
+        with open(tmp, 'w') as f:
+            json.dump({'source': os.path.abspath(path), 'rows': rows}, f)
+        os.replace(tmp, checkpoint)
@@ -0,0 +1,40 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.users.models import OneTimeCode, OutboundEmail, RevokedToken
+
+
+def sweepers():
+    """Returns (description, purge function) pairs; each function deletes expired rows and returns how many"""
+    return [
+        ('expired login codes', OneTimeCode.objects.purge_expired),
+        ('sent emails', OutboundEmail.objects.purge_sent),
+        ('expired token revocations', RevokedToken.objects.purge_expired),
+    ]
+
+
+class Command(BaseCommand):
+    help = (
+        "Deletes rows that have expired: login codes, sent emails and token revocations. "
+        "Run it as a worker, or with --once from cron."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=300.0,
+                            help="Seconds to sleep between sweeps.")
+        parser.add_argument('--once', action='store_true',
+                            help="Sweep once and exit.")
+
+    def handle(self, *args, **options):
+        try:
+            while True:
+                for description, purge in sweepers():
+                    deleted = purge()
+                    if deleted:
+                        self.stdout.write(f"Deleted {deleted} {description}.")
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,37 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from apps.users.models import User
+
+
+class Command(BaseCommand):
+    help = "Deletes accounts whose sign-up was abandoned, and their pending codes, in small batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=settings.STALE_SIGNUP_BATCH_SIZE)
+        parser.add_argument('--pause', type=float, default=0.5,
+                            help="Seconds to sleep between batches, to leave room for other writers.")
+        parser.add_argument('--interval', type=float, default=300.0,
+                            help="Seconds to sleep once no stale account is left.")
+        parser.add_argument('--once', action='store_true',
+                            help="Purge what is currently stale and exit.")
+
+    def handle(self, *args, **options):
+        while True:
+            before = timezone.now() - settings.STALE_SIGNUP_AGE
+            total, after = 0, None
+            while True:
+                deleted, after = User.objects.purge_stale_signups(before, options['batch_size'], after)
+                total += deleted
+                if after is None:
+                    break
+                time.sleep(options['pause'])
+
+            if total:
+                self.stdout.write(f"Deleted {total} stale sign-ups.")
+            if options['once']:
+                break
+            time.sleep(options['interval'])
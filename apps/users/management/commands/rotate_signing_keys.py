@@ -0,0 +1,43 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.users.keys import ASYMMETRIC_ALGORITHMS, load_keys, retired_keys, write_key
+
+
+class Command(BaseCommand):
+    help = (
+        "Adds a JWT signing key that becomes active after --activate-in seconds, and deletes keys "
+        "that no live token is signed with. Run it on a schedule, e.g. weekly; run it once with "
+        "--activate-in 0 to create the first key."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--algorithm', choices=ASYMMETRIC_ALGORITHMS,
+                            default=settings.JWT_ALGORITHM if settings.JWT_ALGORITHM in ASYMMETRIC_ALGORITHMS
+                            else 'EdDSA')
+        parser.add_argument('--activate-in', type=float, default=2 * settings.JWKS_MAX_AGE,
+                            help="Seconds until the new key signs. Must exceed JWKS_MAX_AGE, so every service "
+                                 "has fetched the key before it sees a token signed with it.")
+        parser.add_argument('--keep-retired', action='store_true', help="Do not delete retired keys.")
+
+    def handle(self, *args, **options):
+        directory = Path(settings.JWT_KEYS_DIR)
+        keys = load_keys(directory) if directory.exists() else []
+        if keys and options['activate_in'] < settings.JWKS_MAX_AGE:
+            raise CommandError(
+                f"--activate-in must be at least JWKS_MAX_AGE ({settings.JWKS_MAX_AGE}s) once keys exist; "
+                "services would reject tokens signed with a key they have not fetched yet."
+            )
+
+        now = datetime.now(dt_timezone.utc).replace(microsecond=0)
+        kid = write_key(directory, options['algorithm'], now + timedelta(seconds=options['activate_in']))
+        self.stdout.write(f"Added key {kid}.")
+
+        if options['keep_retired']:
+            return
+        for key in retired_keys(keys, now, settings.SIMPLE_JWT['REFRESH_TOKEN_LIFETIME']):
+            (directory / f'{key.kid}.pem').unlink()
+            self.stdout.write(f"Deleted retired key {key.kid}.")
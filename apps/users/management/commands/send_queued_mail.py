@@ -0,0 +1,44 @@
+import time
+
+from django.conf import settings
+from django.core.mail import get_connection
+from django.core.management.base import BaseCommand
+
+from apps.users.outbox import drain_outbox
+
+
+class Command(BaseCommand):
+    help = "Sends queued outbound emails over a single persistent mail connection."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=settings.OUTBOX_BATCH_SIZE)
+        parser.add_argument('--interval', type=float, default=5.0,
+                            help="Seconds to sleep when the outbox is empty.")
+        parser.add_argument('--once', action='store_true',
+                            help="Drain what is currently due and exit.")
+
+    def handle(self, *args, **options):
+        connection = get_connection()
+        try:
+            while True:
+                try:
+                    sent, failed = drain_outbox(options['batch_size'], connection=connection)
+                except Exception as e:
+                    if options['once']:
+                        raise
+                    # Relay unreachable or the session dropped: back off and reconnect.
+                    self.stderr.write(f"Outbox batch failed: {e!r}")
+                    connection.close()
+                    time.sleep(options['interval'])
+                    continue
+
+                if sent or failed:
+                    self.stdout.write(f"Sent {sent}, failed {failed}.")
+                elif options['once']:
+                    break
+                else:
+                    time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+        finally:
+            connection.close()
@@ -0,0 +1,26 @@
+# Generated by Django 5.1 on 2026-10-18 04:56
+
+from django.db import migrations, models
+
+from online_shop.db.operations import AddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+    # The indexes are built concurrently, which PostgreSQL cannot do inside a transaction.
+    atomic = False
+
+    dependencies = [
+        ("auth", "0012_alter_user_first_name_max_length"),
+        ("users", "0006_revokedtoken"),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name="user",
+            index=models.Index(
+                condition=models.Q(("is_active", False)),
+                fields=["code_created_at", "id"],
+                name="users_stale_signup_idx",
+            ),
+        ),
+    ]
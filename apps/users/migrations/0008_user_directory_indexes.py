@@ -0,0 +1,31 @@
+# Generated by Django 5.1 on 2026-10-18 05:15
+
+from django.db import migrations, models
+
+from online_shop.db.operations import AddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+    # The indexes are built concurrently, which PostgreSQL cannot do inside a transaction.
+    atomic = False
+
+    dependencies = [
+        ("auth", "0012_alter_user_first_name_max_length"),
+        ("users", "0007_user_stale_signup_index"),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name="user",
+            index=models.Index(
+                fields=["date_joined", "id"], name="users_date_joined_idx"
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="user",
+            index=models.Index(
+                fields=["is_active", "date_joined", "id"],
+                name="users_active_joined_idx",
+            ),
+        ),
+    ]
@@ -1,6 +1,8 @@
+from django.conf import settings
 from django.contrib.auth.models import AbstractUser, BaseUserManager
 from django.core.exceptions import ValidationError
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Q
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
@@ -36,6 +38,85 @@ class CustomUserManager(BaseUserManager):
 
         return self.create_user(email, password, **extra_fields)
 
+    def activate(self, user, **fields):
+        """
+        Sets `fields` and activates `user` in one UPDATE that only matches an
+        inactive account; completing sign-up also counts as its first login.
+        Returns False, changing nothing, if it was already active. The cached
+        token version, REVOKED while the account was inactive, is dropped.
+        """
+        from .tokens import forget_token_version
+
+        fields = {'is_active': True, 'last_login': timezone.now(), **fields}
+        activated = self.filter(pk=user.pk, is_active=False).update(**fields)
+        if activated:
+            forget_token_version(user.pk)
+            for name, value in fields.items():
+                setattr(user, name, value)
+        return bool(activated)
+
+    async def aactivate(self, user, **fields):
+        from .tokens import aforget_token_version
+
+        fields = {'is_active': True, 'last_login': timezone.now(), **fields}
+        activated = await self.filter(pk=user.pk, is_active=False).aupdate(**fields)
+        if activated:
+            await aforget_token_version(user.pk)
+            for name, value in fields.items():
+                setattr(user, name, value)
+        return bool(activated)
+
+    def never_activated(self):
+        """
+        Accounts created by a code request that never completed sign-up.
+        activate() stamps last_login, and deactivating an account that was
+        ever active bumps its token_version, so neither kind of real account
+        matches.
+        """
+        return self.filter(is_active=False, last_login__isnull=True, token_version=0)
+
+    def purge_stale_signups(self, before, batch_size, after=None):
+        """
+        Deletes one batch of never activated accounts whose last code was sent
+        before `before`, and their pending codes, walking (code_created_at, id)
+        upwards from `after`. Accounts that other rows protect from deletion
+        are skipped. Returns (users deleted, key to pass as `after`), with a
+        key of None once no stale account is left.
+        """
+        stale = self.never_activated().filter(code_created_at__lt=before)
+        if after is not None:
+            stale = stale.filter(Q(code_created_at__gt=after[0]) | Q(code_created_at=after[0], id__gt=after[1]))
+        with transaction.atomic(using=self.db):
+            # Rows locked by a request that is sending a new code are skipped.
+            rows = list(
+                stale.select_for_update(skip_locked=True)
+                .order_by('code_created_at', 'id')
+                .values_list('code_created_at', 'id', 'email')[:batch_size]
+            )
+            if not rows:
+                return 0, None
+            ids = [row[1] for row in rows]
+            try:
+                with transaction.atomic(using=self.db):
+                    deleted = stale.filter(id__in=ids).delete()[1].get(self.model._meta.label, 0)
+            except (models.ProtectedError, models.RestrictedError):
+                deleted = self._delete_unprotected(stale, ids)
+            emails = [row[2] for row in rows]
+            OneTimeCode.objects.using(self.db).filter(email__in=emails).exclude(
+                email__in=self.filter(email__in=emails).values('email'),
+            ).delete()
+        return deleted, rows[-1][:2]
+
+    def _delete_unprotected(self, stale, ids):
+        deleted = 0
+        for pk in ids:
+            try:
+                with transaction.atomic(using=self.db):
+                    deleted += stale.filter(id=pk).delete()[1].get(self.model._meta.label, 0)
+            except (models.ProtectedError, models.RestrictedError):
+                continue
+        return deleted
+
 
 class User(AbstractUser):
     email = models.EmailField(_('email address'), unique=True)
@@ -46,12 +127,102 @@ class User(AbstractUser):
     is_staff = models.BooleanField(_('staff'), default=False)
     is_superuser = models.BooleanField(_('superuser'), default=False)
     code_created_at = models.DateTimeField(blank=True, null=True)
+    token_version = models.PositiveIntegerField(default=0)
 
     USERNAME_FIELD = "email"
     REQUIRED_FIELDS = []
 
     objects = CustomUserManager()
 
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # Only abandoned sign-ups, for purge_stale_signups; active accounts are not indexed.
+            models.Index(fields=['code_created_at', 'id'], condition=Q(is_active=False),
+                         name='users_stale_signup_idx'),
+            # Staff directory pages, see DateJoinedKeysetPagination; read backwards for newest first.
+            models.Index(fields=['date_joined', 'id'], name='users_date_joined_idx'),
+            models.Index(fields=['is_active', 'date_joined', 'id'], name='users_active_joined_idx'),
+        ]
+
+    def __str__(self):
+        return self.email
+
+
+class OneTimeCodeManager(models.Manager):
+    def purge_expired(self):
+        """Deletes every code past its expiry and returns how many were removed"""
+        deleted, _ = self.filter(expires_at__lte=timezone.now()).delete()
+        return deleted
+
+
+class OneTimeCode(models.Model):
+    """A pending login code, stored as a keyed HMAC digest rather than a password hash."""
+    email = models.EmailField(_('email address'), unique=True)
+    digest = models.CharField(max_length=64)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    created_at = models.DateTimeField(default=timezone.now)
+    expires_at = models.DateTimeField(db_index=True)
+
+    objects = OneTimeCodeManager()
+
     def __str__(self):
         return self.email
 
+
+class OutboundEmailManager(models.Manager):
+    def purge_sent(self):
+        """Deletes messages sent longer than OUTBOX_SENT_RETENTION ago and returns how many were removed"""
+        before = timezone.now() - settings.OUTBOX_SENT_RETENTION
+        deleted, _ = self.filter(status=self.model.SENT, sent_at__lt=before).delete()
+        return deleted
+
+
+class OutboundEmail(models.Model):
+    """A queued email, sent by the `send_queued_mail` worker instead of inside a request."""
+    PENDING = 'pending'
+    SENT = 'sent'
+    DEAD = 'dead'
+    STATUS_CHOICES = [
+        (PENDING, _('pending')),
+        (SENT, _('sent')),
+        (DEAD, _('dead')),
+    ]
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    from_email = models.CharField(max_length=254, blank=True)
+    recipients = models.JSONField(default=list)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    sent_at = models.DateTimeField(blank=True, null=True)
+
+    objects = OutboundEmailManager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='users_outbox_due_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.subject} -> {", ".join(self.recipients)}'
+
+
+class RevokedTokenManager(models.Manager):
+    def purge_expired(self):
+        """Deletes revocations for tokens that have expired anyway and returns how many were removed"""
+        deleted, _ = self.filter(expires_at__lte=timezone.now()).delete()
+        return deleted
+
+
+class RevokedToken(models.Model):
+    """A revoked refresh token (`jti:<id>`) or token family (`fam:<id>`), kept until it would expire."""
+    key = models.CharField(max_length=64, unique=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    objects = RevokedTokenManager()
+
+    def __str__(self):
+        return self.key
@@ -0,0 +1,117 @@
+"""
+One-time login codes.
+
+Codes are stored as a keyed HMAC of the email and the code, so checking one
+costs a single SHA-256 instead of a full PBKDF2 run, and the user's password
+column is never touched. Codes that expire unused are deleted by the
+`purge_expired` worker.
+"""
+import secrets
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+from django.utils.crypto import constant_time_compare, salted_hmac
+
+from online_shop.metrics import timed
+
+from .models import OneTimeCode
+
+VALID = 'valid'
+INVALID = 'invalid'
+EXPIRED = 'expired'
+
+KEY_SALT = 'apps.users.otp'
+
+# One INSERT ... ON CONFLICT (email) DO UPDATE, instead of a locking read and then a write.
+UPSERT = {
+    'update_conflicts': True,
+    'unique_fields': ['email'],
+    'update_fields': ['digest', 'attempts', 'created_at', 'expires_at'],
+}
+
+
+def generate_code(length=None):
+    """Returns a random numeric code"""
+    length = length or settings.OTP_CODE_LENGTH
+    return ''.join(secrets.choice('0123456789') for _ in range(length))
+
+
+def make_digest(email, code):
+    with timed('hash'):
+        return salted_hmac(KEY_SALT, f'{email}:{code}', algorithm='sha256').hexdigest()
+
+
+def _record_defaults(email, code):
+    now = timezone.now()
+    return {
+        'digest': make_digest(email, code),
+        'attempts': 0,
+        'created_at': now,
+        'expires_at': now + settings.OTP_CODE_LIFETIME,
+    }
+
+
+def issue_code(email):
+    """Creates a fresh code for the email, replacing any pending one, and returns it"""
+    code = generate_code()
+    OneTimeCode.objects.bulk_create([OneTimeCode(email=email, **_record_defaults(email, code))], **UPSERT)
+    return code
+
+
+async def aissue_code(email):
+    code = generate_code()
+    await OneTimeCode.objects.abulk_create([OneTimeCode(email=email, **_record_defaults(email, code))], **UPSERT)
+    return code
+
+
+def verify_code(email, code):
+    """
+    Checks a code and returns VALID, INVALID or EXPIRED.
+
+    A valid code is consumed. Wrong guesses count against OTP_MAX_ATTEMPTS,
+    after which the pending code is dropped.
+    """
+    try:
+        record = OneTimeCode.objects.get(email=email)
+    except OneTimeCode.DoesNotExist:
+        return INVALID
+
+    if timezone.now() > record.expires_at:
+        record.delete()
+        return EXPIRED
+
+    if record.attempts >= settings.OTP_MAX_ATTEMPTS:
+        record.delete()
+        return INVALID
+
+    if constant_time_compare(record.digest, make_digest(email, code)):
+        # Deleting on the attempt count we read makes the code single-use
+        # even when two requests race on it.
+        deleted, _ = OneTimeCode.objects.filter(pk=record.pk, attempts=record.attempts).delete()
+        return VALID if deleted else INVALID
+
+    OneTimeCode.objects.filter(pk=record.pk).update(attempts=F('attempts') + 1)
+    return INVALID
+
+
+async def averify_code(email, code):
+    try:
+        record = await OneTimeCode.objects.aget(email=email)
+    except OneTimeCode.DoesNotExist:
+        return INVALID
+
+    if timezone.now() > record.expires_at:
+        await record.adelete()
+        return EXPIRED
+
+    if record.attempts >= settings.OTP_MAX_ATTEMPTS:
+        await record.adelete()
+        return INVALID
+
+    if constant_time_compare(record.digest, make_digest(email, code)):
+        deleted, _ = await OneTimeCode.objects.filter(pk=record.pk, attempts=record.attempts).adelete()
+        return VALID if deleted else INVALID
+
+    await OneTimeCode.objects.filter(pk=record.pk).aupdate(attempts=F('attempts') + 1)
+    return INVALID
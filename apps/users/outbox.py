@@ -0,0 +1,144 @@
+"""
+Outbound mail queue.
+
+Views call enqueue_mail(), which only inserts a row. The `send_queued_mail`
+worker drains due rows in batches over one SMTP connection, retrying failures
+with exponential backoff until OUTBOX_MAX_ATTEMPTS, after which a message is
+marked dead and left for inspection. Bodies are blanked once a message is
+sent or dead, as they hold login codes, and sent rows are deleted by the
+`purge_expired` worker after OUTBOX_SENT_RETENTION.
+"""
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from online_shop.metrics import timed
+
+from .models import OutboundEmail
+
+
+def enqueue_mail(subject, message, from_email, recipient_list):
+    """Queues an email for the worker and returns the OutboundEmail row"""
+    with timed('mail'):
+        return OutboundEmail.objects.create(
+            subject=subject,
+            body=message,
+            from_email=from_email or '',
+            recipients=list(recipient_list),
+        )
+
+
+async def aenqueue_mail(subject, message, from_email, recipient_list):
+    with timed('mail'):
+        return await OutboundEmail.objects.acreate(
+            subject=subject,
+            body=message,
+            from_email=from_email or '',
+            recipients=list(recipient_list),
+        )
+
+
+def retry_delay(attempts):
+    """Returns how long to wait before the next attempt after `attempts` failures"""
+    return settings.OUTBOX_RETRY_DELAY * (2 ** (attempts - 1))
+
+
+def drain_outbox(batch_size=None, connection=None):
+    """
+    Sends one batch of due messages and returns (sent, failed).
+
+    Rows are claimed with SELECT ... FOR UPDATE SKIP LOCKED in a short
+    transaction that pushes their next_attempt_at OUTBOX_CLAIM_TIMEOUT ahead,
+    so several workers can drain the same table without holding locks during
+    SMTP. Each outcome is then committed on its own: if the worker dies
+    mid-batch, only the messages it had not marked sent are retried once the
+    claim runs out. Pass an open connection to reuse it across batches;
+    otherwise one is opened for this batch only.
+    """
+    batch_size = batch_size or settings.OUTBOX_BATCH_SIZE
+    sent = failed = 0
+
+    batch = _claim(batch_size)
+    if not batch:
+        return sent, failed
+
+    owns_connection = connection is None
+    if owns_connection:
+        connection = get_connection()
+    _open(connection, batch)
+    try:
+        for index, email in enumerate(batch):
+            message = EmailMessage(
+                email.subject,
+                email.body,
+                email.from_email or None,
+                email.recipients,
+                connection=connection,
+            )
+            try:
+                with timed('mail'):
+                    delivered = connection.send_messages([message])
+            except Exception as e:
+                _mark_failed(email, repr(e))
+                failed += 1
+                # The session may be broken; start a clean one for the rest of the batch.
+                connection.close()
+                if index + 1 < len(batch):
+                    _open(connection, batch[index + 1:])
+                continue
+            if delivered:
+                _mark_sent(email)
+                sent += 1
+            else:
+                _mark_failed(email, 'The backend did not deliver the message.')
+                failed += 1
+    finally:
+        if owns_connection:
+            connection.close()
+
+    return sent, failed
+
+
+def _open(connection, emails):
+    """Opens the connection; if that fails, hands `emails` back instead of waiting for the claim to run out"""
+    try:
+        connection.open()
+    except Exception:
+        OutboundEmail.objects.filter(pk__in=[email.pk for email in emails]).update(next_attempt_at=timezone.now())
+        raise
+
+
+def _claim(batch_size):
+    now = timezone.now()
+    with transaction.atomic():
+        batch = list(
+            OutboundEmail.objects.select_for_update(skip_locked=True)
+            .filter(status=OutboundEmail.PENDING, next_attempt_at__lte=now)
+            .order_by('next_attempt_at')[:batch_size]
+        )
+        if batch:
+            OutboundEmail.objects.filter(pk__in=[email.pk for email in batch]).update(
+                next_attempt_at=now + settings.OUTBOX_CLAIM_TIMEOUT,
+            )
+    return batch
+
+
+def _mark_sent(email):
+    # The body carries the login code; it is not kept once delivered.
+    email.status = OutboundEmail.SENT
+    email.sent_at = timezone.now()
+    email.attempts += 1
+    email.body = ''
+    email.save(update_fields=['status', 'sent_at', 'attempts', 'body'])
+
+
+def _mark_failed(email, error):
+    email.attempts += 1
+    email.last_error = error
+    if email.attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+        email.status = OutboundEmail.DEAD
+        email.body = ''
+    else:
+        email.next_attempt_at = timezone.now() + retry_delay(email.attempts)
+    email.save(update_fields=['attempts', 'last_error', 'status', 'next_attempt_at', 'body'])
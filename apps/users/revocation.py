@@ -0,0 +1,146 @@
+"""
+Revocation index for refresh tokens.
+
+Revocations are rows in RevokedToken, keyed `jti:<token id>` for a single
+used or revoked refresh token and `fam:<family id>` for a whole login
+session. Each process mirrors them in time-bucketed Bloom filters, one per
+REVOCATION_BUCKET_SECONDS of expiry time, so checking a token is a few
+in-memory bit tests. Only a Bloom hit (a revoked token or a rare false
+positive) costs an exact lookup in the table. Buckets whose tokens have all
+expired are dropped, which keeps memory bounded. The rows themselves are
+deleted once their token has expired by the `purge_expired` worker.
+
+Processes learn about revocations made elsewhere through a generation counter
+in the shared cache and pull only the rows added since their last sync. At
+least every REVOCATION_SYNC_INTERVAL seconds they also re-read a window of
+recent rows, in case the counter was evicted or rows committed out of id
+order.
+
+Revocations are always read from the primary, since a replica that lags
+behind would let a revoked token through.
+
+Reuse detection does not depend on the filters: consuming a refresh token
+inserts its `jti:` key, and the unique constraint lets only one request win.
+"""
+import threading
+import time
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, transaction
+from django.utils import timezone
+
+from .bloom import BloomFilter
+from .models import RevokedToken
+from .tokens import FAMILY_CLAIM
+
+GENERATION_KEY = 'users_revocation_generation'
+SYNC_LOOKBACK = 1000
+
+
+def jti_key(jti):
+    return f'jti:{jti}'
+
+
+def family_key(family):
+    return f'fam:{family}'
+
+
+class RevocationIndex:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.buckets = {}
+        self.last_id = 0
+        self.generation = None
+        self.synced_at = 0.0
+
+    def _bucket(self, expires_at):
+        return int(expires_at.timestamp() // settings.REVOCATION_BUCKET_SECONDS)
+
+    def _add(self, key, expires_at):
+        bucket = self._bucket(expires_at)
+        bloom = self.buckets.get(bucket)
+        if bloom is None:
+            bloom = self.buckets[bucket] = BloomFilter.for_capacity(
+                settings.REVOCATION_BUCKET_CAPACITY, settings.REVOCATION_ERROR_RATE,
+            )
+        bloom.add(key)
+
+    def sync(self):
+        """Pulls revocations made since the last sync, if the shared generation moved"""
+        generation = cache.get(GENERATION_KEY, 0)
+        stale = time.monotonic() - self.synced_at > settings.REVOCATION_SYNC_INTERVAL
+        if generation == self.generation and not stale:
+            return
+
+        with self.lock:
+            now = timezone.now()
+            current = self._bucket(now)
+            for bucket in [b for b in self.buckets if b < current]:
+                del self.buckets[bucket]
+
+            since = max(0, self.last_id - SYNC_LOOKBACK) if stale else self.last_id
+            rows = (
+                RevokedToken.objects.using(DEFAULT_DB_ALIAS).filter(id__gt=since, expires_at__gt=now)
+                .order_by('id')
+                .values_list('id', 'key', 'expires_at')
+            )
+            for pk, key, expires_at in rows.iterator():
+                self._add(key, expires_at)
+                self.last_id = max(self.last_id, pk)
+            self.generation = generation
+            self.synced_at = time.monotonic()
+
+    def is_revoked(self, *keys):
+        self.sync()
+        # Other threads add and drop buckets while this one tests them.
+        with self.lock:
+            blooms = list(self.buckets.values())
+        candidates = [key for key in keys if any(key in bloom for bloom in blooms)]
+        if not candidates:
+            return False
+        return RevokedToken.objects.using(DEFAULT_DB_ALIAS).filter(key__in=candidates).exists()
+
+    def revoke(self, key, expires_at):
+        """Records a revocation and returns False if the key was already revoked"""
+        try:
+            # Insert first: a key is revoked once, so a read before the write is almost always wasted.
+            with transaction.atomic():
+                RevokedToken.objects.create(key=key, expires_at=expires_at)
+        except IntegrityError:
+            return False
+        with self.lock:
+            self._add(key, expires_at)
+        cache.add(GENERATION_KEY, 0, None)
+        try:
+            cache.incr(GENERATION_KEY)
+        except ValueError:
+            cache.set(GENERATION_KEY, 1, None)
+        return True
+
+
+revocation_index = RevocationIndex()
+
+
+def expiry_of(token):
+    return datetime.fromtimestamp(token['exp'], tz=dt_timezone.utc)
+
+
+def is_token_revoked(token):
+    return revocation_index.is_revoked(jti_key(token['jti']), family_key(token.get(FAMILY_CLAIM, '')))
+
+
+def consume_refresh_token(token):
+    """Marks a refresh token as used; returns False if it had been used before"""
+    return revocation_index.revoke(jti_key(token['jti']), expiry_of(token))
+
+
+def revoke_family(token):
+    """Revokes every refresh token rotated from the same login"""
+    family = token.get(FAMILY_CLAIM)
+    if family:
+        revocation_index.revoke(family_key(family), timezone.now() + settings.SIMPLE_JWT['REFRESH_TOKEN_LIFETIME'])
@@ -10,13 +10,60 @@ class CodeVerificationSerializer(serializers.Serializer):
     code = serializers.CharField(max_length=8)
 
 
+class RefreshTokenSerializer(serializers.Serializer):
+    refresh = serializers.CharField()
+
+
 class SignUpSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ('first_name', 'last_name')
 
     def update(self, instance, validated_data):
-        instance.first_name = validated_data.get('first_name', instance.first_name)
-        instance.last_name = validated_data.get('last_name', instance.last_name)
-        instance.save()
+        """Completes sign-up the way the views do, through User.objects.activate"""
+        User.objects.activate(instance, **validated_data)
         return instance
+
+
+class UserDirectorySerializer(serializers.ModelSerializer):
+    """Serializes only the fields named in `fields`, so the view can fetch only their columns"""
+
+    class Meta:
+        model = User
+        fields = (
+            'id', 'email', 'username', 'first_name', 'last_name', 'is_active', 'is_staff', 'is_superuser',
+            'date_joined', 'last_login',
+        )
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+
+class UserDirectoryFilterSerializer(serializers.Serializer):
+    is_active = serializers.BooleanField(required=False, allow_null=True, default=None)
+    joined_after = serializers.DateTimeField(required=False)
+    joined_before = serializers.DateTimeField(required=False)
+    fields = serializers.CharField(required=False)
+
+    def validate_fields(self, value):
+        fields = [name for name in value.split(',') if name]
+        unknown = set(fields) - set(UserDirectorySerializer.Meta.fields)
+        if unknown:
+            raise serializers.ValidationError(f"Unknown fields: {', '.join(sorted(unknown))}.")
+        return fields
+
+
+class UserExportSerializer(UserDirectoryFilterSerializer):
+    output = serializers.ChoiceField(choices=('csv', 'jsonl'), default='csv')
+    after = serializers.CharField(required=False)
+
+    def validate_after(self, value):
+        """Parses a `<date_joined>,<id>` watermark, as the export command prints it"""
+        date_joined, _, pk = value.rpartition(',')
+        date_joined = serializers.DateTimeField().run_validation(date_joined)
+        if not pk.isdigit():
+            raise serializers.ValidationError("Expected <date_joined>,<id>.")
+        return date_joined, int(pk)
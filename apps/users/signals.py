@@ -0,0 +1,16 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .models import User
+from .tokens import revoke_tokens
+
+
+@receiver(post_save, sender=User)
+def revoke_tokens_on_deactivation(sender, instance, created, update_fields=None, **kwargs):
+    """Invalidates outstanding tokens when a user is saved as inactive"""
+    if created or instance.is_active:
+        return
+    if update_fields is not None and 'is_active' not in update_fields:
+        return
+    revoke_tokens(instance.pk)
+    instance.token_version += 1
@@ -0,0 +1,93 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+from unittest import mock
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from apps.users.admin import UserAdmin
+from apps.users.models import User
+
+
+@mock.patch.object(UserAdmin, 'list_per_page', 3)
+class UserAdminTests(TestCase):
+    def setUp(self):
+        self.start = datetime(2023, 11, 30, tzinfo=dt_timezone.utc)
+        self.admin = User.objects.create(
+            email='admin@example.com', username='admin@example.com', is_staff=True, is_superuser=True,
+            date_joined=self.start - timedelta(days=365),
+        )
+        # Accounts a month apart from late 2023 into 2024, and three that share a sign-up time.
+        self.emails = [self.create_user(f'user{i}', self.start + timedelta(days=30 * i)) for i in range(8)]
+        self.emails += [self.create_user(f'tie{i}', self.start + timedelta(days=20)) for i in range(3)]
+        self.client.force_login(self.admin)
+        self.url = reverse('admin:users_user_changelist')
+
+    def create_user(self, name, date_joined, **kwargs):
+        email = f'{name}@example.com'
+        User.objects.create(email=email, username=email, date_joined=date_joined, **kwargs)
+        return email
+
+    def changelist(self, url=None, **params):
+        response = self.client.get(url or self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return response.context['cl']
+
+    def test_pages_follow_the_keyset_newest_first(self):
+        cl = self.changelist()
+        self.assertTrue(cl.keyset)
+        self.assertIsNone(cl.first_page_url)
+        seen = []
+        while True:
+            seen += [user.email for user in cl.result_list]
+            if cl.next_page_url is None:
+                break
+            cl = self.changelist(self.url + cl.next_page_url)
+            self.assertIsNotNone(cl.first_page_url)
+
+        expected = User.objects.order_by('-date_joined', '-id').values_list('email', flat=True)
+        self.assertEqual(seen, list(expected))
+        self.assertEqual(cl.result_count, 12)
+
+    def test_queries_per_page_do_not_grow_with_depth(self):
+        with CaptureQueriesContext(connection) as first:
+            cl = self.changelist()
+        for _ in range(2):
+            cl = self.changelist(self.url + cl.next_page_url)
+        with CaptureQueriesContext(connection) as deep:
+            self.changelist(self.url + cl.next_page_url)
+
+        # Session and user, the page, the count, date hierarchy bounds (read by the tag and by
+        # PeriodProbeQuerySet), and one probe for each of the three years.
+        self.assertEqual(len(first), 9)
+        self.assertEqual(len(deep), len(first))
+        sql = [query['sql'] for query in first.captured_queries + deep.captured_queries]
+        self.assertFalse([query for query in sql if 'OFFSET' in query or 'DISTINCT' in query])
+
+    def test_search_matches_an_email_prefix(self):
+        cl = self.changelist(q='tie')
+        self.assertEqual({user.email for user in cl.result_list}, {f'tie{i}@example.com' for i in range(3)})
+        self.assertEqual(self.changelist(q='example').result_count, 0)
+
+    def test_date_hierarchy_probes_periods(self):
+        response = self.client.get(self.url)
+        self.assertEqual([choice['title'] for choice in response.context['choices']], ['2022', '2023', '2024'])
+
+        response = self.client.get(self.url, {'date_joined__year': 2023, 'date_joined__month': 12})
+        self.assertEqual([choice['title'] for choice in response.context['choices']], ['December 20', 'December 30'])
+
+    def test_filters_keep_keyset_pages(self):
+        self.create_user('inactive', self.start, is_active=False)
+        cl = self.changelist(is_active__exact=0)
+        self.assertEqual([user.email for user in cl.result_list], ['inactive@example.com'])
+        self.assertIsNone(cl.next_page_url)
+
+    def test_large_tables_show_the_estimate(self):
+        with mock.patch('apps.users.admin.estimated_count', return_value=25_000_000):
+            response = self.client.get(self.url)
+        self.assertContains(response, '~25000000 users')
+
+    def test_invalid_cursor(self):
+        response = self.client.get(self.url, {'after': 'nonsense'})
+        self.assertRedirects(response, self.url + '?e=1', fetch_redirect_response=False)
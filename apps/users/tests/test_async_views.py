@@ -0,0 +1,110 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from apps.users import otp
+from apps.users.models import OutboundEmail
+
+User = get_user_model()
+
+
+class AsyncRequestCodeViewTests(TestCase):
+    def setUp(self):
+        self.url = reverse('users-async:request-code')
+        self.email = 'testuser@example.com'
+
+    @patch('apps.users.otp.generate_code')
+    async def test_post_valid_email(self, mock_generate_code):
+        mock_generate_code.return_value = '12345678'
+        response = await self.async_client.post(self.url, {'email': self.email}, content_type='application/json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        user = await User.objects.aget(email=self.email)
+        self.assertFalse(user.is_active)
+        self.assertEqual(await otp.averify_code(self.email, '12345678'), otp.VALID)
+        self.assertTrue(await OutboundEmail.objects.filter(recipients=[self.email]).aexists())
+
+    async def test_post_invalid_email(self):
+        response = await self.async_client.post(self.url, {'email': 'invalid-email'}, content_type='application/json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('email', response.json())
+
+    async def test_post_malformed_json(self):
+        response = await self.async_client.post(self.url, '{', content_type='application/json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class AsyncCodeVerificationViewTests(TestCase):
+    def setUp(self):
+        self.url = reverse('users-async:verify-code')
+        self.email = 'testuser@example.com'
+        self.user = User.objects.create(email=self.email)
+        with patch('apps.users.otp.generate_code', return_value='12345678'):
+            otp.issue_code(self.email)
+
+    async def test_post_valid_code_existing_user(self):
+        data = {'email': self.email, 'code': '12345678'}
+        response = await self.async_client.post(self.url, data, content_type='application/json')
+
+        self.assertEqual(response.status_code, status.HTTP_302_FOUND)
+        self.assertIn('access_token', response.json())
+        self.assertIn('refresh_token', response.json())
+
+    async def test_post_invalid_code(self):
+        data = {'email': self.email, 'code': '87654321'}
+        response = await self.async_client.post(self.url, data, content_type='application/json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.json()['error'], 'Invalid email or code.')
+
+
+class AsyncSignUpViewTests(TestCase):
+    def setUp(self):
+        self.url = reverse('users-async:sign-up')
+        self.email = 'testuser@example.com'
+        self.user = User.objects.create(email=self.email, is_active=False)
+
+    async def test_post_successful_signup(self):
+        data = {'email': self.email, 'first_name': 'Test', 'last_name': 'User'}
+        response = await self.async_client.post(self.url, data, content_type='application/json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        await self.user.arefresh_from_db()
+        self.assertTrue(self.user.is_active)
+        self.assertEqual(self.user.first_name, 'Test')
+
+    async def test_post_user_does_not_exist(self):
+        data = {'email': 'nonexistent@example.com'}
+        response = await self.async_client.post(self.url, data, content_type='application/json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.json()['error'], 'User does not exist.')
+
+
+class AsyncActiveUserViewTests(TestCase):
+    def setUp(self):
+        self.url = reverse('users-async:active-user')
+        self.user = User.objects.create(email='testuser@example.com')
+
+    async def test_get_with_token(self):
+        token = str(RefreshToken.for_user(self.user).access_token)
+        response = await self.async_client.get(self.url, headers={'Authorization': f'Bearer {token}'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['message'], 'User testuser@example.com is active.')
+
+    async def test_get_without_token(self):
+        response = await self.async_client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    async def test_get_with_invalid_token(self):
+        response = await self.async_client.get(self.url, headers={'Authorization': 'Bearer nonsense'})
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
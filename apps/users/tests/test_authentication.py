@@ -0,0 +1,121 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from apps.users.serializers import SignUpSerializer
+from apps.users.tokens import UserRefreshToken, get_token_version, revoke_tokens
+
+User = get_user_model()
+
+
+class ClaimsJWTAuthenticationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.url = reverse('users:active-user')
+        self.user = User.objects.create(email='testuser@example.com', username='testuser@example.com')
+
+    def authenticate(self, token_class=UserRefreshToken):
+        token = token_class.for_user(self.user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        return token
+
+    def test_token_carries_user_claims(self):
+        """Test that issued tokens embed what is needed to rebuild the user"""
+        token = self.authenticate()
+        self.assertEqual(token['email'], self.user.email)
+        self.assertTrue(token['is_active'])
+        self.assertFalse(token['is_staff'])
+        self.assertEqual(token['ver'], 0)
+
+    def test_authenticated_request_without_queries(self):
+        """Test that a warm request rebuilds the user without touching the database"""
+        self.authenticate()
+        self.client.get(self.url)
+
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['message'], 'User testuser@example.com is active.')
+
+    def test_deactivation_revokes_tokens(self):
+        """Test that saving a user as inactive rejects their existing tokens"""
+        self.authenticate()
+        self.client.get(self.url)
+
+        self.user.is_active = False
+        self.user.save()
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_revoke_tokens(self):
+        """Test that bumping the token version rejects older tokens but not newer ones"""
+        self.authenticate()
+        revoke_tokens(self.user.pk)
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(response.data['code'], 'token_revoked')
+
+        self.user.refresh_from_db()
+        self.authenticate()
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_unrelated_save_keeps_tokens(self):
+        """Test that saving other fields of an inactive user does not bump the version"""
+        self.user.is_active = False
+        self.user.save()
+        self.user.save(update_fields=['code_created_at'])
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.token_version, 1)
+        self.assertEqual(get_token_version(self.user.pk), -1)
+
+    def test_activation_drops_cached_revocation(self):
+        """Test that tokens issued on activation are accepted at once"""
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(get_token_version(self.user.pk), -1)
+
+        self.assertTrue(User.objects.activate(self.user))
+        self.authenticate()
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_sign_up_serializer_activates(self):
+        """Test that saving the sign-up serializer takes the same path as the views"""
+        self.user.is_active = False
+        self.user.save()
+
+        serializer = SignUpSerializer(self.user, data={'first_name': 'Test', 'last_name': 'User'})
+        self.assertTrue(serializer.is_valid())
+        serializer.save()
+
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.is_active)
+        self.assertIsNotNone(self.user.last_login)
+        self.assertEqual(self.user.first_name, 'Test')
+
+    def test_token_without_claims_uses_database(self):
+        """Test that tokens minted without claims still authenticate"""
+        self.authenticate(RefreshToken)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    async def test_async_view_uses_claims(self):
+        """Test that the async active-user view accepts claims tokens"""
+        token = UserRefreshToken.for_user(self.user).access_token
+        headers = {'Authorization': f'Bearer {token}'}
+        url = reverse('users-async:active-user')
+        response = await self.async_client.get(url, headers=headers)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        await User.objects.filter(pk=self.user.pk).aupdate(token_version=5)
+        cache.clear()
+        response = await self.async_client.get(url, headers=headers)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
@@ -0,0 +1,80 @@
+import gzip
+import hashlib
+import os
+import tempfile
+from io import StringIO
+
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.test import TestCase
+
+from apps.users.bloom import BloomFilter
+from apps.users.validators import BreachedPasswordValidator
+
+BREACHED = ['Winter2024!', 'P@ssw0rd123', 'correcthorsebatterystaple']
+
+
+class BreachFilterTests(TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+
+    def path(self, name):
+        return os.path.join(self.tmpdir.name, name)
+
+    def build(self, lines, *args, name='corpus.txt'):
+        corpus = self.path(name)
+        opener = gzip.open if name.endswith('.gz') else open
+        with opener(corpus, 'wt') as f:
+            f.write('\n'.join(lines) + '\n')
+        output = self.path('breached.bloom')
+        call_command('build_breach_filter', corpus, '--output', output, *args, stdout=StringIO(), stderr=StringIO())
+        return output
+
+    def assertBreached(self, validator, password):
+        with self.assertRaises(ValidationError) as cm:
+            validator.validate(password)
+        self.assertEqual(cm.exception.code, 'password_breached')
+
+    def test_plain_corpus(self):
+        """Test that every corpus password is rejected and others pass"""
+        validator = BreachedPasswordValidator(self.build(BREACHED))
+
+        for password in BREACHED:
+            self.assertBreached(validator, password)
+        validator.validate('Un1que-Enough!')
+
+    def test_sha1_corpus(self):
+        """Test that Have I Been Pwned style `SHA1:count` lines are matched by digest"""
+        lines = [f'{hashlib.sha1(p.encode()).hexdigest().upper()}:42' for p in BREACHED]
+        validator = BreachedPasswordValidator(self.build(lines, '--format', 'sha1', name='pwned.txt.gz'))
+
+        self.assertBreached(validator, 'Winter2024!')
+        validator.validate('Un1que-Enough!')
+
+    def test_filter_file_is_memory_mapped(self):
+        output = self.build(BREACHED, '--capacity', '1000')
+        bloom = BloomFilter.open(output)
+        self.addCleanup(bloom.close)
+
+        self.assertEqual(bloom.items, len(BREACHED))
+        self.assertIsInstance(bloom.bits, memoryview)
+        self.assertIn(b'Winter2024!', bloom)
+        with self.assertRaises(TypeError):
+            bloom.add(b'read-only')
+
+    def test_falls_back_to_common_passwords(self):
+        """Test that without a filter file the common-password list is used"""
+        validator = BreachedPasswordValidator(self.path('missing.bloom'))
+
+        with self.assertRaises(ValidationError) as cm:
+            validator.validate('password')
+        self.assertEqual(cm.exception.code, 'password_too_common')
+        validator.validate('Un1que-Enough!')
+
+    def test_rejects_other_files(self):
+        path = self.path('not-a-filter')
+        with open(path, 'wb') as f:
+            f.write(b'x' * 100)
+        with self.assertRaises(ValueError):
+            BloomFilter.open(path)
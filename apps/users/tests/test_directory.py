@@ -0,0 +1,94 @@
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.users.models import User
+from apps.users.tokens import UserRefreshToken
+
+
+class UserDirectoryTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.now = timezone.now()
+        self.staff = self.create_user('staff', days_ago=30, is_staff=True)
+        # Three accounts share a sign-up time, so pages must break ties on id.
+        for i in range(3):
+            self.create_user(f'tie{i}', days_ago=2)
+        self.create_user('new', days_ago=1)
+        self.create_user('inactive', days_ago=3, is_active=False)
+        self.client = APIClient()
+        self.login(self.staff)
+        self.url = reverse('users:directory-list')
+
+    def create_user(self, name, days_ago, **kwargs):
+        email = f'{name}@example.com'
+        return User.objects.create(
+            email=email, username=email, date_joined=self.now - timedelta(days=days_ago), **kwargs
+        )
+
+    def login(self, user):
+        token = UserRefreshToken.for_user(user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def emails(self, response):
+        self.assertEqual(response.status_code, 200)
+        return [user['email'].split('@')[0] for user in response.json()['results']]
+
+    def test_staff_only(self):
+        self.login(User.objects.get(email='new@example.com'))
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+        self.client.credentials()
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+
+    def test_pages_newest_first_without_counting(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, {'page_size': 2})
+        self.assertFalse(any('COUNT(' in query['sql'] for query in queries.captured_queries))
+        self.assertNotIn('count', response.json())
+
+        seen = self.emails(response)
+        self.assertEqual(seen[0], 'new')
+        while response.json()['next']:
+            response = self.client.get(response.json()['next'])
+            seen += self.emails(response)
+        self.assertEqual(seen, ['new', 'tie2', 'tie1', 'tie0', 'inactive', 'staff'])
+
+    def test_filters(self):
+        self.assertEqual(self.emails(self.client.get(self.url, {'is_active': 'false'})), ['inactive'])
+        joined = {
+            'joined_after': (self.now - timedelta(days=3)).isoformat(),
+            'joined_before': (self.now - timedelta(days=1)).isoformat(),
+            'is_active': 'true',
+        }
+        self.assertEqual(self.emails(self.client.get(self.url, joined)), ['tie2', 'tie1', 'tie0'])
+        self.assertEqual(self.client.get(self.url, {'joined_after': 'yesterday'}).status_code, 400)
+
+    def test_sparse_fields(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, {'fields': 'email,is_active', 'page_size': 1})
+
+        self.assertEqual(response.json()['results'], [{'email': 'new@example.com', 'is_active': True}])
+        sql = queries.captured_queries[-1]['sql']
+        self.assertIn('"users_user"."email"', sql)
+        self.assertNotIn('"users_user"."password"', sql)
+        self.assertNotIn('"users_user"."first_name"', sql)
+        self.assertIsNotNone(response.json()['next'])
+
+        response = self.client.get(self.url, {'fields': 'email,password'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('fields', response.json())
+
+    def test_detail(self):
+        user = User.objects.get(email='new@example.com')
+        response = self.client.get(reverse('users:directory-detail', args=[user.pk]), {'fields': 'id,email'})
+
+        self.assertEqual(response.json(), {'id': user.pk, 'email': 'new@example.com'})
+
+    def test_invalid_cursor(self):
+        self.assertEqual(self.client.get(self.url, {'cursor': 'garbage'}).status_code, 404)
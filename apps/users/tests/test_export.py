@@ -0,0 +1,105 @@
+import csv
+import gzip
+import io
+import json
+import os
+import tempfile
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.users.models import User
+from apps.users.tokens import UserRefreshToken
+
+
+class UserExportTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.now = timezone.now()
+        self.staff = self.create_user('staff', days_ago=30, is_staff=True)
+        # Three accounts share a sign-up time, so watermarks must break ties on id.
+        for i in range(3):
+            self.create_user(f'tie{i}', days_ago=2)
+        self.new = self.create_user('new', days_ago=1)
+        self.create_user('inactive', days_ago=3, is_active=False)
+        self.client = APIClient()
+        self.login(self.staff)
+        self.url = reverse('users:export')
+
+    def create_user(self, name, days_ago, **kwargs):
+        email = f'{name}@example.com'
+        return User.objects.create(
+            email=email, username=email, date_joined=self.now - timedelta(days=days_ago), **kwargs
+        )
+
+    def login(self, user):
+        token = UserRefreshToken.for_user(user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def content(self, response):
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        body = b''.join(response.streaming_content)
+        if response.get('Content-Encoding') == 'gzip':
+            body = gzip.decompress(body)
+        return body.decode()
+
+    def test_staff_only(self):
+        self.login(self.new)
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+    @override_settings(EXPORT_WINDOW=2)
+    def test_csv_walks_all_windows_oldest_first(self):
+        rows = list(csv.DictReader(io.StringIO(self.content(self.client.get(self.url, {'fields': 'id,email'})))))
+
+        self.assertEqual([row['email'] for row in rows], [
+            'staff@example.com', 'inactive@example.com',
+            'tie0@example.com', 'tie1@example.com', 'tie2@example.com', 'new@example.com',
+        ])
+        self.assertEqual(set(rows[0]), {'id', 'email'})
+
+    def test_jsonl_gzipped(self):
+        response = self.client.get(
+            self.url, {'output': 'jsonl', 'is_active': 'false'}, HTTP_ACCEPT='text/csv', HTTP_ACCEPT_ENCODING='gzip',
+        )
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = [json.loads(line) for line in self.content(response).splitlines()]
+        self.assertEqual(len(lines), 1)
+        self.assertEqual(lines[0]['email'], 'inactive@example.com')
+        self.assertIs(lines[0]['is_active'], False)
+
+    def test_watermark_exports_only_later_accounts(self):
+        tie = User.objects.get(username='tie0@example.com')
+        after = f'{tie.date_joined.isoformat()},{tie.id}'
+
+        rows = list(csv.DictReader(io.StringIO(self.content(self.client.get(self.url, {'after': after})))))
+
+        self.assertEqual(
+            [row['email'] for row in rows], ['tie1@example.com', 'tie2@example.com', 'new@example.com']
+        )
+
+    def test_invalid_parameters(self):
+        for params in ({'after': 'yesterday'}, {'fields': 'password'}, {'output': 'xml'}):
+            with self.subTest(params=params):
+                self.assertEqual(self.client.get(self.url, params).status_code, 400)
+
+    @override_settings(EXPORT_WINDOW=2)
+    def test_command_prints_the_next_watermark(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'users.jsonl.gz')
+            stderr = io.StringIO()
+            call_command('export_users', output='jsonl', fields='email', gzip=True, file=path, stderr=stderr)
+            with gzip.open(path, 'rt') as f:
+                self.assertEqual(len(f.read().splitlines()), 6)
+
+            after = stderr.getvalue().split('--after ')[1].strip()
+            self.create_user('newest', days_ago=0)
+            path = os.path.join(directory, 'users.csv')
+            call_command('export_users', fields='email', after=after, file=path, stderr=io.StringIO())
+            with open(path) as f:
+                self.assertEqual(f.read().splitlines(), ['email', 'newest@example.com'])
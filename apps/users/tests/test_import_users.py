@@ -0,0 +1,103 @@
+import gzip
+import json
+import os
+import tempfile
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.management import CommandError, call_command
+from django.db.models.query import QuerySet
+from django.test import TestCase
+
+from apps.users.models import User
+
+
+class ImportUsersCommandTests(TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+
+    def write(self, name, content, compress=False):
+        path = os.path.join(self.tmpdir.name, name)
+        if compress:
+            with gzip.open(path, 'wt', encoding='utf-8') as f:
+                f.write(content)
+        else:
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(content)
+        return path
+
+    def call(self, *args):
+        out = StringIO()
+        call_command('import_users', *args, stdout=out)
+        return out.getvalue()
+
+    def test_import_csv(self):
+        """Test that CSV rows become users with unusable passwords"""
+        path = self.write('users.csv', 'email,first_name,last_name\nalice@EXAMPLE.com,Alice,A\nbob@example.com,Bob,B\n')
+        output = self.call(path)
+
+        self.assertIn('Imported 2 users from 2 rows.', output)
+        alice = User.objects.get(email='alice@example.com')
+        self.assertEqual(alice.first_name, 'Alice')
+        self.assertTrue(alice.is_active)
+        self.assertFalse(alice.has_usable_password())
+
+    def test_import_jsonl_gzip(self):
+        """Test that compressed JSON Lines input is streamed"""
+        lines = '\n'.join(json.dumps({'email': f'user{i}@example.com'}) for i in range(5))
+        path = self.write('users.jsonl.gz', lines, compress=True)
+        self.call(path, '--batch-size', '2', '--inactive')
+
+        self.assertEqual(User.objects.filter(is_active=False).count(), 5)
+
+    def test_duplicates_and_invalid_rows(self):
+        """Test that existing, repeated and invalid emails are skipped"""
+        User.objects.create(email='alice@example.com', username='alice@example.com', first_name='Original')
+        path = self.write('users.csv', 'email\nalice@example.com\nbob@example.com\nbob@example.com\nnot-an-email\n')
+        output = self.call(path, '--batch-size', '2')
+
+        self.assertIn('Imported 1 users from 4 rows.', output)
+        self.assertIn('1 invalid', output)
+        self.assertEqual(User.objects.get(email='alice@example.com').first_name, 'Original')
+
+    def test_rows_dropped_on_conflict_are_not_counted(self):
+        """Test that a row skipped by the database, here for a taken username, is not reported as created"""
+        User.objects.create(email='old@example.com', username='bob@example.com')
+        path = self.write('users.csv', 'email\nalice@example.com\nbob@example.com\n')
+        output = self.call(path)
+
+        self.assertIn('Imported 1 users from 2 rows.', output)
+        self.assertFalse(User.objects.filter(email='bob@example.com').exists())
+
+    def test_resume_from_checkpoint(self):
+        """Test that a failed import resumes after the last committed batch"""
+        path = self.write('users.csv', 'email\n' + ''.join(f'user{i}@example.com\n' for i in range(6)))
+        checkpoint = os.path.join(self.tmpdir.name, 'import.checkpoint')
+
+        original = QuerySet.bulk_create
+        calls = []
+
+        def failing_bulk_create(self, objs, *args, **kwargs):
+            calls.append(objs)
+            if len(calls) == 2:
+                raise RuntimeError('connection lost')
+            return original(self, objs, *args, **kwargs)
+
+        with patch.object(QuerySet, 'bulk_create', failing_bulk_create):
+            with self.assertRaises(RuntimeError):
+                self.call(path, '--batch-size', '2', '--checkpoint', checkpoint)
+
+        self.assertEqual(User.objects.count(), 2)
+        with open(checkpoint) as f:
+            self.assertEqual(json.load(f)['rows'], 2)
+
+        output = self.call(path, '--batch-size', '2', '--checkpoint', checkpoint)
+        self.assertIn('Resuming after row 2.', output)
+        self.assertEqual(User.objects.count(), 6)
+        self.assertFalse(os.path.exists(checkpoint))
+
+    def test_unknown_format(self):
+        path = self.write('users.txt', 'email\n')
+        with self.assertRaises(CommandError):
+            self.call(path)
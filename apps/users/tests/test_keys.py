@@ -0,0 +1,121 @@
+import io
+import json
+import shutil
+import tempfile
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+import jwt
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.exceptions import TokenError
+
+from apps.users.keys import load_keys, write_key
+from apps.users.models import User
+from apps.users.tokens import UserAccessToken, UserRefreshToken
+
+
+class SigningKeyTests(TestCase):
+    algorithm = 'EdDSA'
+
+    def setUp(self):
+        cache.clear()
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        settings = override_settings(
+            JWT_ALGORITHM=self.algorithm, JWT_KEYS_DIR=self.directory, JWT_KEYS_RELOAD_SECONDS=0,
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.now = datetime.now(dt_timezone.utc)
+        self.user = User.objects.create(email='keys@example.com', username='keys@example.com')
+
+    def add_key(self, activates_in):
+        return write_key(self.directory, self.algorithm, self.now + activates_in)
+
+    def jwks(self):
+        response = self.client.get(reverse('jwks'))
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def verify_offline(self, token):
+        """Verifies a token as another service would, with nothing but the published key set"""
+        key_set = jwt.PyJWKSet.from_dict(json.loads(self.jwks().content))
+        kid = jwt.get_unverified_header(token)['kid']
+        key = next(key for key in key_set.keys if key.key_id == kid)
+        return jwt.decode(token, key.key, algorithms=[self.algorithm])
+
+    def test_tokens_verify_offline_with_the_published_keys(self):
+        kid = self.add_key(timedelta(hours=-1))
+        refresh = UserRefreshToken.for_user(self.user)
+        access = str(refresh.access_token)
+
+        self.assertEqual(jwt.get_unverified_header(access), {'alg': self.algorithm, 'kid': kid, 'typ': 'JWT'})
+        self.assertEqual(self.verify_offline(access)['email'], 'keys@example.com')
+
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+        self.assertEqual(client.get(reverse('users:active-user')).status_code, 200)
+
+    def test_scheduled_key_is_published_before_it_signs(self):
+        old = self.add_key(timedelta(days=-10))
+        token = str(UserRefreshToken.for_user(self.user).access_token)
+        upcoming = self.add_key(timedelta(hours=12))
+
+        self.assertEqual([key['kid'] for key in json.loads(self.jwks().content)['keys']], [old, upcoming])
+        self.assertEqual(jwt.get_unverified_header(str(UserRefreshToken.for_user(self.user)))['kid'], old)
+
+        current = self.add_key(timedelta(minutes=-1))
+        self.assertEqual(jwt.get_unverified_header(str(UserRefreshToken.for_user(self.user)))['kid'], current)
+        # Tokens signed with the previous key stay valid until they expire.
+        self.assertEqual(UserAccessToken(token)['email'], 'keys@example.com')
+
+    def test_tokens_with_unknown_keys_are_rejected(self):
+        self.add_key(timedelta(hours=-1))
+        token = str(UserRefreshToken.for_user(self.user).access_token)
+        shutil.rmtree(self.directory)
+        self.add_key(timedelta(hours=-1))
+
+        with self.assertRaises(TokenError):
+            UserAccessToken(token)
+        with override_settings(JWT_ALGORITHM='HS256'), self.assertRaises(TokenError):
+            UserAccessToken(token)
+
+    def test_key_set_is_cacheable(self):
+        self.add_key(timedelta(hours=-1))
+        response = self.jwks()
+        self.assertEqual(response['Content-Type'], 'application/jwk-set+json')
+        self.assertIn('public', response['Cache-Control'])
+        self.assertIn('max-age=21600', response['Cache-Control'])
+        self.assertNotIn('"d"', response.content.decode())
+
+        cached = self.client.get(reverse('jwks'), HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(cached.status_code, 304)
+
+    def test_rotation_command_deletes_retired_keys(self):
+        retired = self.add_key(timedelta(days=-30))
+        previous = self.add_key(timedelta(days=-7))
+        current = self.add_key(timedelta(hours=-1))
+
+        out = io.StringIO()
+        call_command('rotate_signing_keys', stdout=out)
+
+        kids = [key.kid for key in load_keys(self.directory)]
+        self.assertNotIn(retired, kids)
+        # Refresh tokens signed with `previous` up to an hour ago are still live.
+        self.assertEqual(kids[:2], [previous, current])
+        self.assertEqual(len(kids), 3)
+        self.assertGreater(load_keys(self.directory)[-1].activates_at, self.now + timedelta(hours=11))
+        self.assertIn(f"Deleted retired key {retired}.", out.getvalue())
+
+
+class RS256SigningKeyTests(SigningKeyTests):
+    algorithm = 'RS256'
+
+
+class SharedSecretKeySetTests(TestCase):
+    def test_shared_secret_is_never_published(self):
+        response = self.client.get(reverse('jwks'))
+        self.assertEqual(json.loads(response.content), {'keys': []})
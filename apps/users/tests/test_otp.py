@@ -0,0 +1,62 @@
+from unittest.mock import patch
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from apps.users import otp
+from apps.users.models import OneTimeCode
+
+
+class OneTimeCodeTests(TestCase):
+    def setUp(self):
+        self.email = 'testuser@example.com'
+        with patch('apps.users.otp.generate_code', return_value='12345678'):
+            otp.issue_code(self.email)
+
+    def test_generate_code_length(self):
+        """Test that generated codes are numeric and of the configured length"""
+        code = otp.generate_code()
+        self.assertEqual(len(code), 8)
+        self.assertTrue(code.isdigit())
+
+    def test_code_is_not_stored_in_plain_text(self):
+        """Test that only the HMAC digest of the code is stored"""
+        record = OneTimeCode.objects.get(email=self.email)
+        self.assertNotIn('12345678', record.digest)
+        self.assertEqual(record.digest, otp.make_digest(self.email, '12345678'))
+
+    def test_valid_code_is_consumed(self):
+        """Test that a valid code can only be used once"""
+        self.assertEqual(otp.verify_code(self.email, '12345678'), otp.VALID)
+        self.assertEqual(otp.verify_code(self.email, '12345678'), otp.INVALID)
+
+    def test_reissue_replaces_pending_code(self):
+        """Test that requesting a new code invalidates the previous one"""
+        with patch('apps.users.otp.generate_code', return_value='87654321'):
+            otp.issue_code(self.email)
+        self.assertEqual(OneTimeCode.objects.filter(email=self.email).count(), 1)
+        self.assertEqual(otp.verify_code(self.email, '12345678'), otp.INVALID)
+        self.assertEqual(otp.verify_code(self.email, '87654321'), otp.VALID)
+
+    def test_expired_code(self):
+        """Test that an expired code is rejected and removed"""
+        OneTimeCode.objects.update(expires_at=timezone.now() - timezone.timedelta(seconds=1))
+        self.assertEqual(otp.verify_code(self.email, '12345678'), otp.EXPIRED)
+        self.assertFalse(OneTimeCode.objects.exists())
+
+    @override_settings(OTP_MAX_ATTEMPTS=2)
+    def test_attempts_are_limited(self):
+        """Test that the code is dropped after too many wrong guesses"""
+        self.assertEqual(otp.verify_code(self.email, '00000000'), otp.INVALID)
+        self.assertEqual(otp.verify_code(self.email, '00000001'), otp.INVALID)
+        self.assertEqual(otp.verify_code(self.email, '12345678'), otp.INVALID)
+        self.assertFalse(OneTimeCode.objects.exists())
+
+    def test_purge_expired(self):
+        """Test that purge_expired only removes expired codes"""
+        otp.issue_code('other@example.com')
+        OneTimeCode.objects.filter(email=self.email).update(
+            expires_at=timezone.now() - timezone.timedelta(seconds=1)
+        )
+        self.assertEqual(OneTimeCode.objects.purge_expired(), 1)
+        self.assertTrue(OneTimeCode.objects.filter(email='other@example.com').exists())
@@ -0,0 +1,161 @@
+from io import StringIO
+from unittest.mock import patch
+
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from apps.users.models import OutboundEmail
+from apps.users.outbox import drain_outbox, enqueue_mail, retry_delay
+
+
+@override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend')
+class OutboxTests(TestCase):
+    def enqueue(self, to='testuser@example.com'):
+        return enqueue_mail('Subject', 'Body', 'shop@example.com', [to])
+
+    def test_enqueue_does_not_send(self):
+        """Test that enqueueing only stores the message"""
+        email = self.enqueue()
+        self.assertEqual(email.status, OutboundEmail.PENDING)
+        self.assertEqual(len(mail.outbox), 0)
+
+    def test_drain_sends_due_messages(self):
+        """Test that draining sends every due message and marks it sent"""
+        self.enqueue()
+        self.enqueue('other@example.com')
+        self.assertEqual(drain_outbox(), (2, 0))
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertEqual(mail.outbox[0].to, ['testuser@example.com'])
+        self.assertFalse(OutboundEmail.objects.exclude(status=OutboundEmail.SENT).exists())
+
+    def test_drain_respects_batch_size(self):
+        """Test that a single drain sends at most one batch"""
+        for _ in range(3):
+            self.enqueue()
+        self.assertEqual(drain_outbox(batch_size=2), (2, 0))
+        self.assertEqual(OutboundEmail.objects.filter(status=OutboundEmail.PENDING).count(), 1)
+
+    def test_drain_skips_messages_not_yet_due(self):
+        """Test that messages waiting for a retry are left alone"""
+        email = self.enqueue()
+        email.next_attempt_at = timezone.now() + timezone.timedelta(minutes=1)
+        email.save()
+        self.assertEqual(drain_outbox(), (0, 0))
+
+    def test_failed_send_is_retried_later(self):
+        """Test that a failure schedules a retry with backoff"""
+        email = self.enqueue()
+        with patch.object(EmailBackend, 'send_messages', side_effect=OSError('relay down')):
+            self.assertEqual(drain_outbox(), (0, 1))
+        email.refresh_from_db()
+        self.assertEqual(email.status, OutboundEmail.PENDING)
+        self.assertEqual(email.attempts, 1)
+        self.assertIn('relay down', email.last_error)
+        self.assertGreater(email.next_attempt_at, timezone.now())
+
+    @override_settings(OUTBOX_MAX_ATTEMPTS=2)
+    def test_message_is_dead_lettered(self):
+        """Test that a message is marked dead after too many failures"""
+        email = self.enqueue()
+        with patch.object(EmailBackend, 'send_messages', side_effect=OSError('relay down')):
+            drain_outbox()
+            OutboundEmail.objects.update(next_attempt_at=timezone.now())
+            drain_outbox()
+        email.refresh_from_db()
+        self.assertEqual(email.status, OutboundEmail.DEAD)
+
+    def test_retry_delay_backs_off(self):
+        """Test that the retry delay doubles with every attempt"""
+        self.assertEqual(retry_delay(2), retry_delay(1) * 2)
+        self.assertEqual(retry_delay(3), retry_delay(1) * 4)
+
+    def test_command_drains_outbox_once(self):
+        """Test that the worker command sends everything that is due and exits"""
+        for _ in range(3):
+            self.enqueue()
+        out = StringIO()
+        call_command('send_queued_mail', '--once', '--batch-size', '2', stdout=out)
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertIn('Sent 2, failed 0.', out.getvalue())
+
+    def test_sent_body_is_blanked(self):
+        """Test that a delivered message no longer stores the login code"""
+        email = self.enqueue()
+        drain_outbox()
+        email.refresh_from_db()
+        self.assertEqual(email.body, '')
+        self.assertEqual(mail.outbox[0].body, 'Body')
+
+    def test_each_delivery_is_committed_on_its_own(self):
+        """Test that a crash mid-batch keeps the messages already sent marked as sent"""
+        first, second = self.enqueue(), self.enqueue('other@example.com')
+        send = EmailBackend.send_messages
+
+        def crash_on_second(backend, messages):
+            if messages[0].to == ['other@example.com']:
+                raise SystemExit
+            return send(backend, messages)
+
+        with patch.object(EmailBackend, 'send_messages', crash_on_second), self.assertRaises(SystemExit):
+            drain_outbox()
+
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual(first.status, OutboundEmail.SENT)
+        self.assertEqual(second.status, OutboundEmail.PENDING)
+        # The crashed worker's claim keeps other workers off the row until it runs out.
+        self.assertEqual(drain_outbox(), (0, 0))
+        OutboundEmail.objects.filter(pk=second.pk).update(next_attempt_at=timezone.now())
+        self.assertEqual(drain_outbox(), (1, 0))
+
+    def test_failed_send_reopens_the_connection(self):
+        """Test that the rest of a batch goes over one fresh connection, not one per message"""
+        self.enqueue('bounce@example.com')
+        self.enqueue()
+        self.enqueue('other@example.com')
+        send = EmailBackend.send_messages
+
+        def bounce(backend, messages):
+            if messages[0].to == ['bounce@example.com']:
+                raise OSError('session dropped')
+            return send(backend, messages)
+
+        connection = EmailBackend()
+        with patch.object(EmailBackend, 'send_messages', bounce), \
+                patch.object(connection, 'open', wraps=connection.open) as open_, \
+                patch.object(connection, 'close', wraps=connection.close) as close:
+            self.assertEqual(drain_outbox(connection=connection), (2, 1))
+
+        self.assertEqual(open_.call_count, 2)
+        self.assertEqual(close.call_count, 1)
+
+    def test_failed_reopen_hands_back_the_rest(self):
+        """Test that messages left when the connection cannot be reopened are due again at once"""
+        bounced, rest = self.enqueue('bounce@example.com'), self.enqueue()
+        connection = EmailBackend()
+        with patch.object(EmailBackend, 'send_messages', side_effect=OSError('session dropped')), \
+                patch.object(connection, 'open', side_effect=[None, OSError('relay down')]), \
+                self.assertRaises(OSError):
+            drain_outbox(connection=connection)
+
+        bounced.refresh_from_db()
+        rest.refresh_from_db()
+        self.assertEqual(bounced.attempts, 1)
+        self.assertEqual(rest.attempts, 0)
+        self.assertLessEqual(rest.next_attempt_at, timezone.now())
+
+    @override_settings(OUTBOX_SENT_RETENTION=timezone.timedelta(hours=1))
+    def test_old_sent_messages_are_purged(self):
+        """Test that the purge_expired worker deletes sent messages after the retention period"""
+        old, recent, pending = self.enqueue(), self.enqueue(), self.enqueue()
+        drain_outbox(batch_size=2)
+        OutboundEmail.objects.filter(pk=old.pk).update(sent_at=timezone.now() - timezone.timedelta(hours=2))
+
+        out = StringIO()
+        call_command('purge_expired', '--once', stdout=out)
+
+        self.assertIn('Deleted 1 sent emails.', out.getvalue())
+        self.assertEqual(set(OutboundEmail.objects.values_list('pk', flat=True)), {recent.pk, pending.pk})
@@ -0,0 +1,38 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from apps.users import otp
+from apps.users.models import OneTimeCode, RevokedToken
+
+
+class PurgeExpiredCommandTests(TestCase):
+    def purge(self):
+        out = StringIO()
+        call_command('purge_expired', '--once', stdout=out)
+        return out.getvalue()
+
+    def test_expired_codes_are_deleted(self):
+        """Test that the sweeper removes expired login codes and keeps pending ones"""
+        otp.issue_code('expired@example.com')
+        otp.issue_code('pending@example.com')
+        OneTimeCode.objects.filter(email='expired@example.com').update(
+            expires_at=timezone.now() - timezone.timedelta(seconds=1)
+        )
+
+        self.assertIn('Deleted 1 expired login codes.', self.purge())
+        self.assertEqual(list(OneTimeCode.objects.values_list('email', flat=True)), ['pending@example.com'])
+
+    def test_expired_revocations_are_deleted(self):
+        """Test that revocations of tokens that have expired anyway are removed"""
+        now = timezone.now()
+        RevokedToken.objects.create(key='jti:expired', expires_at=now - timezone.timedelta(seconds=1))
+        RevokedToken.objects.create(key='jti:live', expires_at=now + timezone.timedelta(days=1))
+
+        self.assertIn('Deleted 1 expired token revocations.', self.purge())
+        self.assertEqual(list(RevokedToken.objects.values_list('key', flat=True)), ['jti:live'])
+
+    def test_nothing_to_purge(self):
+        self.assertEqual(self.purge(), '')
@@ -0,0 +1,90 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from apps.orders.models import Cart, Order
+from apps.users import otp
+from apps.users.models import OneTimeCode, User
+
+
+class PurgeStaleSignupsTests(TestCase):
+    def setUp(self):
+        now = timezone.now()
+        self.old = now - timedelta(days=30)
+        self.cutoff = now - timedelta(days=7)
+        self.stale = [self.create(f'stale{i}@example.com', False, self.old + timedelta(seconds=i)) for i in range(5)]
+        self.pending = self.create('pending@example.com', False, now)
+        self.active = self.create('active@example.com', True, self.old)
+        self.imported = self.create('imported@example.com', False, None)
+
+    def create(self, email, is_active, code_created_at):
+        return User.objects.create(email=email, username=email, is_active=is_active, code_created_at=code_created_at)
+
+    def remaining(self):
+        return set(User.objects.values_list('email', flat=True))
+
+    def test_batches_walk_the_keyset(self):
+        """Test that each batch deletes at most batch_size rows and resumes after the last key"""
+        deleted, after = User.objects.purge_stale_signups(self.cutoff, 2)
+        self.assertEqual(deleted, 2)
+        self.assertEqual(after, (self.stale[1].code_created_at, self.stale[1].id))
+
+        deleted, after = User.objects.purge_stale_signups(self.cutoff, 2, after)
+        self.assertEqual(deleted, 2)
+        deleted, after = User.objects.purge_stale_signups(self.cutoff, 2, after)
+        self.assertEqual(deleted, 1)
+        self.assertEqual(User.objects.purge_stale_signups(self.cutoff, 2, after), (0, None))
+
+    def test_keeps_active_recent_and_codeless_accounts(self):
+        call_command('purge_stale_signups', '--once', '--batch-size', '2', '--pause', '0', stdout=StringIO())
+
+        self.assertEqual(self.remaining(), {'pending@example.com', 'active@example.com', 'imported@example.com'})
+
+    def test_activated_account_is_kept(self):
+        """Test that an account activated since its code was sent is kept"""
+        User.objects.filter(pk=self.stale[0].pk).update(is_active=True)
+
+        call_command('purge_stale_signups', '--once', '--pause', '0', stdout=StringIO())
+
+        self.assertIn('stale0@example.com', self.remaining())
+        self.assertNotIn('stale1@example.com', self.remaining())
+
+    def test_reports_count(self):
+        out = StringIO()
+        call_command('purge_stale_signups', '--once', '--pause', '0', stdout=out)
+        self.assertIn('Deleted 5 stale sign-ups.', out.getvalue())
+
+    def test_deactivated_accounts_are_kept(self):
+        """Test that accounts that were once active are never purged, however they were deactivated"""
+        signed_up = self.create('signed-up@example.com', False, self.old)
+        User.objects.activate(signed_up)
+        User.objects.filter(pk=signed_up.pk).update(is_active=False)
+        Cart.objects.create(user=signed_up)
+        self.active.is_active = False
+        self.active.save()
+
+        call_command('purge_stale_signups', '--once', '--pause', '0', stdout=StringIO())
+
+        self.assertTrue({'signed-up@example.com', 'active@example.com'} <= self.remaining())
+        self.assertTrue(Cart.objects.filter(user=signed_up).exists())
+
+    def test_protected_accounts_are_skipped(self):
+        """Test that an account other rows protect is left alone instead of failing its batch"""
+        Order.objects.create(user=self.stale[1], total=0, reserved_until=timezone.now())
+
+        out = StringIO()
+        call_command('purge_stale_signups', '--once', '--batch-size', '3', '--pause', '0', stdout=out)
+
+        self.assertIn('Deleted 4 stale sign-ups.', out.getvalue())
+        self.assertIn('stale1@example.com', self.remaining())
+
+    def test_pending_codes_are_deleted(self):
+        otp.issue_code('stale0@example.com')
+        otp.issue_code('pending@example.com')
+
+        call_command('purge_stale_signups', '--once', '--pause', '0', stdout=StringIO())
+
+        self.assertEqual(list(OneTimeCode.objects.values_list('email', flat=True)), ['pending@example.com'])
@@ -0,0 +1,76 @@
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from apps.users import otp, views
+from apps.users.models import User
+from apps.users.tokens import UserRefreshToken
+from online_shop.budgets import assert_query_budget
+
+
+@patch('apps.users.otp.generate_code', return_value='12345678')
+class AuthFlowQueryBudgetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.email = 'budget@example.com'
+
+    def post(self, name, data):
+        return self.client.post(reverse(f'users:{name}'), data, format='json')
+
+    def test_login_code_flow(self, mock_generate_code):
+        with assert_query_budget(views.RequestCodeView):
+            self.assertEqual(self.post('request-code', {'email': self.email}).status_code, 201)
+        # Asking again only stamps the existing account.
+        with assert_query_budget(views.RequestCodeView):
+            self.assertEqual(self.post('request-code', {'email': self.email}).status_code, 201)
+
+        with assert_query_budget(views.CodeVerificationView):
+            self.assertEqual(self.post('verify-code', {'email': self.email, 'code': '00000000'}).status_code, 400)
+        with assert_query_budget(views.CodeVerificationView):
+            self.assertEqual(self.post('verify-code', {'email': self.email, 'code': '12345678'}).status_code, 200)
+
+        data = {'email': self.email, 'first_name': 'Ada', 'last_name': 'Lovelace'}
+        with assert_query_budget(views.SignUpView):
+            self.assertEqual(self.post('sign-up', data).status_code, 200)
+        with assert_query_budget(views.SignUpView):
+            self.assertEqual(self.post('sign-up', data).status_code, 400)
+
+        user = User.objects.get(email=self.email)
+        self.assertEqual((user.first_name, user.last_name, user.is_active), ('Ada', 'Lovelace', True))
+
+    def test_sign_up_activates_only_inactive_accounts(self, mock_generate_code):
+        user = User.objects.create(email=self.email, username=self.email, is_active=False)
+        stale = User.objects.get(pk=user.pk)
+
+        self.assertTrue(User.objects.activate(user, first_name='Ada'))
+        # A second, concurrent sign-up read the account while it was inactive.
+        self.assertFalse(User.objects.activate(stale, first_name='Eve'))
+        self.assertFalse(stale.is_active)
+
+        user.refresh_from_db()
+        self.assertEqual(user.first_name, 'Ada')
+
+    def test_token_flow(self, mock_generate_code):
+        user = User.objects.create(email=self.email, username=self.email)
+        refresh = UserRefreshToken.for_user(user)
+
+        with assert_query_budget(views.ActiveUserView):
+            self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {refresh.access_token}')
+            self.assertEqual(self.client.get(reverse('users:active-user')).status_code, 200)
+        self.client.credentials()
+
+        with assert_query_budget(views.TokenRefreshView):
+            response = self.post('token-refresh', {'refresh': str(refresh)})
+        self.assertEqual(response.status_code, 200)
+        with assert_query_budget(views.LogoutView):
+            self.assertEqual(self.post('logout', {'refresh': response.data['refresh_token']}).status_code, 200)
+
+    def test_over_budget_fails(self, mock_generate_code):
+        with patch.object(views.RequestCodeView, 'query_budget', 2):
+            with self.assertRaisesMessage(AssertionError, 'RequestCodeView ran 3 queries, over its budget of 2'):
+                with assert_query_budget(views.RequestCodeView):
+                    self.post('request-code', {'email': self.email})
@@ -0,0 +1,155 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from apps.users.bloom import BloomFilter, optimal_parameters
+from apps.users.models import RevokedToken
+from apps.users.revocation import GENERATION_KEY, RevocationIndex, revocation_index
+from apps.users.tokens import UserRefreshToken
+
+User = get_user_model()
+
+
+class BloomFilterTests(TestCase):
+    def test_added_items_are_found(self):
+        """Test that a Bloom filter never misses an added item"""
+        bloom = BloomFilter.for_capacity(1000, 0.01)
+        for i in range(1000):
+            bloom.add(f'item-{i}')
+        self.assertTrue(all(f'item-{i}' in bloom for i in range(1000)))
+
+    def test_false_positive_rate(self):
+        """Test that the false-positive rate stays close to the configured one"""
+        bloom = BloomFilter.for_capacity(1000, 0.01)
+        for i in range(1000):
+            bloom.add(f'item-{i}')
+        false_positives = sum(f'other-{i}' in bloom for i in range(10000))
+        self.assertLess(false_positives, 300)
+
+    def test_optimal_parameters(self):
+        """Test the sizing of a filter for 1M items at 1%"""
+        num_bits, num_hashes = optimal_parameters(1_000_000, 0.01)
+        self.assertEqual(num_hashes, 7)
+        self.assertAlmostEqual(num_bits / 1_000_000, 9.59, places=1)
+
+
+class RevocationIndexTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.index = RevocationIndex()
+        self.expires_at = timezone.now() + timezone.timedelta(hours=1)
+
+    def test_revoke_is_recorded_once(self):
+        """Test that a key can only be revoked once"""
+        self.assertTrue(self.index.revoke('jti:a', self.expires_at))
+        self.assertFalse(self.index.revoke('jti:a', self.expires_at))
+        self.assertTrue(self.index.is_revoked('jti:a'))
+
+    def test_unrevoked_key_needs_no_query(self):
+        """Test that a key missing from the filters is rejected without a database lookup"""
+        self.index.revoke('jti:a', self.expires_at)
+        self.index.sync()
+        with self.assertNumQueries(0):
+            self.assertFalse(self.index.is_revoked('jti:b'))
+
+    def test_buckets_may_change_during_a_check(self):
+        """Test that a bucket added by another thread mid-check does not break the check"""
+        index = self.index
+        later = self.expires_at + timezone.timedelta(days=1)
+
+        class Revoking:
+            def __contains__(self, key):
+                index._add('jti:other', later)
+                return False
+
+        index.sync()
+        index.buckets[index._bucket(self.expires_at)] = Revoking()
+
+        self.assertFalse(index.is_revoked('jti:a'))
+
+    def test_revocations_from_other_processes_are_synced(self):
+        """Test that a bumped generation pulls revocations made elsewhere"""
+        other = RevocationIndex()
+        other.sync()
+        self.index.revoke('fam:a', self.expires_at)
+        self.assertEqual(cache.get(GENERATION_KEY), 1)
+        self.assertTrue(other.is_revoked('fam:a'))
+
+    def test_expired_buckets_are_dropped(self):
+        """Test that filters for already expired tokens are discarded"""
+        RevokedToken.objects.create(key='jti:old', expires_at=timezone.now() - timezone.timedelta(hours=2))
+        self.index._add('jti:old', timezone.now() - timezone.timedelta(hours=2))
+        self.index.sync()
+        self.assertEqual(len(self.index.buckets), 0)
+
+    def test_purge_expired(self):
+        RevokedToken.objects.create(key='jti:old', expires_at=timezone.now() - timezone.timedelta(hours=2))
+        RevokedToken.objects.create(key='jti:new', expires_at=self.expires_at)
+        self.assertEqual(RevokedToken.objects.purge_expired(), 1)
+
+
+class TokenRefreshViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        revocation_index.reset()
+        self.client = APIClient()
+        self.url = reverse('users:token-refresh')
+        self.user = User.objects.create(email='testuser@example.com', username='testuser@example.com')
+        self.refresh = UserRefreshToken.for_user(self.user)
+
+    def test_refresh_rotates_token(self):
+        """Test that refreshing returns a new pair in the same family"""
+        response = self.client.post(self.url, {'refresh': str(self.refresh)})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        rotated = UserRefreshToken(response.data['refresh_token'])
+        self.assertNotEqual(rotated['jti'], self.refresh['jti'])
+        self.assertEqual(rotated['fam'], self.refresh['fam'])
+        self.assertIn('access_token', response.data)
+
+    def test_reuse_revokes_family(self):
+        """Test that replaying a used refresh token kills the whole session"""
+        response = self.client.post(self.url, {'refresh': str(self.refresh)})
+        rotated = response.data['refresh_token']
+
+        response = self.client.post(self.url, {'refresh': str(self.refresh)})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        response = self.client.post(self.url, {'refresh': rotated})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_invalid_token(self):
+        response = self.client.post(self.url, {'refresh': 'nonsense'})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_access_token_is_not_a_refresh_token(self):
+        response = self.client.post(self.url, {'refresh': str(self.refresh.access_token)})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivated_user_cannot_refresh(self):
+        self.user.is_active = False
+        self.user.save()
+        response = self.client.post(self.url, {'refresh': str(self.refresh)})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_logout_revokes_family(self):
+        """Test that logging out revokes every token rotated from the same login"""
+        response = self.client.post(self.url, {'refresh': str(self.refresh)})
+        rotated = response.data['refresh_token']
+
+        response = self.client.post(reverse('users:logout'), {'refresh': rotated})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        response = self.client.post(self.url, {'refresh': rotated})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_logout_keeps_other_sessions(self):
+        other = UserRefreshToken.for_user(self.user)
+        self.client.post(reverse('users:logout'), {'refresh': str(self.refresh)})
+
+        response = self.client.post(self.url, {'refresh': str(other)})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
@@ -0,0 +1,128 @@
+import asyncio
+import pickle
+import shutil
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import cache
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from apps.users.checks import check_throttle_cache
+from apps.users.throttling import EmailWindowThrottle, parse_rate
+from online_shop.cache import LockingFileBasedCache
+
+RATES = {
+    'request_code_ip': '3/min',
+    'request_code_email': '2/min',
+    'verify_code_ip': '3/min',
+    'verify_code_email': '2/min',
+}
+
+
+@override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': RATES})
+class ThrottlingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.request_code_url = reverse('users:request-code')
+        self.verify_code_url = reverse('users:verify-code')
+
+    def test_parse_rate(self):
+        """Test that rates use DRF's number/period format"""
+        self.assertEqual(parse_rate('5/min'), (5, 60))
+        self.assertEqual(parse_rate('10/hour'), (10, 3600))
+
+    def test_request_code_throttled_per_email(self):
+        """Test that one email can only request a limited number of codes"""
+        data = {'email': 'testuser@example.com'}
+        for i in range(2):
+            response = self.client.post(self.request_code_url, data, REMOTE_ADDR=f'10.0.0.{i}')
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        response = self.client.post(self.request_code_url, {'email': 'TestUser@example.com'}, REMOTE_ADDR='10.0.0.9')
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn('Retry-After', response.headers)
+
+    def test_request_code_throttled_per_ip(self):
+        """Test that one client can only request a limited number of codes"""
+        for i in range(3):
+            response = self.client.post(self.request_code_url, {'email': f'user{i}@example.com'})
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        response = self.client.post(self.request_code_url, {'email': 'user9@example.com'})
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    def test_rejection_does_no_database_work(self):
+        """Test that a throttled request returns before touching the database"""
+        data = {'email': 'testuser@example.com', 'code': '12345678'}
+        for _ in range(2):
+            self.client.post(self.verify_code_url, data)
+
+        with self.assertNumQueries(0):
+            response = self.client.post(self.verify_code_url, data)
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    @override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': {}})
+    def test_scope_without_rate_is_not_throttled(self):
+        """Test that removing a rate disables that limit"""
+        for _ in range(5):
+            response = self.client.post(self.verify_code_url, {'email': 'testuser@example.com', 'code': '12345678'})
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    async def test_async_view_is_throttled(self):
+        """Test that the async views share the same limits"""
+        url = reverse('users-async:verify-code')
+        data = {'email': 'testuser@example.com', 'code': '12345678'}
+        for _ in range(2):
+            response = await self.async_client.post(url, data, content_type='application/json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = await self.async_client.post(url, data, content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn('Retry-After', response.headers)
+
+
+class AtomicCounterTests(SimpleTestCase):
+    def test_file_cache_counts_concurrent_increments(self):
+        """Test that concurrent add() + incr() on the shared file cache lose no count and keep the expiry"""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        file_cache = LockingFileBasedCache(directory, {})
+
+        def take():
+            file_cache.add('counter', 0, 3600)
+            return file_cache.incr('counter')
+
+        with ThreadPoolExecutor(max_workers=10) as pool:
+            counts = list(pool.map(lambda _: take(), range(30)))
+
+        self.assertEqual(sorted(counts), list(range(1, 31)))
+        with open(file_cache._key_to_file('counter'), 'rb') as f:
+            self.assertGreater(pickle.load(f), time.time() + 3000)
+
+    @override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': RATES})
+    async def test_concurrent_async_requests_share_one_count(self):
+        """Test that the async path allows no more requests than the limit when they arrive together"""
+        await cache.aclear()
+        request = RequestFactory().post('/')
+
+        results = await asyncio.gather(*(
+            EmailWindowThrottle().aallow_request(request, {'email': 'testuser@example.com'}, 'request_code')
+            for _ in range(20)
+        ))
+
+        self.assertEqual(results.count(True), 2)
+
+    def test_non_atomic_shared_cache_is_refused(self):
+        caches = {
+            **settings.CACHES,
+            'shared': {'BACKEND': 'django.core.cache.backends.db.DatabaseCache', 'LOCATION': 'cache'},
+        }
+        with override_settings(CACHES=caches):
+            self.assertEqual([error.id for error in check_throttle_cache(None)], ['users.E001'])
+        self.assertEqual(check_throttle_cache(None), [])
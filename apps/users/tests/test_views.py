@@ -1,3 +1,4 @@
+from django.core import mail
 from django.test import TestCase
 from django.urls import reverse
 from rest_framework.test import APIClient
@@ -7,6 +8,9 @@ from django.utils import timezone
 from unittest.mock import patch
 from rest_framework_simplejwt.tokens import RefreshToken
 
+from apps.users import otp
+from apps.users.models import OneTimeCode, OutboundEmail
+
 User = get_user_model()
 
 
@@ -16,10 +20,9 @@ class RequestCodeViewTests(TestCase):
         self.url = reverse('users:request-code')
         self.email = 'testuser@example.com'
 
-    @patch('random.randint')
-    @patch('django.core.mail.send_mail')
-    def test_post_valid_email(self, mock_send_mail, mock_randint):
-        mock_randint.side_effect = [1, 2, 3, 4, 5, 6, 7, 8]
+    @patch('apps.users.otp.generate_code')
+    def test_post_valid_email(self, mock_generate_code):
+        mock_generate_code.return_value = '12345678'
         data = {'email': self.email}
         response = self.client.post(self.url, data)
 
@@ -27,7 +30,24 @@ class RequestCodeViewTests(TestCase):
         self.assertTrue(User.objects.filter(email=self.email).exists())
         user = User.objects.get(email=self.email)
         self.assertFalse(user.is_active)
-        self.assertTrue(user.check_password('12345678'))
+        self.assertFalse(user.has_usable_password())
+        self.assertEqual(otp.verify_code(self.email, '12345678'), otp.VALID)
+
+        queued = OutboundEmail.objects.get()
+        self.assertEqual(queued.recipients, [self.email])
+        self.assertIn('12345678', queued.body)
+        self.assertEqual(len(mail.outbox), 0)
+
+    @patch('apps.users.otp.generate_code')
+    def test_post_existing_user_keeps_password(self, mock_generate_code):
+        mock_generate_code.return_value = '12345678'
+        user = User.objects.create_user(self.email, 'Password1!', username=self.email)
+        response = self.client.post(self.url, {'email': self.email})
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        user.refresh_from_db()
+        self.assertTrue(user.check_password('Password1!'))
+        self.assertIsNotNone(user.code_created_at)
 
     def test_post_invalid_email(self):
         data = {'email': 'invalid-email'}
@@ -44,9 +64,8 @@ class CodeVerificationViewTests(TestCase):
         self.url = reverse('users:verify-code')
         self.email = 'testuser@example.com'
         self.user = User.objects.create(email=self.email)
-        self.user.set_password('12345678')
-        self.user.code_created_at = timezone.now()
-        self.user.save()
+        with patch('apps.users.otp.generate_code', return_value='12345678'):
+            otp.issue_code(self.email)
 
     def test_post_valid_code_existing_user(self):
         data = {'email': self.email, 'code': '12345678'}
@@ -74,9 +93,18 @@ class CodeVerificationViewTests(TestCase):
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
         self.assertEqual(response.data['error'], 'Invalid email or code.')
 
+    def test_post_code_is_single_use(self):
+        data = {'email': self.email, 'code': '12345678'}
+        self.client.post(self.url, data)
+        response = self.client.post(self.url, data)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['error'], 'Invalid email or code.')
+
     def test_post_expired_code(self):
-        self.user.code_created_at = timezone.now() - timezone.timedelta(minutes=3)
-        self.user.save()
+        OneTimeCode.objects.filter(email=self.email).update(
+            expires_at=timezone.now() - timezone.timedelta(minutes=1)
+        )
 
         data = {'email': self.email, 'code': '12345678'}
         response = self.client.post(self.url, data)
@@ -0,0 +1,115 @@
+"""
+Rate limits for the login-code endpoints.
+
+Views opt in with a `throttle_scope`; the rates come from
+REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'] under `<scope>_ip` and
+`<scope>_email`, in DRF's 'number/period' format. A scope without a rate is
+not throttled.
+
+Each limit is a fixed window: at most `number` requests per `period`,
+counted from the start of the current period. A client can therefore make
+up to twice `number` requests around a window boundary. The count is a
+key in the default cache, taken with add() + incr(), which costs one or two
+cache round trips and no database or hashing work. Counting is only exact
+when incr() is atomic across workers; apps/users/checks.py refuses to start
+with a shared cache where it is not.
+"""
+import time
+
+from django.core.cache import cache as default_cache
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+
+def get_rate(name):
+    return api_settings.DEFAULT_THROTTLE_RATES.get(name)
+
+
+def parse_rate(rate):
+    """Returns (number of requests, period in seconds) for a rate like '5/hour'"""
+    num, period = rate.split('/')
+    duration = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}[period[0]]
+    return int(num), duration
+
+
+class FixedWindowThrottle(BaseThrottle):
+    """Counts requests per ident in the current window of the rate's period"""
+    cache = default_cache
+    cache_format = 'throttle_%(name)s_%(ident)s_%(window)s'
+    kind = None
+
+    def __init__(self):
+        self.wait_seconds = None
+
+    def get_ident_value(self, data, request):
+        raise NotImplementedError('.get_ident_value() must be overridden')
+
+    def _prepare(self, scope, ident):
+        """Returns (cache key, limit, duration, seconds until the window ends), or None if not throttled"""
+        if scope is None or ident is None:
+            return None
+        name = f'{scope}_{self.kind}'
+        rate = get_rate(name)
+        if rate is None:
+            return None
+        num_requests, duration = parse_rate(rate)
+        now = time.time()
+        window = int(now // duration)
+        key = self.cache_format % {'name': name, 'ident': ident, 'window': window}
+        return key, num_requests, duration, duration - now % duration
+
+    def _check(self, count, num_requests, remaining):
+        if count > num_requests:
+            self.wait_seconds = remaining
+            return False
+        return True
+
+    def allow_request(self, request, view):
+        prepared = self._prepare(getattr(view, 'throttle_scope', None), self.get_ident_value(request.data, request))
+        if prepared is None:
+            return True
+        key, num_requests, duration, remaining = prepared
+        self.cache.add(key, 0, duration)
+        try:
+            count = self.cache.incr(key)
+        except ValueError:
+            # The window expired between add() and incr().
+            self.cache.add(key, 1, duration)
+            count = 1
+        return self._check(count, num_requests, remaining)
+
+    async def aallow_request(self, request, data, scope):
+        """allow_request() for the async views, which are not DRF views"""
+        prepared = self._prepare(scope, self.get_ident_value(data, request))
+        if prepared is None:
+            return True
+        key, num_requests, duration, remaining = prepared
+        await self.cache.aadd(key, 0, duration)
+        try:
+            count = await self.cache.aincr(key)
+        except ValueError:
+            await self.cache.aadd(key, 1, duration)
+            count = 1
+        return self._check(count, num_requests, remaining)
+
+    def wait(self):
+        return self.wait_seconds
+
+
+class IPWindowThrottle(FixedWindowThrottle):
+    """Limits requests per client address"""
+    kind = 'ip'
+
+    def get_ident_value(self, data, request):
+        return self.get_ident(request)
+
+
+class EmailWindowThrottle(FixedWindowThrottle):
+    """Limits requests per target email address, whichever client sends them"""
+    kind = 'email'
+
+    def get_ident_value(self, data, request):
+        email = data.get('email') if hasattr(data, 'get') else None
+        if not isinstance(email, str) or not email.strip():
+            return None
+        return email.strip().lower()
@@ -0,0 +1,108 @@
+"""
+JWTs that carry enough claims to rebuild the user without a database query.
+
+Access tokens embed the user's email, active and staff flags and a
+`token_version`. ClaimsJWTAuthentication accepts a token only while its
+version matches the user's current one, which is read from the cache and
+falls back to a single-column query on a miss. That query always goes to
+the primary: a lagging replica would put a version from before a revocation
+back into the cache. Bumping the version with revoke_tokens() invalidates
+every token issued before it.
+
+Both token classes sign and verify with keys.token_backend(): SECRET_KEY,
+or the asymmetric key ring when JWT_ALGORITHM is EdDSA or RS256.
+"""
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import F
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from . import keys
+from .models import User
+
+VERSION_CLAIM = 'ver'
+FAMILY_CLAIM = 'fam'
+REVOKED = -1
+
+cache_format = 'users_token_version_%s'
+
+
+class UserAccessToken(AccessToken):
+    def get_token_backend(self):
+        return keys.token_backend()
+
+
+class UserRefreshToken(RefreshToken):
+    access_token_class = UserAccessToken
+
+    def get_token_backend(self):
+        return keys.token_backend()
+
+    @classmethod
+    def for_user(cls, user, family=None):
+        """Issues a token for the user; pass the family of the token being rotated to keep the session"""
+        token = super().for_user(user)
+        token[FAMILY_CLAIM] = family or uuid.uuid4().hex
+        token['email'] = user.email
+        token['is_active'] = user.is_active
+        token['is_staff'] = user.is_staff
+        token['is_superuser'] = user.is_superuser
+        token[VERSION_CLAIM] = user.token_version
+        return token
+
+
+def _current_version(row):
+    if row is None or not row[1]:
+        return REVOKED
+    return row[0]
+
+
+def _read_version(user_id):
+    row = User.objects.using(DEFAULT_DB_ALIAS).filter(pk=user_id).values_list('token_version', 'is_active').first()
+    return _current_version(row)
+
+
+def get_token_version(user_id):
+    """Returns the user's current token version, or REVOKED if they are missing or inactive"""
+    key = cache_format % user_id
+    version = cache.get(key)
+    if version is None:
+        version = _read_version(user_id)
+        cache.set(key, version, settings.TOKEN_VERSION_CACHE_TIMEOUT)
+    return version
+
+
+async def aget_token_version(user_id):
+    key = cache_format % user_id
+    version = await cache.aget(key)
+    if version is None:
+        row = await (
+            User.objects.using(DEFAULT_DB_ALIAS).filter(pk=user_id).values_list('token_version', 'is_active').afirst()
+        )
+        version = _current_version(row)
+        await cache.aset(key, version, settings.TOKEN_VERSION_CACHE_TIMEOUT)
+    return version
+
+
+def forget_token_version(user_id):
+    """Drops the cached token version, e.g. once the user is activated"""
+    cache.delete(cache_format % user_id)
+
+
+async def aforget_token_version(user_id):
+    await cache.adelete(cache_format % user_id)
+
+
+def revoke_tokens(user_id):
+    """Invalidates every token issued to the user so far"""
+    User.objects.filter(pk=user_id).update(token_version=F('token_version') + 1)
+    forget_token_version(user_id)
+
+    def store():
+        # A request that read the old version before the commit may have cached it again since.
+        cache.set(cache_format % user_id, _read_version(user_id), settings.TOKEN_VERSION_CACHE_TIMEOUT)
+
+    transaction.on_commit(store)
@@ -1,10 +1,18 @@
 from django.urls import path
+from rest_framework.routers import SimpleRouter
 from . import views
 
+router = SimpleRouter()
+router.register('directory', views.UserDirectoryViewSet, basename='directory')
+
 app_name = 'users'
 urlpatterns = [
     path('request-code/', views.RequestCodeView.as_view(), name='request-code'),
     path("verify-code/", views.CodeVerificationView.as_view(), name='verify-code'),
     path("sign-up/", views.SignUpView.as_view(), name='sign-up'),
     path("active-user/", views.ActiveUserView.as_view(), name='active-user'),
-]
\ No newline at end of file
+    path("token/refresh/", views.TokenRefreshView.as_view(), name='token-refresh'),
+    path("logout/", views.LogoutView.as_view(), name='logout'),
+    path("export/", views.UserExportView.as_view(), name='export'),
+    *router.urls,
+]
@@ -1,7 +1,23 @@
-import re
+import hashlib
+import string
+import threading
+
+from django.conf import settings
+from django.contrib.auth.password_validation import CommonPasswordValidator
 from django.core.exceptions import ValidationError
+from django.utils.functional import cached_property
 from django.utils.translation import gettext_lazy as _
 
+from .bloom import BloomFilter
+
+UPPERCASE = frozenset(string.ascii_uppercase)
+LOWERCASE = frozenset(string.ascii_lowercase)
+DIGITS = frozenset(string.digits)
+SPECIAL_CHARACTERS = frozenset('!@#$%^&*(),.?":{}|<>')
+
+# Header flag of breach filters built from SHA-1 digests (Have I Been Pwned dumps)
+SHA1_KEYS = 1
+
 
 class CustomValidator:
     def validate(self, password, user=None):
@@ -10,22 +26,24 @@ class CustomValidator:
                 _("Password must be at least 8 characters."),
                 code='password_too_short',
             )
-        if not re.search(r'[A-Z]', password):
+        # One pass over the password; each check below is then a set lookup.
+        characters = set(password)
+        if characters.isdisjoint(UPPERCASE):
             raise ValidationError(
                 _("Password must contain at least one uppercase letter"),
                 code='password_no_upper',
             )
-        if not re.search(r'[a-z]', password):
+        if characters.isdisjoint(LOWERCASE):
             raise ValidationError(
                 _("Password must contain at least one lowercase letter"),
                 code='password_no_lower',
             )
-        if not re.search(r'[0-9]', password):
+        if characters.isdisjoint(DIGITS):
             raise ValidationError(
                 _("Password must contain at least one number"),
                 code='password_no_number',
             )
-        if not re.search(r'[!@#$%^&*(),.?":{}|<>]', password):
+        if characters.isdisjoint(SPECIAL_CHARACTERS):
             raise ValidationError(
                 _("Password must contain at least one special character"),
                 code='password_no_special',
@@ -36,3 +54,56 @@ class CustomValidator:
             "Your password must be at least 8 characters long, contain at least one uppercase letter, "
             "one lowercase letter, and one special character."
         )
+
+
+def breach_filter_key(password, flags):
+    """Returns the bytes a breach filter with header `flags` stores for `password`"""
+    if flags & SHA1_KEYS:
+        return hashlib.sha1(password.encode()).hexdigest().upper().encode()
+    return password.encode()
+
+
+_filters = {}
+_filters_lock = threading.Lock()
+
+
+def load_breach_filter(path):
+    """Returns the memory-mapped filter at `path`, opened once per process, or None if there is none"""
+    path = str(path)
+    if path not in _filters:
+        with _filters_lock:
+            if path not in _filters:
+                try:
+                    _filters[path] = BloomFilter.open(path)
+                except (OSError, ValueError):
+                    _filters[path] = None
+    return _filters[path]
+
+
+class BreachedPasswordValidator:
+    """
+    Rejects passwords found in a breach corpus, using the Bloom filter built by
+    `manage.py build_breach_filter`. The filter is memory-mapped, so workers
+    share its pages. Until a filter is built, falls back to Django's
+    CommonPasswordValidator. Workers pick up a new filter when restarted.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or settings.BREACH_FILTER_PATH
+
+    @cached_property
+    def fallback(self):
+        return CommonPasswordValidator()
+
+    def validate(self, password, user=None):
+        breaches = load_breach_filter(self.path)
+        if breaches is None:
+            return self.fallback.validate(password, user)
+        if breach_filter_key(password, breaches.flags) in breaches:
+            raise ValidationError(
+                _("This password has appeared in a data breach."),
+                code='password_breached',
+            )
+
+    def get_help_text(self):
+        return _("Your password can't be one that has appeared in a data breach.")
@@ -1,21 +1,87 @@
-import random
-from django.core.mail import send_mail
+from django.contrib.auth.hashers import make_password
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
 from django.utils import timezone
 from rest_framework import status, viewsets
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from . import otp
+from .export import EXPORT_FIELDS, UserExport, aiterate, gzip_chunks
+from .outbox import enqueue_mail
 from .models import User
-from .serializers import EmailSerializer, CodeVerificationSerializer, SignUpSerializer
+from .pagination import DateJoinedKeysetPagination
+from .revocation import consume_refresh_token, is_token_revoked, revoke_family
+from .serializers import EmailSerializer, CodeVerificationSerializer, SignUpSerializer, RefreshTokenSerializer
+from .serializers import UserDirectoryFilterSerializer, UserDirectorySerializer, UserExportSerializer
+from .throttling import EmailWindowThrottle, IPWindowThrottle
+from .tokens import VERSION_CLAIM, FAMILY_CLAIM, UserRefreshToken
 from django.conf import settings
-from rest_framework_simplejwt.tokens import RefreshToken
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from online_shop.db.routers import follow_pin, pin_primary
+from online_shop.metrics import timed
+
+
+def new_user_defaults(email, now):
+    return {
+        'username': email,
+        'password': make_password(None),
+        'is_active': False,  # Mark user inactive until verified
+        'code_created_at': now,
+    }
+
+
+# Creates the inactive account, or only stamps code_created_at on an existing one, in one statement.
+NEW_USER_UPSERT = {'update_conflicts': True, 'unique_fields': ['email'], 'update_fields': ['code_created_at']}
+
+
+def login_code_message(email, code):
+    return (
+        "Your Login Code",
+        f"Your login code is {code}",
+        settings.EMAIL_HOST_USER,
+        [email],
+    )
+
+
+def code_sent_response_data(request):
+    return {
+        "message": "A code has been sent to your email.",
+        "verify_url": request.build_absolute_uri('/verify-code/')
+    }
+
+
+def signup_response_data(request):
+    return {
+        "message": "New user, redirecting to signup.",
+        "verify_url": request.build_absolute_uri('/sign-up/')
+    }
+
+
+def login_response_data(request, user):
+    """Issues a token pair for the user and builds the login response body"""
+    with timed('jwt'):
+        refresh = UserRefreshToken.for_user(user)
+        access_token, refresh_token = str(refresh.access_token), str(refresh)
+    return {
+        "message": "Login successful, redirecting to home",
+        "access_token": access_token,
+        "refresh_token": refresh_token,
+        "verify_url": request.build_absolute_uri('/home/')
+    }
+
 
 class RequestCodeView(APIView):
     """
     View to handle the first step where a user enters their email.
     """
+    throttle_classes = (IPWindowThrottle, EmailWindowThrottle)
+    throttle_scope = 'request_code'
+    # Upsert the account, upsert the code, queue the email.
+    query_budget = 3
 
     @swagger_auto_schema(
         request_body=EmailSerializer,
@@ -24,7 +90,8 @@ class RequestCodeView(APIView):
                 description="A code has been sent to your email.",
                 examples={"application/json": {"message": "A code has been sent to your email.", "verify_url": "/verify-code/"}}
             ),
-            400: openapi.Response(description="Invalid email.")
+            400: openapi.Response(description="Invalid email."),
+            429: openapi.Response(description="Too many requests.")
         }
     )
     def post(self, request):
@@ -32,29 +99,17 @@ class RequestCodeView(APIView):
 
         if serializer.is_valid():
             email = serializer.validated_data['email']
-            code = ''.join([str(random.randint(0, 9)) for _ in range(8)])
-
-            user, created = User.objects.get_or_create(email=email)
-            if created:
-                user.is_active = False  # Mark user inactive until verified
-            user.set_password(code)
-            user.code_created_at = timezone.now()
-            user.save()
-
-            send_mail(
-                "Your Login Code",
-                f"Your login code is {code}",
-                settings.EMAIL_HOST_USER,
-                [email],
-                fail_silently=False,
-            )
-
-            response_data = {
-                "message": "A code has been sent to your email.",
-                "verify_url": request.build_absolute_uri('/verify-code/')
-            }
-
-            return Response(response_data, status=status.HTTP_201_CREATED)
+            now = timezone.now()
+
+            User.objects.bulk_create([User(email=email, **new_user_defaults(email, now))], **NEW_USER_UPSERT)
+
+            code = otp.issue_code(email)
+            # Verify-code and sign-up read the user and the code back, maybe from a lagging replica.
+            pin_primary(email)
+
+            enqueue_mail(*login_code_message(email, code))
+
+            return Response(code_sent_response_data(request), status=status.HTTP_201_CREATED)
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -63,6 +118,10 @@ class CodeVerificationView(APIView):
     """
     View to handle code verification.
     """
+    throttle_classes = (IPWindowThrottle, EmailWindowThrottle)
+    throttle_scope = 'verify_code'
+    # Read the account and the code, then delete the code or count the attempt.
+    query_budget = 3
 
     @swagger_auto_schema(
         request_body=CodeVerificationSerializer,
@@ -72,7 +131,8 @@ class CodeVerificationView(APIView):
                 examples={"application/json": {"message": "Login successful, redirecting to home", "access_token": "<JWT_TOKEN>", "refresh_token": "<REFRESH_TOKEN>", "verify_url": "/home/"}}
             ),
             400: openapi.Response(description="Invalid email or code."),
-            302: openapi.Response(description="Redirecting to home.")
+            302: openapi.Response(description="Redirecting to home."),
+            429: openapi.Response(description="Too many requests.")
         }
     )
     def post(self, request):
@@ -80,37 +140,23 @@ class CodeVerificationView(APIView):
         if serializer.is_valid():
             email = serializer.validated_data['email']
             code = serializer.validated_data['code']
+            follow_pin(email)
 
             try:
                 user = User.objects.get(email=email)
             except User.DoesNotExist:
                 return Response({"error": "Invalid email or code."}, status=status.HTTP_400_BAD_REQUEST)
 
-            expiration_time = user.code_created_at + timezone.timedelta(minutes=2)
-            if timezone.now() > expiration_time:
+            result = otp.verify_code(email, code)
+            if result == otp.EXPIRED:
                 return Response({'error': 'The code has expired. Please request a new code.'},
                                 status=status.HTTP_400_BAD_REQUEST)
 
-            if user.check_password(code):
+            if result == otp.VALID:
                 if user.is_active:
-                    refresh = RefreshToken.for_user(user)
-                    access_token = str(refresh.access_token)
-                    refresh_token = str(refresh)
-
-                    response_data = {
-                        "message": "Login successful, redirecting to home",
-                        "access_token": access_token,
-                        "refresh_token": refresh_token,
-                        "verify_url": request.build_absolute_uri('/home/')
-                    }
-
-                    return Response(response_data, status=status.HTTP_302_FOUND)
+                    return Response(login_response_data(request, user), status=status.HTTP_302_FOUND)
                 else:
-                    response_data = {
-                        "message": "New user, redirecting to signup.",
-                        "verify_url": request.build_absolute_uri('/sign-up/')
-                    }
-                    return Response(response_data, status=status.HTTP_200_OK)
+                    return Response(signup_response_data(request), status=status.HTTP_200_OK)
             else:
                 return Response({'error': 'Invalid email or code.'}, status=status.HTTP_400_BAD_REQUEST)
 
@@ -121,6 +167,8 @@ class SignUpView(APIView):
     """
     View to handle the sign up process.
     """
+    # Read the account, then activate it with one conditional UPDATE.
+    query_budget = 2
 
     @swagger_auto_schema(
         request_body=SignUpSerializer,
@@ -134,6 +182,7 @@ class SignUpView(APIView):
     )
     def post(self, request):
         email = request.data.get('email')
+        follow_pin(email)
         try:
             user = User.objects.get(email=email)
         except User.DoesNotExist:
@@ -144,26 +193,17 @@ class SignUpView(APIView):
 
         serializer = SignUpSerializer(user, data=request.data)
         if serializer.is_valid():
-            serializer.save()
-            user.is_active = True
-            user.save()
-
-            refresh = RefreshToken.for_user(user)
-            access_token = str(refresh.access_token)
-            refresh_token = str(refresh)
-
-            response_data = {
-                "message": "Login successful, redirecting to home",
-                "access_token": access_token,
-                "refresh_token": refresh_token,
-                "verify_url": request.build_absolute_uri('/home/')
-            }
-            return Response(response_data, status=status.HTTP_200_OK)
+            if not User.objects.activate(user, **serializer.validated_data):
+                return Response({'error': 'User is already active.'}, status=status.HTTP_400_BAD_REQUEST)
+
+            return Response(login_response_data(request, user), status=status.HTTP_200_OK)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
 class ActiveUserView(APIView):
     permission_classes = (IsAuthenticated,)
+    # The token version, on a cache miss.
+    query_budget = 1
 
     @swagger_auto_schema(
         responses={
@@ -177,3 +217,196 @@ class ActiveUserView(APIView):
             return Response({'message': f'User {user.email} is active.'}, status=status.HTTP_200_OK)
         else:
             return Response({'message': f'User {user.email} is not active.'}, status=status.HTTP_403_FORBIDDEN)
+
+
+class UserDirectoryViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Staff-only directory of accounts, newest first. `?fields=id,email` limits
+    both the response and the columns read to the fields named.
+    """
+    permission_classes = (IsAdminUser,)
+    serializer_class = UserDirectorySerializer
+    pagination_class = DateJoinedKeysetPagination
+    # The token version on a cache miss, and the page.
+    query_budget = 2
+
+    @property
+    def query_filters(self):
+        if not hasattr(self, '_query_filters'):
+            request = getattr(self, 'request', None)
+            serializer = UserDirectoryFilterSerializer(data=request.query_params if request is not None else {})
+            serializer.is_valid(raise_exception=True)
+            self._query_filters = serializer.validated_data
+        return self._query_filters
+
+    def get_queryset(self):
+        filters = self.query_filters
+        users = User.objects.all()
+        if filters['is_active'] is not None:
+            users = users.filter(is_active=filters['is_active'])
+        if 'joined_after' in filters:
+            users = users.filter(date_joined__gte=filters['joined_after'])
+        if 'joined_before' in filters:
+            users = users.filter(date_joined__lt=filters['joined_before'])
+        if 'fields' in filters:
+            # The pagination keys are always read.
+            users = users.only(*{*filters['fields'], 'id', 'date_joined'})
+        return users
+
+    def get_serializer(self, *args, **kwargs):
+        kwargs.setdefault('fields', self.query_filters.get('fields'))
+        return super().get_serializer(*args, **kwargs)
+
+    @swagger_auto_schema(
+        manual_parameters=[
+            openapi.Parameter('is_active', openapi.IN_QUERY, type=openapi.TYPE_BOOLEAN),
+            openapi.Parameter('joined_after', openapi.IN_QUERY, description="Joined at or after, ISO 8601.",
+                              type=openapi.TYPE_STRING, format=openapi.FORMAT_DATETIME),
+            openapi.Parameter('joined_before', openapi.IN_QUERY, description="Joined before, ISO 8601.",
+                              type=openapi.TYPE_STRING, format=openapi.FORMAT_DATETIME),
+            openapi.Parameter('fields', openapi.IN_QUERY, description="Comma-separated fields to return.",
+                              type=openapi.TYPE_STRING),
+        ]
+    )
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+
+class UserExportView(APIView):
+    """
+    Staff-only export of every matching account, streamed as CSV or JSONL
+    (see export.py). Gzipped on the fly when the client accepts it. Pass the
+    last row's `date_joined,id` as `?after=` to export only newer accounts.
+    """
+    permission_classes = (IsAdminUser,)
+    content_types = {'csv': 'text/csv; charset=utf-8', 'jsonl': 'application/x-ndjson'}
+
+    def perform_content_negotiation(self, request, force=False):
+        # The format comes from ?output=, so an Accept of text/csv must not fail with 406.
+        return super().perform_content_negotiation(request, force=True)
+
+    @swagger_auto_schema(
+        manual_parameters=[
+            openapi.Parameter('output', openapi.IN_QUERY, enum=['csv', 'jsonl'], type=openapi.TYPE_STRING),
+            openapi.Parameter('after', openapi.IN_QUERY, description="Watermark: export accounts after "
+                              "this `<date_joined>,<id>`.", type=openapi.TYPE_STRING),
+            openapi.Parameter('is_active', openapi.IN_QUERY, type=openapi.TYPE_BOOLEAN),
+            openapi.Parameter('joined_after', openapi.IN_QUERY, description="Joined at or after, ISO 8601.",
+                              type=openapi.TYPE_STRING, format=openapi.FORMAT_DATETIME),
+            openapi.Parameter('joined_before', openapi.IN_QUERY, description="Joined before, ISO 8601.",
+                              type=openapi.TYPE_STRING, format=openapi.FORMAT_DATETIME),
+            openapi.Parameter('fields', openapi.IN_QUERY, description="Comma-separated fields to export.",
+                              type=openapi.TYPE_STRING),
+        ],
+        responses={200: openapi.Response(description="The accounts, oldest first.")}
+    )
+    def get(self, request):
+        serializer = UserExportSerializer(data=request.query_params)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        options = serializer.validated_data
+        output = options.pop('output')
+        export = UserExport(**{'fields': EXPORT_FIELDS, **options})
+
+        chunks = export.chunks(output)
+        compress = 'gzip' in request.headers.get('Accept-Encoding', '')
+        if compress:
+            chunks = gzip_chunks(chunks)
+        if isinstance(request._request, ASGIRequest):
+            chunks = aiterate(chunks)
+        response = StreamingHttpResponse(chunks, content_type=self.content_types[output])
+        response.headers['Content-Disposition'] = f'attachment; filename="users.{output}"'
+        response.headers['Vary'] = 'Accept-Encoding'
+        if compress:
+            response.headers['Content-Encoding'] = 'gzip'
+        return response
+
+
+class TokenRefreshView(APIView):
+    """
+    View to exchange a refresh token for a new token pair.
+
+    Refresh tokens are single-use: the presented token is revoked and a new one
+    from the same family is returned. Presenting an already used token revokes
+    the whole family, since it means the token was copied.
+    """
+    authentication_classes = ()
+    # Catch up on new revocations, read the account, mark the token used.
+    query_budget = 3
+
+    @swagger_auto_schema(
+        request_body=RefreshTokenSerializer,
+        responses={
+            200: openapi.Response(
+                description="A new token pair.",
+                examples={"application/json": {"access_token": "<JWT_TOKEN>", "refresh_token": "<REFRESH_TOKEN>"}}
+            ),
+            401: openapi.Response(description="Invalid, expired or revoked refresh token.")
+        }
+    )
+    def post(self, request):
+        serializer = RefreshTokenSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        invalid = Response({'error': 'Invalid or expired refresh token.'}, status=status.HTTP_401_UNAUTHORIZED)
+        try:
+            refresh = UserRefreshToken(serializer.validated_data['refresh'])
+        except TokenError:
+            return invalid
+
+        # A replica may not have seen a deactivation, logout or rotation yet.
+        pin_primary()
+        if is_token_revoked(refresh):
+            # Either the session was revoked or this token was already rotated.
+            revoke_family(refresh)
+            return invalid
+
+        try:
+            user = User.objects.get(pk=refresh[jwt_settings.USER_ID_CLAIM], is_active=True)
+        except (KeyError, User.DoesNotExist):
+            return invalid
+        if refresh.get(VERSION_CLAIM) != user.token_version:
+            return invalid
+
+        if not consume_refresh_token(refresh):
+            revoke_family(refresh)
+            return invalid
+
+        with timed('jwt'):
+            rotated = UserRefreshToken.for_user(user, family=refresh.get(FAMILY_CLAIM))
+            access_token, refresh_token = str(rotated.access_token), str(rotated)
+        return Response({
+            "access_token": access_token,
+            "refresh_token": refresh_token,
+        }, status=status.HTTP_200_OK)
+
+
+class LogoutView(APIView):
+    """
+    View to end a session by revoking its refresh token family.
+    """
+    authentication_classes = ()
+    # Revoke the family and the token.
+    query_budget = 2
+
+    @swagger_auto_schema(
+        request_body=RefreshTokenSerializer,
+        responses={
+            200: openapi.Response(description="Logged out."),
+            401: openapi.Response(description="Invalid or expired refresh token.")
+        }
+    )
+    def post(self, request):
+        serializer = RefreshTokenSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            refresh = UserRefreshToken(serializer.validated_data['refresh'])
+        except TokenError:
+            return Response({'error': 'Invalid or expired refresh token.'}, status=status.HTTP_401_UNAUTHORIZED)
+
+        revoke_family(refresh)
+        consume_refresh_token(refresh)
+        return Response({'message': 'Logged out.'}, status=status.HTTP_200_OK)
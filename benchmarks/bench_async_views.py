@@ -0,0 +1,100 @@
+"""
+Compares throughput of the sync (DRF) and async users auth views.
+
+Each iteration runs the request-code -> verify-code flow for a new email.
+The sync views are driven from a thread pool through the WSGI test client,
+the async views from one event loop through the ASGI test client, both at the
+same concurrency.
+
+    python -m benchmarks.bench_async_views --requests 500 --concurrency 50
+"""
+import argparse
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+from benchmarks.utils import django_environment, format_summary, summarize, unthrottled
+
+CODE = '12345678'
+
+
+def run_sync(iterations, concurrency):
+    from django.db import connections
+    from django.test import Client
+
+    local = threading.local()
+    latencies = []
+
+    def flow(i):
+        client = getattr(local, 'client', None)
+        if client is None:
+            client = local.client = Client()
+        email = f'sync-{i}@example.com'
+        for url, data in (
+            ('/api/users/request-code/', {'email': email}),
+            ('/api/users/verify-code/', {'email': email, 'code': CODE}),
+        ):
+            start = time.perf_counter()
+            client.post(url, data, content_type='application/json')
+            latencies.append(time.perf_counter() - start)
+
+    with ThreadPoolExecutor(concurrency) as executor:
+        start = time.perf_counter()
+        list(executor.map(flow, range(iterations)))
+        elapsed = time.perf_counter() - start
+
+        # Close the per-thread connections so the test database can be dropped.
+        barrier = threading.Barrier(concurrency)
+
+        def close(_):
+            barrier.wait()
+            connections.close_all()
+
+        list(executor.map(close, range(concurrency)))
+
+    return summarize(latencies, elapsed)
+
+
+async def run_async(iterations, concurrency):
+    from django.test import AsyncClient
+
+    client = AsyncClient()
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def flow(i):
+        email = f'async-{i}@example.com'
+        async with semaphore:
+            for url, data in (
+                ('/api/users/async/request-code/', {'email': email}),
+                ('/api/users/async/verify-code/', {'email': email, 'code': CODE}),
+            ):
+                start = time.perf_counter()
+                await client.post(url, data, content_type='application/json')
+                latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(flow(i) for i in range(iterations)))
+    elapsed = time.perf_counter() - start
+
+    return summarize(latencies, elapsed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=200, help="Login flows per mode.")
+    parser.add_argument('--concurrency', type=int, default=20)
+    args = parser.parse_args()
+
+    with django_environment(), unthrottled(), patch('apps.users.otp.generate_code', return_value=CODE):
+        sync = run_sync(args.requests, args.concurrency)
+        asynchronous = asyncio.run(run_async(args.requests, args.concurrency))
+
+    print(format_summary('sync', sync))
+    print(format_summary('async', asynchronous))
+
+
+if __name__ == '__main__':
+    main()
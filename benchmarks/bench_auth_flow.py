@@ -0,0 +1,267 @@
+"""
+Load test for the users auth flow.
+
+Each simulated user replays request-code -> verify-code -> sign-up ->
+active-user against the in-process WSGI or ASGI application, from
+--concurrency threads (WSGI) or tasks (ASGI). Mail goes to the outbox and
+the test environment's locmem backend, so no SMTP server is involved.
+
+For every stage it reports p50/p95/p99 latency, SQL queries per request and
+CPU time per request, plus overall requests per second. CPU time is the
+calling thread's under WSGI; under ASGI the views run in executor threads,
+so it is process CPU and only exact at --concurrency 1.
+
+    python -m benchmarks.bench_auth_flow --users 200 --concurrency 8 --save-baseline bench/auth.json
+    python -m benchmarks.bench_auth_flow --users 200 --concurrency 8 --baseline bench/auth.json --threshold 0.2
+
+With --baseline the run exits with status 1 if any stage's p95 latency or CPU
+time grew, or the overall throughput fell, by more than --threshold, or if
+any stage now runs more queries.
+"""
+import argparse
+import asyncio
+import contextvars
+import json
+import os
+import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+from benchmarks.utils import django_environment, percentile, unthrottled
+
+CODE = '12345678'
+STAGES = ('request-code', 'verify-code', 'sign-up', 'active-user')
+EXPECTED_STATUS = {'request-code': 201, 'verify-code': 200, 'sign-up': 200, 'active-user': 200}
+
+_query_counter = contextvars.ContextVar('bench_query_counter', default=None)
+
+
+def count_queries(execute, sql, params, many, context):
+    counter = _query_counter.get()
+    if counter is not None:
+        counter[0] += 1
+    return execute(sql, params, many, context)
+
+
+def install_query_counter():
+    """Counts queries on every connection, attributing them through a context variable"""
+    from django.db import connections
+    from django.db.backends.signals import connection_created
+
+    def add(sender=None, connection=None, **kwargs):
+        if count_queries not in connection.execute_wrappers:
+            connection.execute_wrappers.append(count_queries)
+
+    connection_created.connect(add, weak=False)
+    for connection in connections.all():
+        add(connection=connection)
+
+
+class Recorder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def record(self, stage, latency, queries, cpu, status_code):
+        with self.lock:
+            self.samples[stage].append((latency, queries, cpu))
+            if status_code != EXPECTED_STATUS[stage]:
+                self.errors[stage] += 1
+
+    def report(self, elapsed):
+        stages = {}
+        total = 0
+        for stage in STAGES:
+            samples = self.samples[stage]
+            latencies = [s[0] for s in samples]
+            total += len(samples)
+            stages[stage] = {
+                'requests': len(samples),
+                'errors': self.errors[stage],
+                'p50_ms': percentile(latencies, 50) * 1000,
+                'p95_ms': percentile(latencies, 95) * 1000,
+                'p99_ms': percentile(latencies, 99) * 1000,
+                'queries': sum(s[1] for s in samples) / len(samples) if samples else 0.0,
+                'cpu_ms': sum(s[2] for s in samples) / len(samples) * 1000 if samples else 0.0,
+            }
+        return {'rps': total / elapsed if elapsed else 0.0, 'stages': stages}
+
+
+def flow_requests(i, prefix):
+    """Yields (stage, method, path, data, headers) for one user; the caller sends the token back in"""
+    email = f'bench-{i}@example.com'
+    yield 'request-code', 'post', f'{prefix}request-code/', {'email': email}, {}
+    yield 'verify-code', 'post', f'{prefix}verify-code/', {'email': email, 'code': CODE}, {}
+    token = yield 'sign-up', 'post', f'{prefix}sign-up/', {'email': email, 'first_name': 'Bench', 'last_name': 'User'}, {}
+    yield 'active-user', 'get', f'{prefix}active-user/', None, {'Authorization': f'Bearer {token}'}
+
+
+def access_token(response):
+    try:
+        return response.json().get('access_token', '')
+    except ValueError:
+        return ''
+
+
+def run_wsgi(users, concurrency, prefix, recorder):
+    from django.db import connections
+    from django.test import Client
+
+    local = threading.local()
+
+    def flow(i):
+        client = getattr(local, 'client', None)
+        if client is None:
+            client = local.client = Client()
+        steps = flow_requests(i, prefix)
+        step = next(steps)
+        while True:
+            stage, method, path, data, headers = step
+            counter = [0]
+            token = _query_counter.set(counter)
+            cpu = time.thread_time()
+            start = time.perf_counter()
+            if method == 'post':
+                response = client.post(path, data, content_type='application/json', headers=headers)
+            else:
+                response = client.get(path, headers=headers)
+            latency = time.perf_counter() - start
+            cpu = time.thread_time() - cpu
+            _query_counter.reset(token)
+            recorder.record(stage, latency, counter[0], cpu, response.status_code)
+            try:
+                step = steps.send(access_token(response) if stage == 'sign-up' else None)
+            except StopIteration:
+                break
+
+    with ThreadPoolExecutor(concurrency) as executor:
+        start = time.perf_counter()
+        list(executor.map(flow, range(users)))
+        elapsed = time.perf_counter() - start
+
+        # Close the per-thread connections so the test database can be dropped.
+        barrier = threading.Barrier(concurrency)
+
+        def close(_):
+            barrier.wait()
+            connections.close_all()
+
+        list(executor.map(close, range(concurrency)))
+
+    return elapsed
+
+
+async def run_asgi(users, concurrency, prefix, recorder):
+    from django.test import AsyncClient
+
+    client = AsyncClient()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def flow(i):
+        async with semaphore:
+            steps = flow_requests(i, prefix)
+            step = next(steps)
+            while True:
+                stage, method, path, data, headers = step
+                counter = [0]
+                _query_counter.set(counter)
+                cpu = time.process_time()
+                start = time.perf_counter()
+                if method == 'post':
+                    response = await client.post(path, data, content_type='application/json', headers=headers)
+                else:
+                    response = await client.get(path, headers=headers)
+                latency = time.perf_counter() - start
+                cpu = time.process_time() - cpu
+                recorder.record(stage, latency, counter[0], cpu, response.status_code)
+                try:
+                    step = steps.send(access_token(response) if stage == 'sign-up' else None)
+                except StopIteration:
+                    break
+
+    start = time.perf_counter()
+    # Each task runs in its own copy of the context, so the query counters do not mix.
+    await asyncio.gather(*(flow(i) for i in range(users)))
+    return time.perf_counter() - start
+
+
+def compare(result, baseline, threshold):
+    """Returns a list of human-readable regressions of result against baseline"""
+    regressions = []
+    if result['rps'] < baseline['rps'] * (1 - threshold):
+        regressions.append(f"throughput {result['rps']:.1f} req/s < baseline {baseline['rps']:.1f} req/s")
+    for stage in STAGES:
+        now, before = result['stages'][stage], baseline['stages'].get(stage)
+        if before is None:
+            continue
+        for metric in ('p95_ms', 'cpu_ms'):
+            if now[metric] > before[metric] * (1 + threshold):
+                regressions.append(f"{stage} {metric} {now[metric]:.2f} > baseline {before[metric]:.2f}")
+        if now['queries'] > before['queries']:
+            regressions.append(f"{stage} queries {now['queries']:.1f} > baseline {before['queries']:.1f}")
+    return regressions
+
+
+def print_report(result):
+    print(f"{'stage':<14}{'req':>6}{'err':>5}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'queries':>9}{'cpu ms':>9}")
+    for stage in STAGES:
+        s = result['stages'][stage]
+        print(
+            f"{stage:<14}{s['requests']:>6}{s['errors']:>5}{s['p50_ms']:>10.2f}{s['p95_ms']:>10.2f}"
+            f"{s['p99_ms']:>10.2f}{s['queries']:>9.1f}{s['cpu_ms']:>9.2f}"
+        )
+    print(f"throughput: {result['rps']:.1f} req/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=100, help="Simulated users, each running the whole flow.")
+    parser.add_argument('--concurrency', type=int, default=1)
+    parser.add_argument('--handler', choices=['wsgi', 'asgi'], default='wsgi')
+    parser.add_argument('--async-views', action='store_true', help="Use the /api/users/async/ endpoints.")
+    parser.add_argument('--save-baseline', metavar='PATH')
+    parser.add_argument('--baseline', metavar='PATH')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help="Allowed relative regression against --baseline (default 0.2).")
+    args = parser.parse_args()
+
+    prefix = '/api/users/async/' if args.async_views else '/api/users/'
+    recorder = Recorder()
+    with django_environment(), unthrottled(), patch('apps.users.otp.generate_code', return_value=CODE):
+        install_query_counter()
+        if args.handler == 'wsgi':
+            elapsed = run_wsgi(args.users, args.concurrency, prefix, recorder)
+        else:
+            elapsed = asyncio.run(run_asgi(args.users, args.concurrency, prefix, recorder))
+
+    result = recorder.report(elapsed)
+    result['config'] = {
+        'users': args.users, 'concurrency': args.concurrency,
+        'handler': args.handler, 'async_views': args.async_views,
+    }
+    print_report(result)
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save_baseline)), exist_ok=True)
+        with open(args.save_baseline, 'w') as f:
+            json.dump(result, f, indent=2)
+        print(f"Baseline saved to {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(result, baseline, args.threshold)
+        if regressions:
+            print("Regressions against the baseline:")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print("No regressions against the baseline.")
+
+
+if __name__ == '__main__':
+    main()
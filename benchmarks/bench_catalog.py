@@ -0,0 +1,102 @@
+"""
+Benchmarks the catalog listing on a large seeded table.
+
+Seeds --products products (a million by default) with bulk_create, then
+measures:
+
+- keyset / offset: fetching one page --depth of the way into the listing,
+  as the cursor paginator does (`id < pivot ORDER BY id DESC LIMIT n+1`)
+  and as OFFSET pagination would (`LIMIT n OFFSET k` plus a COUNT);
+- cold / cached / 304: the first listing page over HTTP with an empty
+  cache, from the listing cache, and revalidated with If-None-Match.
+
+    python -m benchmarks.bench_catalog --products 1000000 --requests 50
+"""
+import argparse
+import itertools
+import time
+from decimal import Decimal
+
+from benchmarks.utils import django_environment, format_summary, summarize
+
+PAGE_SIZE = 50
+CATEGORIES = 50
+
+
+def seed(total, batch_size=10_000):
+    from apps.catalog.cache import bump_listing_version
+    from apps.catalog.models import Category, Product
+
+    categories = Category.objects.bulk_create(
+        Category(name=f'Category {i}', slug=f'category-{i}') for i in range(CATEGORIES)
+    )
+    products = (
+        Product(
+            name=f'Product {i}', slug=f'product-{i}', category=categories[i % CATEGORIES],
+            category_name=categories[i % CATEGORIES].name, category_slug=categories[i % CATEGORIES].slug,
+            price=Decimal(i % 10_000) / 100,
+        )
+        for i in range(total)
+    )
+    start = time.perf_counter()
+    while batch := list(itertools.islice(products, batch_size)):
+        Product.objects.bulk_create(batch)
+    bump_listing_version()
+    return time.perf_counter() - start
+
+
+def measure(requests, func):
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(requests):
+        t = time.perf_counter()
+        func()
+        latencies.append(time.perf_counter() - t)
+    return summarize(latencies, time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--products', type=int, default=1_000_000)
+    parser.add_argument('--requests', type=int, default=50, help="Requests per measurement.")
+    parser.add_argument('--depth', type=float, default=0.5,
+                        help="How far into the listing the keyset/offset page is, 0 to 1 (default 0.5).")
+    args = parser.parse_args()
+
+    with django_environment():
+        from django.core.cache import cache
+        from django.test import Client
+
+        from apps.catalog.models import Product
+        from apps.catalog.serializers import ProductListSerializer
+
+        elapsed = seed(args.products)
+        print(f"Seeded {args.products} products in {elapsed:.1f}s")
+
+        listing = Product.objects.filter(is_active=True).only(*ProductListSerializer.Meta.fields).order_by('-id')
+        offset = int(args.products * args.depth)
+        pivot = Product.objects.order_by('-id').values_list('id', flat=True)[offset]
+
+        results = {
+            'keyset': measure(args.requests, lambda: list(listing.filter(id__lt=pivot)[:PAGE_SIZE + 1])),
+            'offset': measure(args.requests, lambda: (listing.count(), list(listing[offset:offset + PAGE_SIZE]))),
+        }
+
+        client = Client()
+        url = '/api/catalog/products/'
+
+        def cold():
+            cache.clear()
+            client.get(url)
+
+        results['cold'] = measure(args.requests, cold)
+        etag = client.get(url).headers['ETag']
+        results['cached'] = measure(args.requests, lambda: client.get(url))
+        results['304'] = measure(args.requests, lambda: client.get(url, headers={'If-None-Match': etag}))
+
+    for name, summary in results.items():
+        print(format_summary(name, summary))
+
+
+if __name__ == '__main__':
+    main()
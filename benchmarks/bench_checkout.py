@@ -0,0 +1,98 @@
+"""
+Flash-sale benchmark: many threads checking out the same SKU at once.
+
+Creates one SKU with --stock units and starts --buyers threads, each with
+its own user and database connection, placing one-unit orders until the SKU
+sells out. Then checks that nothing was oversold: orders placed and units
+ordered must both equal the starting stock, and `available` must end at zero.
+
+Reports checkouts per second and the latency of successful checkouts.
+Run it against PostgreSQL to measure real contention; SQLite serializes all
+writers, so there it only checks correctness.
+
+    python -m benchmarks.bench_checkout --stock 2000 --buyers 32
+"""
+import argparse
+import threading
+import time
+from decimal import Decimal
+
+from benchmarks.utils import django_environment, format_summary, summarize
+
+
+def buyer(user_id, stock_item_id, start, results, lock):
+    from django.db import OperationalError, connection
+
+    from apps.orders import inventory
+
+    latencies, sold_out, errors = [], 0, 0
+    start.wait()
+    try:
+        while True:
+            t = time.perf_counter()
+            try:
+                inventory.place_order(user_id, {stock_item_id: 1})
+            except inventory.OutOfStock:
+                sold_out += 1
+                break
+            except OperationalError:
+                # Lock timeouts and the like; the checkout rolled back, so try again.
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - t)
+    finally:
+        connection.close()
+    with lock:
+        results['latencies'] += latencies
+        results['sold_out'] += sold_out
+        results['errors'] += errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--stock', type=int, default=2000)
+    parser.add_argument('--buyers', type=int, default=32, help="Concurrent threads.")
+    args = parser.parse_args()
+
+    with django_environment():
+        from django.db.models import Sum
+
+        from apps.catalog.models import Category, Product
+        from apps.orders.models import Order, OrderLine, StockItem
+        from apps.users.models import User
+
+        category = Category.objects.create(name='Sale', slug='sale')
+        product = Product.objects.create(name='Hot item', slug='hot-item', category=category, price=Decimal('1.00'))
+        item = StockItem.objects.create(sku='HOT-1', product=product, available=args.stock)
+        users = User.objects.bulk_create(
+            User(email=f'buyer{i}@example.com', username=f'buyer{i}@example.com') for i in range(args.buyers)
+        )
+
+        start, lock = threading.Event(), threading.Lock()
+        results = {'latencies': [], 'sold_out': 0, 'errors': 0}
+        threads = [
+            threading.Thread(target=buyer, args=(user.id, item.id, start, results, lock)) for user in users
+        ]
+        for thread in threads:
+            thread.start()
+        began = time.perf_counter()
+        start.set()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - began
+
+        item.refresh_from_db()
+        orders = Order.objects.count()
+        lines = OrderLine.objects.filter(stock_item=item).aggregate(total=Sum('quantity'))['total'] or 0
+
+    print(format_summary('checkout', summarize(results['latencies'], elapsed)))
+    print(f"buyers turned away: {results['sold_out']}, retried errors: {results['errors']}")
+    print(f"stock {args.stock}: orders {orders}, units ordered {lines}, left {item.available}")
+    oversold = orders != args.stock or lines != args.stock or item.available != 0
+    print("FAIL: stock and orders disagree" if oversold else "OK: sold out exactly, nothing oversold")
+    if oversold:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
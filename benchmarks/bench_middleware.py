@@ -0,0 +1,77 @@
+"""
+Measures the per-request overhead of the full middleware chain on API routes.
+
+Calls the WSGI entry point directly, bypassing the test client, with the same
+requests routed through the full MIDDLEWARE handler and through the lean
+API_MIDDLEWARE handler, alternating between the two to cancel out drift:
+
+- active-user: an authenticated GET that runs no queries;
+- refresh-invalid: a refresh whose token fails verification, before it reaches the database.
+
+    python -m benchmarks.bench_middleware --requests 5000
+"""
+import argparse
+import io
+import json
+import time
+
+from benchmarks.utils import django_environment, format_summary, summarize
+
+
+def make_requests(token):
+    from django.test import RequestFactory
+
+    factory = RequestFactory()
+    return {
+        'active-user': factory.get(
+            '/api/users/active-user/', headers={'Authorization': f'Bearer {token}'},
+        ).environ,
+        'refresh-invalid': factory.post(
+            '/api/users/token/refresh/', json.dumps({'refresh': 'invalid'}), content_type='application/json',
+        ).environ,
+    }
+
+
+def call(handler, environ):
+    environ = dict(environ)
+    body = environ['wsgi.input']
+    environ['wsgi.input'] = io.BytesIO(body.getvalue() if hasattr(body, 'getvalue') else b'')
+    start = time.perf_counter()
+    handler(environ, lambda status, headers: None).close()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=2000, help="Requests per endpoint and chain.")
+    args = parser.parse_args()
+
+    with django_environment():
+        from apps.users.models import User
+        from apps.users.tokens import UserRefreshToken
+        from online_shop.handlers import RoutingWSGIHandler
+
+        user = User.objects.create(email='bench@example.com', username='bench@example.com', is_active=True)
+        token = str(UserRefreshToken.for_user(user).access_token)
+        application = RoutingWSGIHandler()
+        chains = {'full': application.full, 'lean': application.lean}
+
+        results = {}
+        for endpoint, environ in make_requests(token).items():
+            latencies = {name: [] for name in chains}
+            for name, handler in chains.items():
+                call(handler, environ)  # warm up
+            for _ in range(args.requests):
+                for name, handler in chains.items():
+                    latencies[name].append(call(handler, environ))
+            results[endpoint] = {name: summarize(samples, sum(samples)) for name, samples in latencies.items()}
+
+    for endpoint, summaries in results.items():
+        for name, summary in summaries.items():
+            print(format_summary(f'{endpoint}/{name}', summary))
+        saved = (summaries['full']['p50_ms'] - summaries['lean']['p50_ms']) * 1000
+        print(f"{endpoint}: lean chain saves {saved:.1f} us per request at p50")
+
+
+if __name__ == '__main__':
+    main()
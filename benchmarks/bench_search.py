@@ -0,0 +1,106 @@
+"""
+Benchmarks product search and autocomplete on a seeded catalog.
+
+Seeds --products products with bulk_create, indexes them with
+`build_search_index`, builds the autocomplete trie, then measures:
+
+- like: the `name LIKE '%term%'` scan that search replaces, and
+- search: a ranked full-text query through the index, both for
+  "<brand> <word>" queries, which match a few products each;
+- trie: one autocomplete lookup in memory;
+- autocomplete: the autocomplete endpoint over HTTP.
+
+    python -m benchmarks.bench_search --products 200000 --requests 200
+"""
+import argparse
+import itertools
+import random
+import time
+from decimal import Decimal
+
+from benchmarks.utils import django_environment, format_summary, summarize
+
+WORDS = (
+    'running trail leather canvas wool cotton summer winter classic sport travel city mountain slim '
+    'shoe boot sandal bag jacket shirt hat scarf glove sock belt wallet backpack coat'
+).split()
+PREFIXES = ('sho', 'run', 'leather b', 'w', 'tra', 'mountain ba', 'cot')
+BRANDS = 2000
+
+
+SYLLABLES = [consonant + vowel for consonant in 'bdfklmnprstvz' for vowel in 'aeiou']
+
+
+def brand(i):
+    # Pronounceable made-up names, so that a query like "<brand> boot" is selective
+    return ''.join(SYLLABLES[i // len(SYLLABLES) ** k % len(SYLLABLES)] for k in range(3)).title()
+
+
+def seed(total, batch_size=10_000):
+    from apps.catalog.models import Category, Product
+
+    category = Category.objects.create(name='Everything', slug='everything')
+    rng = random.Random(0)
+    products = (
+        Product(
+            name=f"{brand(rng.randrange(BRANDS))} {' '.join(rng.sample(WORDS, 2)).title()}",
+            slug=f'product-{i}', category=category, category_name=category.name, category_slug=category.slug, price=Decimal('9.99'),
+            description=' '.join(rng.sample(WORDS, 8)),
+        )
+        for i in range(total)
+    )
+    while batch := list(itertools.islice(products, batch_size)):
+        Product.objects.bulk_create(batch)
+
+
+def measure(requests, func):
+    latencies = []
+    start = time.perf_counter()
+    for i in range(requests):
+        t = time.perf_counter()
+        func(i)
+        latencies.append(time.perf_counter() - t)
+    return summarize(latencies, time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--products', type=int, default=200_000)
+    parser.add_argument('--requests', type=int, default=200, help="Requests per measurement.")
+    args = parser.parse_args()
+
+    with django_environment():
+        from django.core.management import call_command
+        from django.test import Client
+
+        from apps.catalog.models import Product
+        from apps.search import backends
+        from apps.search.autocomplete import autocomplete
+
+        seed(args.products)
+        start = time.perf_counter()
+        call_command('build_search_index', verbosity=0)
+        print(f"Indexed {args.products} products in {time.perf_counter() - start:.1f}s")
+        start = time.perf_counter()
+        autocomplete.refresh()
+        print(f"Built the autocomplete trie in {time.perf_counter() - start:.1f}s")
+
+        client = Client()
+        terms = [f'{brand(i)} {WORDS[i % len(WORDS)]}' for i in range(BRANDS)]
+        results = {
+            'like': measure(args.requests, lambda i: list(
+                Product.objects.filter(name__icontains=terms[i % len(terms)])[:20]
+            )),
+            'search': measure(args.requests, lambda i: backends.search(terms[i % len(terms)], 20)),
+            'trie': measure(args.requests, lambda i: autocomplete.suggest(PREFIXES[i % len(PREFIXES)])),
+            'autocomplete': measure(args.requests, lambda i: client.get(
+                '/api/search/autocomplete/', {'q': PREFIXES[i % len(PREFIXES)]},
+            )),
+        }
+
+    for name, summary in results.items():
+        print(format_summary(name, summary))
+
+
+if __name__ == '__main__':
+    main()
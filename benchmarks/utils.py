@@ -0,0 +1,68 @@
+"""
+Helpers shared by the benchmark scripts.
+
+Benchmarks run in-process against a throwaway test database created from the
+configured DATABASES, with Django's test environment active (locmem email
+backend, `testserver` allowed). Run them from the project root, e.g.
+
+    python -m benchmarks.bench_async_views --requests 500 --concurrency 50
+"""
+import contextlib
+import os
+import statistics
+
+import django
+
+
+@contextlib.contextmanager
+def django_environment(aliases=None):
+    """Sets Django up and yields with a fresh test database, dropping it afterwards"""
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'online_shop.settings')
+    django.setup()
+
+    from django.test.utils import (
+        setup_databases, setup_test_environment, teardown_databases, teardown_test_environment,
+    )
+
+    setup_test_environment()
+    old_config = setup_databases(verbosity=0, interactive=False, aliases=aliases)
+    try:
+        yield
+    finally:
+        teardown_databases(old_config, verbosity=0)
+        teardown_test_environment()
+
+
+def unthrottled():
+    """Returns an override_settings that lifts the login-code limits; benchmark clients share one address"""
+    from django.conf import settings
+    from django.test import override_settings
+
+    return override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': {}})
+
+
+def percentile(samples, pct):
+    """Returns the pct-th percentile of samples, interpolating between ranks"""
+    if not samples:
+        return 0.0
+    if len(samples) == 1:
+        return samples[0]
+    return statistics.quantiles(samples, n=100, method='inclusive')[pct - 1]
+
+
+def summarize(latencies, elapsed):
+    """Returns throughput and latency percentiles (in ms) for a run"""
+    return {
+        'requests': len(latencies),
+        'rps': len(latencies) / elapsed if elapsed else 0.0,
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p95_ms': percentile(latencies, 95) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+    }
+
+
+def format_summary(name, summary):
+    return (
+        f"{name:<12} {summary['requests']:>7} req  {summary['rps']:>9.1f} req/s  "
+        f"p50 {summary['p50_ms']:>8.2f} ms  p95 {summary['p95_ms']:>8.2f} ms  p99 {summary['p99_ms']:>8.2f} ms"
+    )
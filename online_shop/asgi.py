@@ -2,6 +2,7 @@
 ASGI config for online_shop project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Requests under API_URL_PREFIXES run through API_MIDDLEWARE, see handlers.py.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
@@ -9,7 +10,7 @@ https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
 
 import os
 
-from django.core.asgi import get_asgi_application
+from online_shop.handlers import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "online_shop.settings")
 
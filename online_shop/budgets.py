@@ -0,0 +1,57 @@
+"""
+Query budgets: the most database queries one request to a view may run.
+
+A view declares its budget as a `query_budget` class attribute. In tests,
+`with assert_query_budget(view):` fails when the block runs more queries, on
+any database, than that budget. With DEBUG on, QueryBudgetMiddleware raises
+QueryBudgetExceeded for every request that runs over the budget of its view,
+so an extra round trip shows up on the first request that makes it.
+
+Both count the same statements: transaction control (BEGIN, COMMIT,
+ROLLBACK and savepoints) is left out, see is_query. Under TestCase every
+atomic block makes a savepoint; outside it, the outermost one opens a
+transaction instead, and SQLite sends an explicit BEGIN. Neither is a query
+the view chose to run, so a budget means the same in tests and at runtime.
+"""
+import contextlib
+
+from django.db import connections
+
+TRANSACTION_STATEMENTS = ('BEGIN', 'COMMIT', 'ROLLBACK', 'SAVEPOINT', 'RELEASE SAVEPOINT')
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def is_query(sql):
+    """Whether a statement counts against a query budget: anything but transaction control"""
+    return not sql.lstrip().upper().startswith(TRANSACTION_STATEMENTS)
+
+
+def query_budget(view):
+    """Returns the budget of a view class, or of the function as_view() made of one; None if it has none"""
+    view = getattr(view, 'view_class', view)
+    return getattr(view, 'query_budget', None)
+
+
+def over_budget_message(name, budget, queries):
+    return f"{name} ran {queries} queries, over its budget of {budget}"
+
+
+@contextlib.contextmanager
+def assert_query_budget(view):
+    from django.test.utils import CaptureQueriesContext
+
+    budget = query_budget(view)
+    if budget is None:
+        raise ValueError(f"{view!r} declares no query_budget")
+    with contextlib.ExitStack() as stack:
+        captured = [stack.enter_context(CaptureQueriesContext(connections[alias])) for alias in connections]
+        yield
+    queries = [
+        query['sql'] for context in captured for query in context.captured_queries if is_query(query['sql'])
+    ]
+    if len(queries) > budget:
+        message = over_budget_message(getattr(view, '__name__', repr(view)), budget, len(queries))
+        raise QueryBudgetExceeded('\n'.join([f'{message}:', *queries]))
@@ -0,0 +1,413 @@
+"""
+Two-tier cache: a bounded in-process LRU in front of the cache all workers share.
+
+TwoTierCache is the default cache. Keys in one of its NAMESPACES, i.e. keys
+starting with "<namespace>:", are also kept in a near tier: an LRU of at most
+NEAR_MAX_ENTRIES per process, whose entries live at most NEAR_TIMEOUT seconds.
+A hit there costs no round trip. Other keys, such as throttle counters,
+replica pins and token versions, go straight to the shared cache and behave
+exactly as they would without this backend.
+
+Near entries are never invalidated one by one. Instead every namespace has
+a generation, a counter stored in the shared cache and part of each of its
+keys: `catalog:listing:<hash>` is stored as `catalog:<generation>:listing:<hash>`.
+`cache.invalidate('catalog')` bumps the counter, which makes every entry of
+the namespace unreachable, in the shared cache and in the near tier of every
+worker, without a message to any of them. A worker trusts its copy of a
+generation for GENERATION_TIMEOUT seconds, so other workers see an
+invalidation that much later; the worker that invalidates sees it at once.
+Namespaces therefore suit derived data that is invalidated as a whole; a
+`set()` of a namespaced key may be seen late by workers that hold an old
+copy, for up to NEAR_TIMEOUT.
+
+add() and incr() go to the shared cache's own add() and incr(), also from
+async code, so counters are as atomic as that backend makes them. The
+shared file cache is a LockingFileBasedCache for that reason.
+
+Concurrent misses on one key in a process are coalesced: one thread fetches
+from the shared cache, or renders the value in get_or_set(), while the
+others wait for its result. Hits and misses per tier are counted and exported
+on /metrics as cache_requests_total.
+"""
+import collections
+import contextlib
+import os
+import pickle
+import tempfile
+import threading
+import time
+import zlib
+
+from asgiref.sync import sync_to_async
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.files import locks
+from django.core.files.move import file_move_safe
+
+from .metrics import registry
+
+MISSING = object()
+
+
+class NearCache:
+    """A thread-safe LRU whose entries also expire"""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.entries = collections.OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return MISSING
+            expires_at, pickled = entry
+            if expires_at <= time.monotonic():
+                del self.entries[key]
+                return MISSING
+            self.entries.move_to_end(key)
+        return pickle.loads(pickled)
+
+    def set(self, key, value, timeout):
+        # Pickled like LocMemCache does, so callers never share a mutable value.
+        entry = (time.monotonic() + timeout, pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+        with self.lock:
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def __len__(self):
+        return len(self.entries)
+
+
+class Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class ProcessState:
+    """What the per-thread TwoTierCache instances of one process share"""
+
+    def __init__(self, max_entries):
+        self.near = NearCache(max_entries)
+        self.generations = {}
+        self.flights = {}
+        self.flights_lock = threading.Lock()
+        self.stats = collections.Counter()
+        self.stats_lock = threading.Lock()
+
+    def count(self, tier, result):
+        with self.stats_lock:
+            self.stats[tier, result] += 1
+
+    def coalesce(self, key, fetch):
+        """Returns fetch(), running it once for all threads that ask for `key` at the same time"""
+        with self.flights_lock:
+            flight = self.flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self.flights[key] = Flight()
+        if not leader:
+            self.count('shared', 'coalesced')
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+        try:
+            flight.result = fetch()
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self.flights_lock:
+                del self.flights[key]
+            flight.done.set()
+        return flight.result
+
+
+_states = {}
+_states_lock = threading.Lock()
+
+
+def collect_stats():
+    with _states_lock:
+        states = dict(_states)
+    stats = {}
+    for name, state in states.items():
+        with state.stats_lock:
+            for (tier, result), count in state.stats.items():
+                stats[(name, tier, result)] = count
+    return stats
+
+
+registry.add_counter(
+    'cache_requests_total', "Cache lookups by cache, tier and result.", ('cache', 'tier', 'result'), collect_stats,
+)
+
+
+class TwoTierCache(BaseCache):
+    def __init__(self, name, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self.name = name
+        self.shared_alias = options.get('SHARED', 'shared')
+        self.namespaces = frozenset(options.get('NAMESPACES', ()))
+        self.near_timeout = options.get('NEAR_TIMEOUT', 60)
+        self.generation_timeout = options.get('GENERATION_TIMEOUT', 1.0)
+        with _states_lock:
+            if name not in _states:
+                _states[name] = ProcessState(options.get('NEAR_MAX_ENTRIES', 5000))
+            self.state = _states[name]
+
+    @property
+    def shared(self):
+        # Cache instances are per thread, so look the shared one up every time.
+        return caches[self.shared_alias]
+
+    # Namespaces
+
+    def namespace(self, key):
+        namespace, sep, _ = key.partition(':')
+        return namespace if sep and namespace in self.namespaces else None
+
+    def generation_key(self, namespace):
+        return f'{namespace}:generation'
+
+    def generation(self, namespace):
+        """Returns the current generation of `namespace`, as last read from the shared cache"""
+        cached = self.state.generations.get(namespace)
+        now = time.monotonic()
+        if cached is not None and now - cached[1] < self.generation_timeout:
+            return cached[0]
+        key = self.generation_key(namespace)
+        generation = self.shared.get(key)
+        if generation is None:
+            # Start from the clock, so a generation lost to eviction never reuses an old number.
+            self.shared.add(key, time.time_ns(), None)
+            generation = self.shared.get(key)
+        self.state.generations[namespace] = (generation, now)
+        return generation
+
+    def invalidate(self, namespace):
+        """Makes every key of `namespace` stale, in all tiers and all workers"""
+        key = self.generation_key(namespace)
+        try:
+            generation = self.shared.incr(key)
+        except ValueError:
+            generation = time.time_ns()
+            self.shared.set(key, generation, None)
+        self.state.generations[namespace] = (generation, time.monotonic())
+
+    def shared_key(self, key, namespace):
+        return f'{namespace}:{self.generation(namespace)}:{key[len(namespace) + 1:]}'
+
+    def near_timeout_for(self, timeout):
+        if timeout is DEFAULT_TIMEOUT:
+            timeout = self.default_timeout
+        return self.near_timeout if timeout is None else min(timeout, self.near_timeout)
+
+    # Cache API
+
+    def get(self, key, default=None, version=None):
+        namespace = self.namespace(key)
+        if namespace is None:
+            value = self.shared.get(key, MISSING, version)
+            self.state.count('shared', 'miss' if value is MISSING else 'hit')
+            return default if value is MISSING else value
+
+        shared_key = self.shared_key(key, namespace)
+        near_key = self.make_key(shared_key, version)
+        value = self.state.near.get(near_key)
+        if value is not MISSING:
+            self.state.count('near', 'hit')
+            return value
+        self.state.count('near', 'miss')
+
+        def fetch():
+            value = self.shared.get(shared_key, MISSING, version)
+            self.state.count('shared', 'miss' if value is MISSING else 'hit')
+            if value is not MISSING:
+                self.state.near.set(near_key, value, self.near_timeout)
+            return value
+
+        value = self.state.coalesce(('get', near_key), fetch)
+        return default if value is MISSING else value
+
+    def get_or_set(self, key, default, timeout=DEFAULT_TIMEOUT, version=None):
+        """
+        Like BaseCache.get_or_set(), but one thread per process computes a
+        missing value while the others wait for it. A computed None is
+        returned without being stored.
+        """
+        value = self.get(key, MISSING, version)
+        if value is not MISSING:
+            return value
+
+        def fill():
+            # Another process may have stored it while this one waited.
+            value = self.get(key, MISSING, version)
+            if value is MISSING:
+                value = default() if callable(default) else default
+                if value is not None:
+                    self.set(key, value, timeout, version)
+            return value
+
+        return self.state.coalesce(('fill', self.make_key(key, version)), fill)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        namespace = self.namespace(key)
+        if namespace is None:
+            return self.shared.set(key, value, timeout, version)
+        shared_key = self.shared_key(key, namespace)
+        self.shared.set(shared_key, value, timeout, version)
+        near_timeout = self.near_timeout_for(timeout)
+        near_key = self.make_key(shared_key, version)
+        if near_timeout > 0:
+            self.state.near.set(near_key, value, near_timeout)
+        else:
+            self.state.near.delete(near_key)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        namespace = self.namespace(key)
+        if namespace is None:
+            return self.shared.add(key, value, timeout, version)
+        shared_key = self.shared_key(key, namespace)
+        added = self.shared.add(shared_key, value, timeout, version)
+        near_timeout = self.near_timeout_for(timeout)
+        if added and near_timeout > 0:
+            self.state.near.set(self.make_key(shared_key, version), value, near_timeout)
+        return added
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        namespace = self.namespace(key)
+        if namespace is not None:
+            key = self.shared_key(key, namespace)
+        return self.shared.touch(key, timeout, version)
+
+    def delete(self, key, version=None):
+        """Deletes `key`; other workers may keep a near copy of a namespaced key for up to NEAR_TIMEOUT"""
+        namespace = self.namespace(key)
+        if namespace is None:
+            return self.shared.delete(key, version)
+        shared_key = self.shared_key(key, namespace)
+        self.state.near.delete(self.make_key(shared_key, version))
+        return self.shared.delete(shared_key, version)
+
+    def has_key(self, key, version=None):
+        return self.get(key, MISSING, version) is not MISSING
+
+    def incr(self, key, delta=1, version=None):
+        namespace = self.namespace(key)
+        if namespace is None:
+            return self.shared.incr(key, delta, version)
+        shared_key = self.shared_key(key, namespace)
+        self.state.near.delete(self.make_key(shared_key, version))
+        return self.shared.incr(shared_key, delta, version)
+
+    async def aadd(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        return await sync_to_async(self.add, thread_sensitive=True)(key, value, timeout, version)
+
+    async def aincr(self, key, delta=1, version=None):
+        # BaseCache.aincr() is a get and a set; the shared backend's incr() may be atomic.
+        return await sync_to_async(self.incr, thread_sensitive=True)(key, delta, version)
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        plain = [key for key in keys if self.namespace(key) is None]
+        found = self.shared.get_many(plain, version) if plain else {}
+        for key in plain:
+            self.state.count('shared', 'hit' if key in found else 'miss')
+        for key in keys:
+            if self.namespace(key) is not None:
+                value = self.get(key, MISSING, version)
+                if value is not MISSING:
+                    found[key] = value
+        return found
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        plain = {key: value for key, value in data.items() if self.namespace(key) is None}
+        failed = self.shared.set_many(plain, timeout, version) if plain else []
+        for key, value in data.items():
+            if key not in plain:
+                self.set(key, value, timeout, version)
+        return failed
+
+    def delete_many(self, keys, version=None):
+        for key in keys:
+            self.delete(key, version)
+
+    def clear(self):
+        self.shared.clear()
+        self.state.near.clear()
+        self.state.generations.clear()
+
+    def stats(self):
+        """Returns this process's counts of {(tier, result): lookups} and the near tier size"""
+        with self.state.stats_lock:
+            counts = dict(self.state.stats)
+        return {'counts': counts, 'near_entries': len(self.state.near)}
+
+
+class LockingFileBasedCache(FileBasedCache):
+    """
+    FileBasedCache whose add() and incr() are atomic across the processes of
+    one host, as throttle counters need. Both hold an exclusive lock on one of
+    `lock_stripes` lock files, picked by the key, and incr() keeps the key's
+    expiry instead of resetting it to the default timeout.
+    """
+    lock_stripes = 64
+
+    @contextlib.contextmanager
+    def locked(self, fname):
+        lock_dir = os.path.join(self._dir, 'locks')
+        os.makedirs(lock_dir, 0o700, exist_ok=True)
+        # File names are an md5 hex digest of the key.
+        stripe = int(os.path.basename(fname)[:8], 16) % self.lock_stripes
+        with open(os.path.join(lock_dir, f'{stripe}.lock'), 'ab') as f:
+            locks.lock(f, locks.LOCK_EX)
+            try:
+                yield
+            finally:
+                locks.unlock(f)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        with self.locked(self._key_to_file(key, version)):
+            return super().add(key, value, timeout, version)
+
+    def incr(self, key, delta=1, version=None):
+        fname = self._key_to_file(key, version)
+        with self.locked(fname):
+            try:
+                with open(fname, 'rb') as f:
+                    expiry = pickle.load(f)
+                    value = pickle.loads(zlib.decompress(f.read()))
+            except (FileNotFoundError, EOFError):
+                raise ValueError(f"Key '{key}' not found") from None
+            if expiry is not None and expiry < time.time():
+                raise ValueError(f"Key '{key}' not found")
+            value += delta
+            fd, tmp_path = tempfile.mkstemp(dir=self._dir)
+            renamed = False
+            try:
+                with open(fd, 'wb') as f:
+                    f.write(pickle.dumps(expiry, self.pickle_protocol))
+                    f.write(zlib.compress(pickle.dumps(value, self.pickle_protocol)))
+                file_move_safe(tmp_path, fname, allow_overwrite=True)
+                renamed = True
+            finally:
+                if not renamed:
+                    os.remove(tmp_path)
+        return value
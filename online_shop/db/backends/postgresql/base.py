@@ -0,0 +1,7 @@
+from django.db.backends.postgresql import base
+
+from online_shop.db.pool import PooledDatabaseWrapperMixin
+
+
+class DatabaseWrapper(PooledDatabaseWrapperMixin, base.DatabaseWrapper):
+    """PostgreSQL (psycopg2) with a per-process connection pool"""
@@ -0,0 +1,7 @@
+from django.db.backends.sqlite3 import base
+
+from online_shop.db.pool import PooledDatabaseWrapperMixin
+
+
+class DatabaseWrapper(PooledDatabaseWrapperMixin, base.DatabaseWrapper):
+    """SQLite with a per-process connection pool, to exercise the pool without a server"""
@@ -0,0 +1,44 @@
+"""
+Migration operations that are safe to run against large, live tables.
+"""
+from django.db import NotSupportedError
+from django.db.migrations import AddIndex
+
+
+class AddIndexConcurrently(AddIndex):
+    """
+    AddIndex that builds the index with CREATE INDEX CONCURRENTLY on
+    PostgreSQL, so writes to the table carry on while it builds. Other
+    databases, such as the SQLite used in development, build it the ordinary
+    way; django.contrib.postgres's AddIndexConcurrently fails on them. The
+    migration needs `atomic = False`.
+    """
+    atomic = False
+
+    def describe(self):
+        return f"Concurrently create index {self.index.name} on field(s) {', '.join(self.index.fields)} " \
+               f"of model {self.model_name}"
+
+    def _concurrently(self, schema_editor):
+        if schema_editor.connection.vendor != 'postgresql':
+            return False
+        if schema_editor.connection.in_atomic_block:
+            raise NotSupportedError(
+                f"The {self.__class__.__name__} operation cannot be executed inside a transaction "
+                "(set atomic = False on the migration)."
+            )
+        return True
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if not self._concurrently(schema_editor):
+            return super().database_forwards(app_label, schema_editor, from_state, to_state)
+        model = to_state.apps.get_model(app_label, self.model_name)
+        if self.allow_migrate_model(schema_editor.connection.alias, model):
+            schema_editor.add_index(model, self.index, concurrently=True)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if not self._concurrently(schema_editor):
+            return super().database_backwards(app_label, schema_editor, from_state, to_state)
+        model = from_state.apps.get_model(app_label, self.model_name)
+        if self.allow_migrate_model(schema_editor.connection.alias, model):
+            schema_editor.remove_index(model, self.index, concurrently=True)
@@ -0,0 +1,152 @@
+"""
+Per-process database connection pool.
+
+Django's own pool needs psycopg 3, so the backends in online_shop/db/backends
+put this pool under the psycopg2 and SQLite wrappers instead. It is enabled by
+a POOL dict in the database settings:
+
+    "POOL": {"max_size": 10, "timeout": 5, "max_lifetime": 1800}
+
+The pool opens at most `max_size` connections per process; a thread asking
+for one while all are in use waits up to `timeout` seconds, then gets
+PoolTimeout. Connections are checked with a `SELECT 1` before they are handed
+out and are replaced once older than `max_lifetime` seconds.
+
+Django connects on the first query of a request and, with CONN_MAX_AGE = 0,
+closes at request_finished; closing returns the connection to the pool
+instead. Under ASGI the sync views and async ORM calls of one request share a
+connection through the thread-sensitive executor and release it when the
+response is closed, so the pool is shared safely by all executor threads.
+Pools are keyed by process id, so a forked worker never reuses its parent's
+sockets.
+"""
+import collections
+import os
+import threading
+import time
+
+from django.db.utils import OperationalError
+
+DEFAULT_POOL = {
+    'max_size': 10,
+    'timeout': 5.0,
+    'max_lifetime': 1800.0,
+}
+
+
+class PoolTimeout(OperationalError):
+    pass
+
+
+class ConnectionPool:
+    def __init__(self, max_size, timeout, max_lifetime):
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.condition = threading.Condition()
+        # Idle connections, most recently returned last
+        self.idle = collections.deque()
+        self.created_at = {}
+        # Open connections, idle or in use
+        self.size = 0
+
+    def acquire(self, connect, check):
+        """Returns an idle connection that passes `check`, or a new one from `connect()`"""
+        deadline = time.monotonic() + self.timeout
+        while True:
+            with self.condition:
+                while not self.idle and self.size >= self.max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise PoolTimeout(f"No database connection free after {self.timeout}s "
+                                          f"({self.max_size} in use).")
+                    self.condition.wait(remaining)
+                if self.idle:
+                    connection = self.idle.pop()
+                else:
+                    connection = None
+                    self.size += 1
+
+            if connection is None:
+                try:
+                    connection = connect()
+                except BaseException:
+                    self.forget()
+                    raise
+                self.created_at[connection] = time.monotonic()
+                return connection
+            if time.monotonic() - self.created_at[connection] < self.max_lifetime and check(connection):
+                return connection
+            self.discard(connection)
+
+    def release(self, connection, reusable=True):
+        if reusable and time.monotonic() - self.created_at[connection] < self.max_lifetime:
+            with self.condition:
+                self.idle.append(connection)
+                self.condition.notify()
+        else:
+            self.discard(connection)
+
+    def discard(self, connection):
+        self.created_at.pop(connection, None)
+        try:
+            connection.close()
+        except Exception:
+            pass
+        self.forget()
+
+    def forget(self):
+        with self.condition:
+            self.size -= 1
+            self.condition.notify()
+
+    def close(self):
+        """Closes the idle connections; those in use are closed when released"""
+        with self.condition:
+            idle, self.idle = list(self.idle), collections.deque()
+        for connection in idle:
+            self.discard(connection)
+
+
+class PooledDatabaseWrapperMixin:
+    _connection_pools = {}
+    _connection_pools_lock = threading.Lock()
+
+    @property
+    def connection_pool(self):
+        key = (self.alias, os.getpid())
+        pool = self._connection_pools.get(key)
+        if pool is None:
+            with self._connection_pools_lock:
+                pool = self._connection_pools.get(key)
+                if pool is None:
+                    options = {**DEFAULT_POOL, **self.settings_dict.get('POOL', {})}
+                    pool = self._connection_pools[key] = ConnectionPool(**options)
+        return pool
+
+    def get_new_connection(self, conn_params):
+        connect = super().get_new_connection
+        return self.connection_pool.acquire(lambda: connect(conn_params), self.check_pooled_connection)
+
+    def check_pooled_connection(self, connection):
+        try:
+            cursor = connection.cursor()
+            cursor.execute('SELECT 1')
+            cursor.close()
+            connection.rollback()
+        except self.Database.Error:
+            return False
+        return True
+
+    def _close(self):
+        if self.connection is None:
+            return
+        # Django keeps using a connection closed inside an atomic block until
+        # the block exits, so that one must not go back to the pool.
+        reusable = not self.in_atomic_block and not self.errors_occurred
+        if reusable:
+            try:
+                self.connection.rollback()
+            except self.Database.Error:
+                reusable = False
+        self.connection_pool.release(self.connection, reusable)
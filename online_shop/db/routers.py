@@ -0,0 +1,122 @@
+"""
+Primary/replica routing with read-your-writes stickiness.
+
+Writes go to the primary ('default'); reads go to a random alias from
+REPLICA_DATABASES. A request is pinned to the primary for the rest of its
+reads as soon as it writes, and while the primary is inside a transaction.
+
+Replicas lag, so a client must also keep reading from the primary for a
+while after its own writes, across requests. ReplicaPinMiddleware does this
+with a cookie for clients that keep cookies. The JWT login flow does not
+rely on cookies, so its views pin by email: RequestCodeView calls
+`pin_primary(email)` after issuing a code, and the views that read it back
+call `follow_pin(email)` first. Both pins last REPLICA_PIN_SECONDS.
+
+Reads that decide whether a token is still valid never go to a replica:
+token versions and revocations are read with `.using('default')`, and
+TokenRefreshView pins its request.
+"""
+import contextvars
+import random
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+
+PIN_COOKIE = 'db_pin'
+
+_state = contextvars.ContextVar('replica_routing', default=None)
+
+
+class RoutingState:
+    def __init__(self, pinned=False):
+        self.pinned = pinned
+        self.wrote = False
+
+
+def current_state():
+    state = _state.get()
+    if state is None:
+        # Outside a request, e.g. in a management command: one state per context.
+        state = RoutingState()
+        _state.set(state)
+    return state
+
+
+def start_request(pinned=False):
+    """Starts a fresh routing state for the current request; returns (state, reset token)"""
+    state = RoutingState(pinned)
+    return state, _state.set(state)
+
+
+def end_request(token):
+    _state.reset(token)
+
+
+def pin_cache_key(key):
+    return f'replica_pin_{key}'
+
+
+def pin_primary(key=None):
+    """Sends the reads of this request, and of later requests that follow `key`, to the primary"""
+    current_state().pinned = True
+    if key is not None:
+        cache.set(pin_cache_key(key), True, settings.REPLICA_PIN_SECONDS)
+
+
+async def apin_primary(key=None):
+    current_state().pinned = True
+    if key is not None:
+        await cache.aset(pin_cache_key(key), True, settings.REPLICA_PIN_SECONDS)
+
+
+def follow_pin(key):
+    """Pins this request to the primary if `key` was written recently"""
+    if isinstance(key, str) and cache.get(pin_cache_key(key)):
+        current_state().pinned = True
+
+
+async def afollow_pin(key):
+    if isinstance(key, str) and await cache.aget(pin_cache_key(key)):
+        current_state().pinned = True
+
+
+def pin_cookie_value():
+    return str(int(time.time() + settings.REPLICA_PIN_SECONDS))
+
+
+def cookie_is_pinned(value):
+    try:
+        return int(value) > time.time()
+    except (TypeError, ValueError):
+        return False
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        replicas = settings.REPLICA_DATABASES
+        if not replicas or current_state().pinned or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        if model._meta.app_label == 'django_cache':
+            # DatabaseCache must read back its own writes.
+            return DEFAULT_DB_ALIAS
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        if model._meta.app_label == 'django_cache':
+            # A cache write is not a write the client has to read back.
+            return DEFAULT_DB_ALIAS
+        state = current_state()
+        state.pinned = state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = {DEFAULT_DB_ALIAS, *settings.REPLICA_DATABASES}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get the schema through replication.
+        return db not in settings.REPLICA_DATABASES
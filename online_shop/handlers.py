@@ -0,0 +1,79 @@
+"""
+Entry points that send API requests through a lean middleware chain.
+
+The JWT API is stateless, so sessions, CSRF, messages, the session-backed
+request.user and X-Frame-Options only cost time on its routes. Requests whose
+path starts with one of API_URL_PREFIXES are handled with API_MIDDLEWARE;
+everything else (admin, docs, metrics) keeps the full MIDDLEWARE.
+"""
+import contextlib
+
+import django
+from django.conf import settings
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+
+
+@contextlib.contextmanager
+def middleware_from(setting):
+    """Points MIDDLEWARE, which BaseHandler.load_middleware always reads, at another setting"""
+    full = settings.MIDDLEWARE
+    settings.MIDDLEWARE = getattr(settings, setting)
+    try:
+        yield
+    finally:
+        settings.MIDDLEWARE = full
+
+
+class LeanWSGIHandler(WSGIHandler):
+    def load_middleware(self, is_async=False):
+        with middleware_from('API_MIDDLEWARE'):
+            super().load_middleware(is_async)
+
+
+class LeanASGIHandler(ASGIHandler):
+    def load_middleware(self, is_async=False):
+        with middleware_from('API_MIDDLEWARE'):
+            super().load_middleware(is_async)
+
+
+class RoutingWSGIHandler:
+    def __init__(self):
+        self.full = WSGIHandler()
+        self.lean = LeanWSGIHandler()
+        self.prefixes = tuple(settings.API_URL_PREFIXES)
+
+    def __call__(self, environ, start_response):
+        # PATH_INFO is relative to SCRIPT_NAME, like the URLconf.
+        if environ.get('PATH_INFO', '').startswith(self.prefixes):
+            return self.lean(environ, start_response)
+        return self.full(environ, start_response)
+
+
+class RoutingASGIHandler:
+    def __init__(self):
+        self.full = ASGIHandler()
+        self.lean = LeanASGIHandler()
+        self.prefixes = tuple(settings.API_URL_PREFIXES)
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'http':
+            path = scope['path']
+            root_path = scope.get('root_path', '')
+            if root_path and path.startswith(root_path):
+                path = path[len(root_path):]
+            if path.startswith(self.prefixes):
+                return await self.lean(scope, receive, send)
+        return await self.full(scope, receive, send)
+
+
+def get_wsgi_application():
+    """Like django.core.wsgi.get_wsgi_application, with the API routed to the lean chain"""
+    django.setup(set_prefix=False)
+    return RoutingWSGIHandler()
+
+
+def get_asgi_application():
+    """Like django.core.asgi.get_asgi_application, with the API routed to the lean chain"""
+    django.setup(set_prefix=False)
+    return RoutingASGIHandler()
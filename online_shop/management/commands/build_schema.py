@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from online_shop.schema import schema_cache
+
+
+class Command(BaseCommand):
+    help = "Generates the OpenAPI schema for the current code version into SCHEMA_CACHE_DIR."
+
+    def handle(self, *args, **options):
+        document = schema_cache.build()
+        self.stdout.write(f"Wrote {schema_cache.path(document.version)} for code version {document.version}.")
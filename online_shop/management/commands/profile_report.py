@@ -0,0 +1,72 @@
+import pstats
+from collections import defaultdict
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from online_shop.profiling import endpoint_of, profile_token, profiles
+
+SORT_COLUMNS = {'tottime': 2, 'cumtime': 3, 'ncalls': 1}
+
+
+class Command(BaseCommand):
+    help = (
+        "Adds up the request profiles in PROFILE_DIR into a table of the hottest functions per endpoint. "
+        "Times are milliseconds per profiled request."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--endpoint', action='append', help="Only report this endpoint, e.g. users:request-code.")
+        parser.add_argument('--sort', choices=SORT_COLUMNS, default='tottime',
+                            help="tottime: time in the function itself; cumtime: including its callees.")
+        parser.add_argument('--limit', type=int, default=20, help="Functions per endpoint.")
+        parser.add_argument('--token', action='store_true',
+                            help=f"Print a {settings.PROFILE_HEADER} header value that profiles requests "
+                                 f"for the next {settings.PROFILE_TOKEN_MAX_AGE} seconds, instead of a report.")
+
+    def handle(self, *args, **options):
+        if options['token']:
+            self.stdout.write(profile_token())
+            return
+
+        by_endpoint = defaultdict(list)
+        for path in profiles(settings.PROFILE_DIR):
+            by_endpoint[endpoint_of(path)].append(path)
+        if options['endpoint']:
+            by_endpoint = {endpoint: by_endpoint[endpoint] for endpoint in options['endpoint'] if endpoint in by_endpoint}
+        if not by_endpoint:
+            self.stderr.write(f"No profiles in {settings.PROFILE_DIR}.")
+            return
+
+        for endpoint, paths in sorted(by_endpoint.items()):
+            self.report(endpoint, paths, options['sort'], options['limit'])
+
+    def report(self, endpoint, paths, sort, limit):
+        stats = pstats.Stats(*map(str, paths))
+        requests = len(paths)
+        column = SORT_COLUMNS[sort]
+        rows = sorted(stats.stats.items(), key=lambda item: item[1][column], reverse=True)[:limit]
+
+        self.stdout.write(f"{endpoint}: {requests} requests, {stats.total_tt * 1000 / requests:.2f} ms profiled per request")
+        self.stdout.write(f"{'ncalls':>10} {'tottime':>10} {'cumtime':>10}  function")
+        for function, (primitive_calls, calls, tottime, cumtime, callers) in rows:
+            self.stdout.write(
+                f"{calls / requests:>10.1f} {tottime * 1000 / requests:>10.3f} {cumtime * 1000 / requests:>10.3f}"
+                f"  {location(function)}"
+            )
+        self.stdout.write('')
+
+
+def location(function):
+    """Formats a pstats function key, with paths relative to the project or the interpreter's packages"""
+    filename, line, name = function
+    if filename == '~':
+        return name
+    path = Path(filename)
+    base = Path(settings.BASE_DIR)
+    if path.is_relative_to(base):
+        filename = str(path.relative_to(base))
+    elif 'site-packages' in path.parts:
+        filename = str(Path(*path.parts[path.parts.index('site-packages') + 1:]))
+    return f'{filename}:{line}({name})'
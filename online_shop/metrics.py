@@ -0,0 +1,258 @@
+"""
+Per-request performance metrics.
+
+MetricsMiddleware opens a RequestTimings for every request. Database time is
+collected by an execute_wrapper installed on every connection. Code on the
+hot path marks its own stages with `timed()`, e.g. ``with timed('jwt'):``.
+When the request ends, the timings go out as a Server-Timing header and into
+per-endpoint histograms. Stages may overlap: the `mail` stage of a login,
+for instance, is mostly the outbox insert, which also counts as `db`.
+
+The histograms live in the process. Under a pre-forking server every worker
+writes a snapshot to METRICS_MULTIPROC_DIR at most every
+METRICS_FLUSH_INTERVAL seconds. The /metrics view adds all snapshots
+together, the same way prometheus_client's multiprocess mode does.
+"""
+import contextlib
+import contextvars
+import glob
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+
+from .budgets import is_query
+
+DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+_current = contextvars.ContextVar('request_timings', default=None)
+
+
+class RequestTimings:
+    def __init__(self):
+        self.stages = defaultdict(float)
+        self.queries = 0
+
+    def add(self, stage, seconds):
+        self.stages[stage] += seconds
+
+
+def start_request():
+    """Starts collecting timings for the current request; returns (timings, reset token)"""
+    timings = RequestTimings()
+    return timings, _current.set(timings)
+
+
+def end_request(token):
+    _current.reset(token)
+
+
+def current_timings():
+    """Returns the RequestTimings of the current request, or None outside one"""
+    return _current.get()
+
+
+@contextlib.contextmanager
+def timed(stage):
+    """Adds the time spent in the block to `stage` of the current request, if there is one"""
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(stage, time.perf_counter() - start)
+
+
+def time_queries(execute, sql, params, many, context):
+    timings = _current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        # Transaction control takes database time but is not counted as a query, as in budgets.py.
+        if is_query(sql):
+            timings.queries += 1
+        timings.add('db', time.perf_counter() - start)
+
+
+def install_query_timer():
+    """Installs time_queries on every database connection, current and future"""
+    from django.db import connections
+    from django.db.backends.signals import connection_created
+
+    def add(sender=None, connection=None, **kwargs):
+        if time_queries not in connection.execute_wrappers:
+            connection.execute_wrappers.append(time_queries)
+
+    connection_created.connect(add, weak=False, dispatch_uid='online_shop.metrics.install_query_timer')
+    for connection in connections.all():
+        add(connection=connection)
+
+
+class Histogram:
+    def __init__(self, name, documentation, labelnames, buckets):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = buckets
+        # label values -> [count per bucket..., +Inf count, sum]
+        self.values = {}
+
+    def observe(self, labels, value):
+        row = self.values.get(labels)
+        if row is None:
+            row = self.values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                row[i] += 1
+                break
+        else:
+            row[len(self.buckets)] += 1
+        row[-1] += value
+
+
+class Counter:
+    """A counter kept elsewhere in the process; `collect()` returns {label values: count}"""
+
+    def __init__(self, name, documentation, labelnames, collect):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.collect = collect
+
+
+class Registry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.flushed_at = 0.0
+        self.counters = {}
+        self.histograms = {
+            h.name: h for h in (
+                Histogram('http_request_duration_seconds', "Total time spent handling the request.",
+                          ('endpoint', 'method'), DURATION_BUCKETS),
+                Histogram('http_request_stage_seconds', "Time spent in one stage of the request.",
+                          ('endpoint', 'stage'), DURATION_BUCKETS),
+                Histogram('http_request_db_queries', "Database queries run by the request.",
+                          ('endpoint',), QUERY_BUCKETS),
+            )
+        }
+
+    def record(self, endpoint, method, total, timings):
+        with self.lock:
+            self.histograms['http_request_duration_seconds'].observe((endpoint, method), total)
+            for stage, seconds in timings.stages.items():
+                self.histograms['http_request_stage_seconds'].observe((endpoint, stage), seconds)
+            self.histograms['http_request_db_queries'].observe((endpoint,), timings.queries)
+        self.maybe_flush()
+
+    def add_counter(self, name, documentation, labelnames, collect):
+        self.counters[name] = Counter(name, documentation, labelnames, collect)
+
+    def snapshot(self):
+        with self.lock:
+            snapshot = {
+                name: {json.dumps(labels): list(row) for labels, row in h.values.items()}
+                for name, h in self.histograms.items()
+            }
+        for name, counter in self.counters.items():
+            snapshot[name] = {json.dumps(labels): [count] for labels, count in counter.collect().items()}
+        return snapshot
+
+    def maybe_flush(self):
+        directory = settings.METRICS_MULTIPROC_DIR
+        if not directory or time.monotonic() - self.flushed_at < settings.METRICS_FLUSH_INTERVAL:
+            return
+        self.flushed_at = time.monotonic()
+        self.flush(directory)
+
+    def flush(self, directory):
+        path = os.path.join(directory, f'metrics-{os.getpid()}.json')
+        tmp = f'{path}.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(self.snapshot(), f)
+        os.replace(tmp, path)
+
+    def collect(self):
+        """Returns the snapshot of this process merged with those of every other worker"""
+        own = self.snapshot()
+        directory = settings.METRICS_MULTIPROC_DIR
+        if not directory:
+            return own
+
+        merged = {name: {} for name in [*self.histograms, *self.counters]}
+        own_file = os.path.join(directory, f'metrics-{os.getpid()}.json')
+        snapshots = [own]
+        for path in glob.glob(os.path.join(directory, 'metrics-*.json')):
+            if path == own_file:
+                continue
+            try:
+                with open(path) as f:
+                    snapshots.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        for snapshot in snapshots:
+            for name, rows in snapshot.items():
+                target = merged.setdefault(name, {})
+                for labels, row in rows.items():
+                    if labels in target:
+                        target[labels] = [a + b for a, b in zip(target[labels], row)]
+                    else:
+                        target[labels] = list(row)
+        return merged
+
+    def render(self):
+        """Returns all histograms in the Prometheus text exposition format"""
+        data = self.collect()
+        lines = []
+        for name, h in self.histograms.items():
+            lines.append(f'# HELP {name} {h.documentation}')
+            lines.append(f'# TYPE {name} histogram')
+            for labels, row in sorted(data.get(name, {}).items()):
+                label_text = ','.join(
+                    f'{key}="{_escape(value)}"' for key, value in zip(h.labelnames, json.loads(labels))
+                )
+                cumulative = 0
+                for bound, count in zip(h.buckets, row):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{{{label_text},le="{bound}"}} {cumulative}')
+                cumulative += row[len(h.buckets)]
+                lines.append(f'{name}_bucket{{{label_text},le="+Inf"}} {cumulative}')
+                lines.append(f'{name}_sum{{{label_text}}} {row[-1]}')
+                lines.append(f'{name}_count{{{label_text}}} {cumulative}')
+        for name, counter in self.counters.items():
+            lines.append(f'# HELP {name} {counter.documentation}')
+            lines.append(f'# TYPE {name} counter')
+            for labels, row in sorted(data.get(name, {}).items()):
+                label_text = ','.join(
+                    f'{key}="{_escape(value)}"' for key, value in zip(counter.labelnames, json.loads(labels))
+                )
+                lines.append(f'{name}{{{label_text}}} {row[0]}')
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+registry = Registry()
+
+
+def server_timing(timings, total):
+    """Formats the timings as a Server-Timing header value"""
+    entries = []
+    for stage, seconds in sorted(timings.stages.items()):
+        entry = f'{stage};dur={seconds * 1000:.2f}'
+        if stage == 'db':
+            entry += f';desc="{timings.queries} queries"'
+        entries.append(entry)
+    entries.append(f'total;dur={total * 1000:.2f}')
+    return ', '.join(entries)
@@ -0,0 +1,184 @@
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+
+from django.conf import settings
+
+from .budgets import QueryBudgetExceeded, over_budget_message, query_budget
+from .db import routers
+from .metrics import current_timings, end_request, install_query_timer, registry, server_timing, start_request
+from .profiling import astart_profile, astop_profile, save_profile, should_profile, start_profile, stop_profile
+
+
+class MetricsMiddleware:
+    """
+    Records database, stage and total time for every request, returns them in
+    a Server-Timing header and feeds the per-endpoint histograms behind /metrics.
+
+    Place it first in MIDDLEWARE so the total covers the whole stack.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+        install_query_timer()
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        timings, token = start_request()
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            end_request(token)
+        self.finish(request, response, timings, time.perf_counter() - start)
+        return response
+
+    async def __acall__(self, request):
+        timings, token = start_request()
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            end_request(token)
+        self.finish(request, response, timings, time.perf_counter() - start)
+        return response
+
+    def finish(self, request, response, timings, total):
+        match = request.resolver_match
+        endpoint = match.view_name if match else 'unmatched'
+        response['Server-Timing'] = server_timing(timings, total)
+        registry.record(endpoint, request.method, total, timings)
+
+
+class QueryBudgetMiddleware:
+    """
+    Raises QueryBudgetExceeded when a request runs more database queries than
+    the `query_budget` of its view, see online_shop/budgets.py. Meant for
+    DEBUG; place it right after MetricsMiddleware, whose query count it reads.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        response = self.get_response(request)
+        self.check(request)
+        return response
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        self.check(request)
+        return response
+
+    def check(self, request):
+        timings = current_timings()
+        match = request.resolver_match
+        if timings is None or match is None:
+            return
+        budget = query_budget(match.func)
+        if budget is not None and timings.queries > budget:
+            raise QueryBudgetExceeded(over_budget_message(match.view_name, budget, timings.queries))
+
+
+class ProfilingMiddleware:
+    """
+    Profiles the requests picked by a signed header or PROFILE_SAMPLE_RATE
+    and names the written profile in the X-Profile response header, see
+    online_shop/profiling.py. Place it right after MetricsMiddleware.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        profiler = start_profile() if should_profile(request) else None
+        if profiler is None:
+            return self.get_response(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            stop_profile(profiler)
+        response['X-Profile'] = save_profile([profiler], self.endpoint(request))
+        return response
+
+    async def __acall__(self, request):
+        profilers = await astart_profile() if should_profile(request) else None
+        if profilers is None:
+            return await self.get_response(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await astop_profile(profilers)
+        response['X-Profile'] = await sync_to_async(save_profile, thread_sensitive=False)(
+            profilers, self.endpoint(request),
+        )
+        return response
+
+    def endpoint(self, request):
+        match = request.resolver_match
+        return match.view_name if match else 'unmatched'
+
+
+class ReplicaPinMiddleware:
+    """
+    Gives every request a fresh primary/replica routing state, pinned to the
+    primary while the client's pin cookie is valid, and sets that cookie when
+    the request wrote. See online_shop/db/routers.py.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        state, token = routers.start_request(self.is_pinned(request))
+        try:
+            response = self.get_response(request)
+        finally:
+            routers.end_request(token)
+        return self.finish(state, response)
+
+    async def __acall__(self, request):
+        state, token = routers.start_request(self.is_pinned(request))
+        try:
+            response = await self.get_response(request)
+        finally:
+            routers.end_request(token)
+        return self.finish(state, response)
+
+    def is_pinned(self, request):
+        return routers.cookie_is_pinned(request.COOKIES.get(routers.PIN_COOKIE))
+
+    def finish(self, state, response):
+        if state.wrote and settings.REPLICA_DATABASES:
+            response.set_cookie(
+                routers.PIN_COOKIE, routers.pin_cookie_value(), max_age=settings.REPLICA_PIN_SECONDS,
+                httponly=True, samesite='Lax',
+            )
+        return response
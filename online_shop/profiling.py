@@ -0,0 +1,162 @@
+"""
+On-demand profiling of single requests.
+
+ProfilingMiddleware runs cProfile around a request to one of
+PROFILE_URL_PREFIXES when the request carries a valid PROFILE_HEADER, or
+when it is picked at random with probability PROFILE_SAMPLE_RATE. Any other
+request costs one random() call and a header lookup, so the middleware stays
+installed in production. The header value is a token signed with SECRET_KEY
+and valid for PROFILE_TOKEN_MAX_AGE seconds; `manage.py profile_report
+--token` prints one.
+
+Each profile is written to PROFILE_DIR as a pstats file, named after the
+time, the process and the endpoint, e.g.
+`1760788800123456789-4242-users.request-code.prof`. Once the directory holds
+more than PROFILE_MAX_BYTES, the oldest files are deleted. `manage.py
+profile_report` adds the profiles up into per-endpoint tables of the hottest
+functions; any pstats viewer (snakeviz, `python -m pstats`) opens them too.
+
+A process profiles one request at a time: cProfile hooks the whole thread, so
+a second request that would be profiled meanwhile is not. Under ASGI the
+request's sync code, sync DRF views included, runs in the worker thread of
+sync_to_async rather than on the event loop, so astart_profile profiles that
+thread as well and the two profiles are saved as one. The event loop part of
+a profile also contains whatever other coroutines ran while the request
+awaited.
+"""
+import cProfile
+import os
+import pstats
+import random
+import threading
+import time
+from pathlib import Path
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core import signing
+
+TOKEN_SALT = 'online_shop.profiling'
+
+_lock = threading.Lock()
+
+
+def profile_token():
+    """Returns a PROFILE_HEADER value that profiles requests for the next PROFILE_TOKEN_MAX_AGE seconds"""
+    return signing.TimestampSigner(salt=TOKEN_SALT).sign('profile')
+
+
+def is_valid_token(value):
+    try:
+        signing.TimestampSigner(salt=TOKEN_SALT).unsign(value, max_age=settings.PROFILE_TOKEN_MAX_AGE)
+    except signing.BadSignature:
+        return False
+    return True
+
+
+def should_profile(request):
+    if not request.path.startswith(tuple(settings.PROFILE_URL_PREFIXES)):
+        return False
+    token = request.headers.get(settings.PROFILE_HEADER)
+    if token is not None:
+        return is_valid_token(token)
+    return random.random() < settings.PROFILE_SAMPLE_RATE
+
+
+def start_profile():
+    """Starts profiling this thread; returns the profiler, or None while another request is being profiled"""
+    if not _lock.acquire(blocking=False):
+        return None
+    profiler = cProfile.Profile()
+    profiler.enable()
+    return profiler
+
+
+def stop_profile(profiler):
+    profiler.disable()
+    _lock.release()
+
+
+async def astart_profile():
+    """
+    start_profile for the event loop. Returns the profilers of the loop and of
+    the request's sync_to_async thread, or None while another request is being
+    profiled.
+    """
+    profiler = start_profile()
+    if profiler is None:
+        return None
+    worker = cProfile.Profile()
+    try:
+        # Thread-sensitive sync_to_async calls of a request all run in one thread.
+        await sync_to_async(worker.enable)()
+    except BaseException:
+        stop_profile(profiler)
+        raise
+    return [profiler, worker]
+
+
+async def astop_profile(profilers):
+    profiler, worker = profilers
+    try:
+        await sync_to_async(worker.disable)()
+    finally:
+        stop_profile(profiler)
+
+
+def profile_path(directory, endpoint):
+    return Path(directory) / f'{time.time_ns()}-{os.getpid()}-{endpoint.replace(":", ".")}.prof'
+
+
+def endpoint_of(path):
+    """Returns the endpoint a profile file was written for"""
+    return Path(path).stem.split('-', 2)[2].replace('.', ':')
+
+
+def save_profile(profilers, endpoint):
+    """
+    Writes the profilers to PROFILE_DIR as one profile, deletes the oldest
+    profiles over the budget and returns the file name. Blocks on the disk;
+    async code runs it in a thread.
+    """
+    directory = Path(settings.PROFILE_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    path = profile_path(directory, endpoint)
+    partial = path.with_name(f'.{path.name}.partial')
+    stats = pstats.Stats()
+    for profiler in profilers:
+        profiler.create_stats()
+        # A thread that ran nothing has no stats, which pstats refuses to add.
+        if profiler.stats:
+            stats.add(profiler)
+    stats.dump_stats(partial)
+    os.replace(partial, path)
+    enforce_budget(directory, settings.PROFILE_MAX_BYTES)
+    return path.name
+
+
+def enforce_budget(directory, max_bytes):
+    """Deletes the oldest profiles until the rest fit into `max_bytes`"""
+    profiles = []
+    for entry in os.scandir(directory):
+        if entry.name.endswith('.prof'):
+            try:
+                profiles.append((entry.name, entry.stat().st_size))
+            except FileNotFoundError:
+                continue
+    total = sum(size for _, size in profiles)
+    # Names start with the time in nanoseconds, so they sort oldest first.
+    for name, size in sorted(profiles, key=lambda profile: int(profile[0].partition('-')[0])):
+        if total <= max_bytes:
+            break
+        try:
+            os.unlink(os.path.join(directory, name))
+        except FileNotFoundError:
+            pass
+        total -= size
+
+
+def profiles(directory):
+    """Returns the profile files in `directory`"""
+    directory = Path(directory)
+    return sorted(directory.glob('*.prof')) if directory.exists() else []
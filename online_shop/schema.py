@@ -0,0 +1,173 @@
+"""
+Precomputed OpenAPI schema.
+
+Generating the schema introspects every view and every swagger_auto_schema
+decorator, so it is done once per code version instead of on every hit:
+either at deploy time by `manage.py build_schema` or lazily by the first
+request. The rendered JSON and YAML documents are kept in memory and in
+SCHEMA_CACHE_DIR, where the other workers pick them up, and are served with
+an ETag and Last-Modified so clients can revalidate with a 304.
+
+The code version is CODE_VERSION (set it to the commit being deployed) or,
+when that is empty, a digest of the project's Python sources. The schema is
+generated without a request, so it carries no host and clients use the one
+they fetched it from.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.functional import cached_property
+from django.utils.http import http_date
+from drf_yasg import openapi
+from drf_yasg.renderers import SwaggerJSONRenderer, SwaggerYAMLRenderer, _SpecRenderer
+from drf_yasg.views import get_schema_view
+from rest_framework import permissions
+from rest_framework.response import Response
+
+API_INFO = openapi.Info(
+    title="Online Shop API",
+    default_version='v1',
+    description="Online Shop API",
+    terms_of_service="https://www.google.com/policies/terms/",
+    contact=openapi.Contact(email="r.amirh.bd@gmail.com"),
+    license=openapi.License(name="BSD License"),
+)
+
+SOURCE_DIRS = ('apps', 'online_shop')
+
+
+def code_version():
+    """Returns CODE_VERSION, or a digest of the project's sources when it is not set"""
+    if settings.CODE_VERSION:
+        return settings.CODE_VERSION
+    digest = hashlib.sha256()
+    for directory in SOURCE_DIRS:
+        for path in sorted(Path(settings.BASE_DIR, directory).rglob('*.py')):
+            digest.update(str(path.relative_to(settings.BASE_DIR)).encode())
+            digest.update(path.read_bytes())
+    return digest.hexdigest()[:16]
+
+
+class SchemaDocument:
+    def __init__(self, version, generated_at, content):
+        self.version = version
+        self.generated_at = generated_at
+        # codec ('json' or 'yaml') -> rendered bytes
+        self.content = content
+
+    @cached_property
+    def etags(self):
+        return {
+            codec: '"%s"' % hashlib.sha256(content).hexdigest()[:32]
+            for codec, content in self.content.items()
+        }
+
+    def as_json(self):
+        return json.dumps({
+            'version': self.version,
+            'generated_at': self.generated_at,
+            'content': {codec: content.decode() for codec, content in self.content.items()},
+        })
+
+    @classmethod
+    def from_json(cls, data):
+        data = json.loads(data)
+        return cls(
+            data['version'], data['generated_at'],
+            {codec: content.encode() for codec, content in data['content'].items()},
+        )
+
+
+class SchemaCache:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.document = None
+
+    @cached_property
+    def version(self):
+        return code_version()
+
+    def path(self, version):
+        return os.path.join(settings.SCHEMA_CACHE_DIR, f'openapi-{version}.json')
+
+    def get(self):
+        """Returns the document for the running code, loading or building it on first use"""
+        document = self.document
+        if document is not None:
+            return document
+        with self.lock:
+            if self.document is None:
+                self.document = self.load() or self.build()
+            return self.document
+
+    def load(self):
+        try:
+            with open(self.path(self.version)) as f:
+                return SchemaDocument.from_json(f.read())
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def build(self):
+        """Generates the schema, stores it in SCHEMA_CACHE_DIR and drops the other versions"""
+        generator = SchemaView.generator_class(API_INFO)
+        schema = generator.get_schema(request=None, public=True)
+        document = SchemaDocument(self.version, time.time(), {
+            'json': SwaggerJSONRenderer().render(schema),
+            'yaml': SwaggerYAMLRenderer().render(schema),
+        })
+        try:
+            self.save(document)
+        except OSError:
+            # A read-only deploy still serves the schema from memory.
+            pass
+        return document
+
+    def save(self, document):
+        directory = settings.SCHEMA_CACHE_DIR
+        os.makedirs(directory, exist_ok=True)
+        path = self.path(document.version)
+        tmp = f'{path}.{os.getpid()}.tmp'
+        with open(tmp, 'w') as f:
+            f.write(document.as_json())
+        os.replace(tmp, path)
+        for name in os.listdir(directory):
+            if name.startswith('openapi-') and name.endswith('.json') and name != os.path.basename(path):
+                os.remove(os.path.join(directory, name))
+
+    def reset(self):
+        self.document = None
+        self.__dict__.pop('version', None)
+
+
+schema_cache = SchemaCache()
+
+
+class SchemaView(get_schema_view(API_INFO, public=True, permission_classes=[permissions.AllowAny])):
+    def get(self, request, version="", format=None):
+        renderer = request.accepted_renderer
+        if not isinstance(renderer, _SpecRenderer):
+            # The UI pages only need the title and version; the page fetches the real schema.
+            stub = openapi.Swagger(
+                info=API_INFO, _prefix='/', _version=request.version or version or None,
+                paths=openapi.Paths(paths={}),
+            )
+            return Response(stub)
+
+        document = schema_cache.get()
+        codec = 'yaml' if isinstance(renderer, SwaggerYAMLRenderer) else 'json'
+        etag = document.etags[codec]
+        last_modified = int(document.generated_at)
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = HttpResponse(document.content[codec], content_type=f'{renderer.media_type}; charset=utf-8')
+        response.headers['ETag'] = etag
+        response.headers['Last-Modified'] = http_date(last_modified)
+        patch_cache_control(response, public=True, no_cache=True)
+        return response
@@ -13,6 +13,7 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 import os
 from datetime import timedelta
 from pathlib import Path
+from urllib.parse import urlsplit
 from dotenv import load_dotenv
 load_dotenv()
 
@@ -42,12 +43,19 @@ INSTALLED_APPS = [
     "django.contrib.messages",
     "django.contrib.staticfiles",
     "apps.users.apps.UsersConfig",
+    "apps.catalog.apps.CatalogConfig",
+    "apps.search.apps.SearchConfig",
+    "apps.orders.apps.OrdersConfig",
     "rest_framework",
     "rest_framework_simplejwt",
     "drf_yasg",
+    "online_shop",
 ]
 
 MIDDLEWARE = [
+    "online_shop.middleware.MetricsMiddleware",
+    "online_shop.middleware.ProfilingMiddleware",
+    "online_shop.middleware.ReplicaPinMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -57,6 +65,26 @@ MIDDLEWARE = [
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
 
+# Middleware for the stateless JWT API, which the WSGI/ASGI entry points use
+# for paths under API_URL_PREFIXES instead of MIDDLEWARE, see online_shop/handlers.py.
+
+API_URL_PREFIXES = ['/api/', '/.well-known/']
+
+API_MIDDLEWARE = [
+    "online_shop.middleware.MetricsMiddleware",
+    "online_shop.middleware.ProfilingMiddleware",
+    "online_shop.middleware.ReplicaPinMiddleware",
+    "django.middleware.security.SecurityMiddleware",
+    "django.middleware.common.CommonMiddleware",
+]
+
+# In development, fail requests that run more queries than their view's
+# query_budget, see online_shop/budgets.py.
+
+if DEBUG:
+    MIDDLEWARE.insert(1, "online_shop.middleware.QueryBudgetMiddleware")
+    API_MIDDLEWARE.insert(1, "online_shop.middleware.QueryBudgetMiddleware")
+
 ROOT_URLCONF = "online_shop.urls"
 
 TEMPLATES = [
@@ -84,7 +112,7 @@ WSGI_APPLICATION = "online_shop.wsgi.application"
 
 DATABASES = {
     "default": {
-        "ENGINE": "django.db.backends.postgresql_psycopg2",
+        "ENGINE": "django.db.backends.postgresql",
         "NAME": os.environ.get('DB_NAME'),
         "USER": os.environ.get('DB_USER'),
         "PASSWORD": os.environ.get('DB_PASSWORD'),
@@ -93,6 +121,73 @@ DATABASES = {
     }
 }
 
+# DB_CONN_MODE picks how connections are reused:
+#   pool        a bounded pool per process, safe under ASGI, see online_shop/db/pool.py
+#   persistent  one connection per thread, kept DB_CONN_MAX_AGE seconds (WSGI only)
+#   close       a new connection for every request
+
+DB_CONN_MODE = os.environ.get('DB_CONN_MODE', 'pool')
+
+if DB_CONN_MODE == 'pool':
+    DATABASES["default"].update({
+        "ENGINE": "online_shop.db.backends.postgresql",
+        "CONN_MAX_AGE": 0,
+        "POOL": {
+            "max_size": int(os.environ.get('DB_POOL_SIZE', 10)),
+            "timeout": float(os.environ.get('DB_POOL_TIMEOUT', 5)),
+            "max_lifetime": float(os.environ.get('DB_POOL_MAX_LIFETIME', 1800)),
+        },
+    })
+elif DB_CONN_MODE == 'persistent':
+    DATABASES["default"].update({
+        "CONN_MAX_AGE": int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+        "CONN_HEALTH_CHECKS": True,
+    })
+
+# Read replicas: DB_REPLICA_HOSTS is a comma-separated list of hosts serving
+# copies of the default database. Reads go to them unless the request, or the
+# same client or email within REPLICA_PIN_SECONDS, wrote; see online_shop/db/routers.py.
+
+REPLICA_DATABASES = []
+for i, host in enumerate(filter(None, os.environ.get('DB_REPLICA_HOSTS', '').split(',')), start=1):
+    alias = f'replica{i}'
+    DATABASES[alias] = {**DATABASES["default"], "HOST": host.strip(), "TEST": {"MIRROR": "default"}}
+    REPLICA_DATABASES.append(alias)
+
+DATABASE_ROUTERS = ['online_shop.db.routers.PrimaryReplicaRouter']
+REPLICA_PIN_SECONDS = int(os.environ.get('DB_REPLICA_PIN_SECONDS', 15))
+
+# Caches: an in-process LRU in front of the cache shared by all workers, see online_shop/cache.py.
+# CACHE_URL picks the shared one: redis://host:6379/0 (needs the redis package),
+# file:///path/to/dir, db://table_name (run `manage.py createcachetable`) or locmem://.
+# Throttles count with add() and incr(), which must be atomic across workers: they are on
+# Redis, on file (one host) and on locmem (one process only). db:// is refused while throttle
+# rates are set, see apps/users/checks.py.
+
+CACHE_URL = os.environ.get('CACHE_URL', f'file://{BASE_DIR / "var" / "cache"}')
+_cache_url = urlsplit(CACHE_URL)
+SHARED_CACHE_BACKENDS = {
+    'redis': ('django.core.cache.backends.redis.RedisCache', CACHE_URL),
+    'file': ('online_shop.cache.LockingFileBasedCache', _cache_url.path),
+    'db': ('django.core.cache.backends.db.DatabaseCache', _cache_url.netloc),
+    'locmem': ('django.core.cache.backends.locmem.LocMemCache', _cache_url.netloc),
+}
+CACHES = {
+    'default': {
+        'BACKEND': 'online_shop.cache.TwoTierCache',
+        'LOCATION': 'default',
+        'OPTIONS': {
+            'SHARED': 'shared',
+            # Key prefixes, up to the first ':', that are also kept in the near tier
+            'NAMESPACES': ['catalog'],
+            'NEAR_MAX_ENTRIES': int(os.environ.get('CACHE_NEAR_MAX_ENTRIES', 5000)),
+            'NEAR_TIMEOUT': 60,
+            'GENERATION_TIMEOUT': 1.0,
+        },
+    },
+    'shared': dict(zip(('BACKEND', 'LOCATION'), SHARED_CACHE_BACKENDS[_cache_url.scheme])),
+}
+
 AUTH_USER_MODEL = 'users.User'
 
 # Password validation
@@ -106,23 +201,123 @@ AUTH_PASSWORD_VALIDATORS = [
         "NAME": "django.contrib.auth.password_validation.MinimumLengthValidator",
     },
     {
-        "NAME": "django.contrib.auth.password_validation.CommonPasswordValidator",
+        "NAME": "apps.users.validators.BreachedPasswordValidator",
     },
     {
         "NAME": "django.contrib.auth.password_validation.NumericPasswordValidator",
     },
 ]
 
+# Catalog listing responses are cached until the next product write, see apps/catalog/cache.py.
+
+CATALOG_CACHE_TIMEOUT = 600
+
+# Product search, see apps/search. Autocomplete answers from a per-worker trie of the
+# AUTOCOMPLETE_MAX_NAMES newest products that picks up index changes within AUTOCOMPLETE_REFRESH_SECONDS.
+
+SEARCH_PAGE_SIZE = 20
+SEARCH_MAX_PAGE_SIZE = 100
+SEARCH_MAX_OFFSET = 1000
+SEARCH_INDEX_BATCH_SIZE = 1000
+AUTOCOMPLETE_LIMIT = 10
+AUTOCOMPLETE_MAX_PREFIX = 12
+AUTOCOMPLETE_REFRESH_SECONDS = 60
+AUTOCOMPLETE_BUILD_BATCH_SIZE = 5000
+AUTOCOMPLETE_MAX_NAMES = 100_000
+
+# Checkout reserves stock for ORDER_RESERVATION_TTL; `manage.py release_expired_reservations`
+# gives back the stock of orders not paid by then, see apps/orders/inventory.py.
+
+ORDER_RESERVATION_TTL = timedelta(minutes=15)
+RESERVATION_SWEEP_BATCH_SIZE = 500
+
+# Bloom filter of breached passwords, built with `manage.py build_breach_filter`.
+
+BREACH_FILTER_PATH = os.environ.get('BREACH_FILTER_PATH', BASE_DIR / 'var' / 'breached-passwords.bloom')
+BREACH_FILTER_ERROR_RATE = 0.001
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'apps.users.authentication.ClaimsJWTAuthentication',
     ),
+    # Login-code limits, see apps/users/throttling.py
+    'DEFAULT_THROTTLE_RATES': {
+        'request_code_ip': '60/hour',
+        'request_code_email': '10/hour',
+        'verify_code_ip': '120/hour',
+        'verify_code_email': '20/hour',
+    },
 }
 
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=5),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
+    'TOKEN_USER_CLASS': 'apps.users.authentication.ClaimsTokenUser',
+    'AUTH_TOKEN_CLASSES': ('apps.users.tokens.UserAccessToken',),
 }
+
+# Token signing, see apps/users/keys.py. HS256 signs with SECRET_KEY; EdDSA and
+# RS256 sign with the keys in JWT_KEYS_DIR, published at /.well-known/jwks.json
+# and cached by clients for JWKS_MAX_AGE seconds.
+
+JWT_ALGORITHM = os.environ.get('JWT_ALGORITHM', 'HS256')
+JWT_KEYS_DIR = os.environ.get('JWT_KEYS_DIR', BASE_DIR / 'var' / 'jwt-keys')
+JWT_KEYS_RELOAD_SECONDS = 60
+JWKS_MAX_AGE = 6 * 60 * 60
+
+# How long a user's token version may be served from the cache before it is re-read
+TOKEN_VERSION_CACHE_TIMEOUT = 300
+
+# Refresh-token revocation index, see apps/users/revocation.py
+REVOCATION_BUCKET_SECONDS = 3600
+REVOCATION_BUCKET_CAPACITY = 100_000
+REVOCATION_ERROR_RATE = 0.001
+REVOCATION_SYNC_INTERVAL = 30
+
+# One-time login codes
+
+OTP_CODE_LENGTH = 8
+OTP_CODE_LIFETIME = timedelta(minutes=2)
+OTP_MAX_ATTEMPTS = 5
+
+# Accounts that never completed sign-up and whose last login code is older than this
+# are deleted by purge_stale_signups.
+
+STALE_SIGNUP_AGE = timedelta(days=7)
+STALE_SIGNUP_BATCH_SIZE = 500
+
+# Account exports, see apps/users/export.py. They read from EXPORT_DATABASE,
+# or the first replica if it is unset, EXPORT_WINDOW rows per query and
+# transaction, fetching EXPORT_CHUNK_SIZE rows at a time from the cursor.
+
+EXPORT_DATABASE = os.environ.get('EXPORT_DATABASE')
+EXPORT_WINDOW = 50_000
+EXPORT_CHUNK_SIZE = 2000
+
+# Request metrics, see online_shop/metrics.py
+# Set METRICS_MULTIPROC_DIR to a directory shared by all workers of one host to aggregate them.
+
+METRICS_MULTIPROC_DIR = os.environ.get('METRICS_MULTIPROC_DIR')
+METRICS_FLUSH_INTERVAL = 5
+METRICS_ALLOWED_IPS = os.environ.get('METRICS_ALLOWED_IPS', '127.0.0.1,::1').split(',')
+
+# Request profiling, see online_shop/profiling.py. Requests under PROFILE_URL_PREFIXES
+# are profiled when they carry a PROFILE_HEADER from `manage.py profile_report --token`,
+# or at random with probability PROFILE_SAMPLE_RATE. PROFILE_DIR keeps at most PROFILE_MAX_BYTES.
+
+PROFILE_URL_PREFIXES = ['/api/users/']
+PROFILE_HEADER = 'X-Profile'
+PROFILE_TOKEN_MAX_AGE = 60 * 60
+PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', '0'))
+PROFILE_DIR = os.environ.get('PROFILE_DIR', BASE_DIR / 'var' / 'profiles')
+PROFILE_MAX_BYTES = int(os.environ.get('PROFILE_MAX_BYTES', 256 * 1024 * 1024))
+
+# OpenAPI schema, see online_shop/schema.py
+# Set CODE_VERSION to the deployed commit; otherwise the schema is keyed by a digest of the sources.
+
+CODE_VERSION = os.environ.get('CODE_VERSION', '')
+SCHEMA_CACHE_DIR = os.environ.get('SCHEMA_CACHE_DIR', BASE_DIR / 'var' / 'schema')
+
 # Internationalization
 # https://docs.djangoproject.com/en/5.1/topics/i18n/
 
@@ -152,3 +347,13 @@ EMAIL_USE_TLS = True
 EMAIL_USE_SSL = False
 EMAIL_HOST_USER = os.environ.get('EMAIL_HOST_USER')
 EMAIL_HOST_PASSWORD = os.environ.get('EMAIL_HOST_PASSWORD')
+
+# Outbound mail queue, drained by `manage.py send_queued_mail`
+
+OUTBOX_BATCH_SIZE = 50
+OUTBOX_MAX_ATTEMPTS = 5
+OUTBOX_RETRY_DELAY = timedelta(seconds=30)
+# How long a worker may take to send the batch it claimed before other workers retry it
+OUTBOX_CLAIM_TIMEOUT = timedelta(minutes=5)
+# How long sent messages are kept, with their body already blanked
+OUTBOX_SENT_RETENTION = timedelta(days=1)
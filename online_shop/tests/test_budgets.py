@@ -0,0 +1,59 @@
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from apps.users import async_views, views
+from online_shop.budgets import QueryBudgetExceeded, assert_query_budget, is_query
+from online_shop.metrics import install_query_timer
+
+BUDGET_MIDDLEWARE = [
+    'online_shop.middleware.MetricsMiddleware',
+    'online_shop.middleware.QueryBudgetMiddleware',
+]
+
+
+@override_settings(MIDDLEWARE=BUDGET_MIDDLEWARE)
+class QueryBudgetMiddlewareTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        # The async client builds the middleware on the event loop thread, but the ORM
+        # runs on this one, whose connection was opened before any middleware existed.
+        install_query_timer()
+
+    def test_requests_within_budget_pass(self):
+        response = self.client.post(reverse('users:request-code'), {'email': 'testuser@example.com'})
+        self.assertEqual(response.status_code, 201)
+
+    def test_requests_over_budget_raise(self):
+        with patch.object(views.RequestCodeView, 'query_budget', 1):
+            with self.assertRaisesMessage(QueryBudgetExceeded, 'users:request-code ran 3 queries'):
+                self.client.post(reverse('users:request-code'), {'email': 'testuser@example.com'})
+
+    async def test_async_views(self):
+        with patch.object(async_views.RequestCodeView, 'query_budget', 1):
+            with self.assertRaises(QueryBudgetExceeded):
+                await self.async_client.post(
+                    reverse('users-async:request-code'), {'email': 'testuser@example.com'},
+                    content_type='application/json',
+                )
+
+
+@override_settings(MIDDLEWARE=BUDGET_MIDDLEWARE)
+class QueryBudgetOutsideTestCaseTests(TransactionTestCase):
+    """Outside TestCase atomic blocks open real transactions; those statements are not queries"""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_middleware_counts_what_the_tests_count(self):
+        with assert_query_budget(views.RequestCodeView):
+            response = self.client.post(reverse('users:request-code'), {'email': 'testuser@example.com'})
+        self.assertEqual(response.status_code, 201)
+
+    def test_transaction_control_is_not_a_query(self):
+        for sql in ('BEGIN', 'COMMIT', 'ROLLBACK', 'SAVEPOINT "s1_x1"', 'RELEASE SAVEPOINT "s1_x1"',
+                    'ROLLBACK TO SAVEPOINT "s1_x1"'):
+            self.assertFalse(is_query(sql), sql)
+        self.assertTrue(is_query('SELECT 1'))
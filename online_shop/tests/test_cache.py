@@ -0,0 +1,130 @@
+import threading
+import time
+
+from django.core.cache import caches
+from django.test import SimpleTestCase, override_settings
+
+from online_shop.cache import TwoTierCache
+from online_shop.metrics import registry
+
+
+@override_settings(CACHES={
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'test-default'},
+    'shared': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'test-shared'},
+})
+class TwoTierCacheTests(SimpleTestCase):
+    workers = 0
+
+    def setUp(self):
+        caches['shared'].clear()
+
+    def worker(self, **options):
+        """Returns a cache with its own near tier, as another worker process would have"""
+        TwoTierCacheTests.workers += 1
+        return TwoTierCache(f'test-worker-{self.workers}', {'OPTIONS': {
+            'SHARED': 'shared', 'NAMESPACES': ['catalog'], 'GENERATION_TIMEOUT': 0, **options,
+        }})
+
+    def counts(self, cache):
+        return cache.stats()['counts']
+
+    def test_namespaced_keys_are_served_from_the_near_tier(self):
+        cache = self.worker()
+        cache.set('catalog:page', {'items': [1, 2]})
+
+        value = cache.get('catalog:page')
+        value['items'].append(3)
+
+        self.assertEqual(cache.get('catalog:page'), {'items': [1, 2]})
+        self.assertEqual(self.counts(cache), {('near', 'hit'): 2})
+
+    def test_other_keys_go_to_the_shared_cache(self):
+        one, other = self.worker(), self.worker()
+        one.set('pin', 1)
+        self.assertEqual(other.get('pin'), 1)
+        self.assertEqual(other.incr('pin'), 2)
+        self.assertEqual(one.get('pin'), 2)
+        self.assertEqual(one.get('missing', 'default'), 'default')
+        self.assertEqual(self.counts(one), {('shared', 'hit'): 1, ('shared', 'miss'): 1})
+
+    def test_invalidation_reaches_every_worker(self):
+        one, other = self.worker(), self.worker()
+        one.set('catalog:page', 'old')
+        self.assertEqual(other.get('catalog:page'), 'old')
+        self.assertEqual(other.get('catalog:page'), 'old')
+        self.assertEqual(self.counts(other), {('near', 'miss'): 1, ('shared', 'hit'): 1, ('near', 'hit'): 1})
+
+        one.invalidate('catalog')
+
+        self.assertIsNone(one.get('catalog:page'))
+        self.assertIsNone(other.get('catalog:page'))
+        other.set('catalog:page', 'new')
+        self.assertEqual(one.get('catalog:page'), 'new')
+
+    def test_workers_trust_a_generation_for_generation_timeout(self):
+        one, other = self.worker(), self.worker(GENERATION_TIMEOUT=60)
+        one.set('catalog:page', 'old')
+        other.get('catalog:page')
+
+        one.invalidate('catalog')
+
+        self.assertEqual(other.get('catalog:page'), 'old')
+        other.state.generations.clear()
+        self.assertIsNone(other.get('catalog:page'))
+
+    def test_near_tier_is_bounded_and_expires(self):
+        cache = self.worker(NEAR_MAX_ENTRIES=2, NEAR_TIMEOUT=0.05)
+        for key in ('catalog:a', 'catalog:b', 'catalog:c'):
+            cache.set(key, key)
+        self.assertEqual(cache.stats()['near_entries'], 2)
+
+        self.assertEqual(cache.get('catalog:a'), 'catalog:a')
+        self.assertEqual(self.counts(cache), {('near', 'miss'): 1, ('shared', 'hit'): 1})
+
+        time.sleep(0.06)
+        self.assertEqual(cache.get('catalog:b'), 'catalog:b')
+        self.assertEqual(self.counts(cache)['near', 'miss'], 2)
+
+    def test_concurrent_misses_render_once(self):
+        cache = self.worker()
+        calls = []
+        started = threading.Barrier(5)
+
+        def render():
+            calls.append(1)
+            time.sleep(0.05)
+            return 'page'
+
+        def request(results):
+            started.wait()
+            results.append(cache.get_or_set('catalog:page', render))
+
+        results = []
+        threads = [threading.Thread(target=request, args=(results,)) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results, ['page'] * 5)
+        self.assertEqual(len(calls), 1)
+        self.assertGreaterEqual(self.counts(cache)['shared', 'coalesced'], 1)
+
+    def test_get_or_set_does_not_store_none(self):
+        cache = self.worker()
+        self.assertIsNone(cache.get_or_set('catalog:page', lambda: None))
+        self.assertFalse(cache.has_key('catalog:page'))
+        self.assertEqual(cache.get_or_set('catalog:page', 'page'), 'page')
+
+    def test_many(self):
+        cache = self.worker()
+        self.assertEqual(cache.set_many({'catalog:a': 1, 'b': 2}), [])
+        self.assertEqual(cache.get_many(['catalog:a', 'b', 'c']), {'catalog:a': 1, 'b': 2})
+        cache.delete_many(['catalog:a', 'b'])
+        self.assertEqual(cache.get_many(['catalog:a', 'b']), {})
+
+    def test_stats_are_exported(self):
+        cache = self.worker()
+        cache.get('catalog:page')
+
+        self.assertIn(f'cache_requests_total{{cache="{cache.name}",tier="near",result="miss"}} 1', registry.render())
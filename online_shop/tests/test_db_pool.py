@@ -0,0 +1,115 @@
+import os
+import tempfile
+import threading
+import uuid
+
+from django.db import connections
+from django.test import SimpleTestCase
+
+from online_shop.db.backends.sqlite3.base import DatabaseWrapper
+from online_shop.db.pool import PoolTimeout
+
+
+class SQLitePoolTests(SimpleTestCase):
+    """Exercises the pool through the SQLite backend, on a file database so closing really closes"""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.name = os.path.join(directory.name, 'pool.sqlite3')
+        self.alias = f'pool-{uuid.uuid4().hex}'
+        self.pool_options = {'max_size': 2, 'timeout': 0.05, 'max_lifetime': 60}
+
+    def wrapper(self):
+        settings_dict = connections.configure_settings({'default': {}, self.alias: {
+            'ENGINE': 'online_shop.db.backends.sqlite3', 'NAME': self.name, 'POOL': self.pool_options,
+        }})[self.alias]
+        wrapper = DatabaseWrapper(settings_dict, self.alias)
+        self.addCleanup(wrapper.connection_pool.close)
+        if threading.current_thread() is threading.main_thread():
+            self.addCleanup(wrapper.close)
+        return wrapper
+
+    def test_connection_is_reused(self):
+        """Test that closing returns the connection to the pool for the next request"""
+        first = self.wrapper()
+        first.ensure_connection()
+        raw = first.connection
+        first.close()
+
+        second = self.wrapper()
+        second.ensure_connection()
+        self.assertIs(second.connection, raw)
+        self.assertEqual(second.connection_pool.size, 1)
+
+    def test_pool_is_bounded(self):
+        wrappers = [self.wrapper() for _ in range(3)]
+        wrappers[0].ensure_connection()
+        wrappers[1].ensure_connection()
+
+        with self.assertRaises(PoolTimeout):
+            wrappers[2].ensure_connection()
+
+        wrappers[0].close()
+        wrappers[2].ensure_connection()
+        self.assertEqual(wrappers[2].connection_pool.size, 2)
+
+    def test_broken_connection_is_replaced(self):
+        """Test that a connection failing the health check is not handed out"""
+        wrapper = self.wrapper()
+        wrapper.ensure_connection()
+        raw = wrapper.connection
+        wrapper.close()
+        raw.close()
+
+        wrapper.ensure_connection()
+        self.assertIsNot(wrapper.connection, raw)
+        self.assertEqual(wrapper.connection_pool.size, 1)
+
+    def test_open_transaction_is_rolled_back(self):
+        wrapper = self.wrapper()
+        with wrapper.cursor() as cursor:
+            cursor.execute('CREATE TABLE item (id integer)')
+        wrapper.set_autocommit(False)
+        with wrapper.cursor() as cursor:
+            cursor.execute('INSERT INTO item VALUES (1)')
+        wrapper.close()
+
+        with wrapper.cursor() as cursor:
+            cursor.execute('SELECT count(*) FROM item')
+            self.assertEqual(cursor.fetchone(), (0,))
+
+    def test_connections_past_max_lifetime_are_replaced(self):
+        self.pool_options['max_lifetime'] = 0
+        wrapper = self.wrapper()
+        wrapper.ensure_connection()
+        raw = wrapper.connection
+        wrapper.close()
+
+        wrapper.ensure_connection()
+        self.assertIsNot(wrapper.connection, raw)
+
+    def test_threads_share_the_pool(self):
+        self.pool_options['timeout'] = 5
+        raw_connections = set()
+        errors = []
+
+        def work():
+            wrapper = self.wrapper()
+            try:
+                for _ in range(20):
+                    with wrapper.cursor() as cursor:
+                        cursor.execute('SELECT 1')
+                    raw_connections.add(id(wrapper.connection))
+                    wrapper.close()
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=work) for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertLessEqual(len(raw_connections), 2)
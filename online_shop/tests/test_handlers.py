@@ -0,0 +1,75 @@
+import asyncio
+
+from django.test import RequestFactory, SimpleTestCase
+
+from online_shop.handlers import RoutingASGIHandler, RoutingWSGIHandler
+
+
+class RoutingWSGIHandlerTests(SimpleTestCase):
+    def setUp(self):
+        self.application = RoutingWSGIHandler()
+
+    def get(self, path):
+        environ = RequestFactory().get(path).environ
+        status = []
+        response = self.application(environ, lambda s, headers: status.append((s, dict(headers))))
+        response.close()
+        return status[0]
+
+    def test_api_runs_lean_chain(self):
+        """Test that API routes skip the session, CSRF and clickjacking middleware"""
+        status, headers = self.get('/api/users/active-user/')
+
+        self.assertTrue(status.startswith('401'))
+        self.assertIn('Server-Timing', headers)
+        self.assertIn('X-Content-Type-Options', headers)
+        self.assertNotIn('X-Frame-Options', headers)
+        self.assertNotIn('Cookie', headers.get('Vary', ''))
+
+    def test_admin_runs_full_chain(self):
+        status, headers = self.get('/admin/login/')
+
+        self.assertTrue(status.startswith('200'))
+        self.assertIn('Server-Timing', headers)
+        self.assertEqual(headers['X-Frame-Options'], 'DENY')
+        self.assertIn('Cookie', headers['Vary'])
+
+    def test_chains_are_built_once(self):
+        self.assertIsNot(self.application.lean._middleware_chain, self.application.full._middleware_chain)
+        self.assertEqual(len(self.application.lean._view_middleware), 0)
+
+
+class RoutingASGIHandlerTests(SimpleTestCase):
+    async def get(self, path, root_path=''):
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+            'scheme': 'http', 'path': root_path + path, 'root_path': root_path, 'query_string': b'',
+            'headers': [(b'host', b'testserver')], 'client': ('127.0.0.1', 1234), 'server': ('testserver', 80),
+        }
+        messages = []
+        requests = [{'type': 'http.request', 'body': b'', 'more_body': False}]
+
+        async def receive():
+            if requests:
+                return requests.pop()
+            # The client stays connected until the response is sent.
+            await asyncio.Event().wait()
+
+        async def send(message):
+            messages.append(message)
+
+        await RoutingASGIHandler()(scope, receive, send)
+        start = messages[0]
+        return start['status'], {k.decode(): v.decode() for k, v in start['headers']}
+
+    async def test_api_runs_lean_chain(self):
+        status, headers = await self.get('/api/users/active-user/', root_path='/shop')
+
+        self.assertEqual(status, 401)
+        self.assertNotIn('X-Frame-Options', headers)
+
+    async def test_admin_runs_full_chain(self):
+        status, headers = await self.get('/admin/login/')
+
+        self.assertEqual(status, 200)
+        self.assertEqual(headers['X-Frame-Options'], 'DENY')
@@ -0,0 +1,96 @@
+import json
+import os
+import tempfile
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from online_shop.metrics import Registry, RequestTimings, server_timing, timed
+
+
+class ServerTimingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_header_reports_stages(self):
+        """Test that API responses carry database, stage and total timings"""
+        response = self.client.post(reverse('users:request-code'), {'email': 'testuser@example.com'})
+
+        header = response.headers['Server-Timing']
+        self.assertIn('db;dur=', header)
+        self.assertRegex(header, r'db;dur=[\d.]+;desc="\d+ queries"')
+        self.assertIn('hash;dur=', header)
+        self.assertIn('mail;dur=', header)
+        self.assertIn('total;dur=', header)
+
+    async def test_header_on_async_views(self):
+        """Test that queries made by async views are attributed to the request"""
+        response = await self.async_client.post(
+            reverse('users-async:request-code'), {'email': 'testuser@example.com'}, content_type='application/json',
+        )
+        self.assertRegex(response.headers['Server-Timing'], r'db;dur=[\d.]+;desc="[1-9]\d* queries"')
+
+    def test_timed_outside_a_request(self):
+        """Test that timers are a no-op outside a request"""
+        with timed('jwt'):
+            pass
+
+    def test_format(self):
+        timings = RequestTimings()
+        timings.queries = 2
+        timings.add('db', 0.0015)
+        self.assertEqual(server_timing(timings, 0.01), 'db;dur=1.50;desc="2 queries", total;dur=10.00')
+
+
+class MetricsEndpointTests(TestCase):
+    def test_histograms_are_exposed(self):
+        """Test that /metrics renders the per-endpoint histograms"""
+        self.client.post(reverse('users:request-code'), {'email': 'not-an-email'})
+        response = self.client.get(reverse('metrics'), REMOTE_ADDR='127.0.0.1')
+
+        self.assertEqual(response.status_code, 200)
+        body = response.content.decode()
+        self.assertIn('# TYPE http_request_duration_seconds histogram', body)
+        self.assertIn('http_request_duration_seconds_count{endpoint="users:request-code",method="POST"}', body)
+        self.assertIn('http_request_db_queries_bucket{endpoint="users:request-code",le="0"}', body)
+
+    def test_other_addresses_are_rejected(self):
+        response = self.client.get(reverse('metrics'), REMOTE_ADDR='10.1.2.3')
+        self.assertEqual(response.status_code, 403)
+
+
+class MultiprocessTests(TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+
+    def test_snapshots_of_all_workers_are_merged(self):
+        """Test that /metrics adds up what every worker flushed"""
+        timings = RequestTimings()
+        timings.queries = 1
+        with override_settings(METRICS_MULTIPROC_DIR=self.tmpdir.name):
+            worker = Registry()
+            worker.record('users:verify-code', 'POST', 0.02, timings)
+            worker.flush(self.tmpdir.name)
+            os.rename(
+                os.path.join(self.tmpdir.name, f'metrics-{os.getpid()}.json'),
+                os.path.join(self.tmpdir.name, 'metrics-1.json'),
+            )
+
+            local = Registry()
+            local.record('users:verify-code', 'POST', 0.2, timings)
+            body = local.render()
+
+        self.assertIn('http_request_duration_seconds_count{endpoint="users:verify-code",method="POST"} 2', body)
+        self.assertIn('http_request_duration_seconds_bucket{endpoint="users:verify-code",method="POST",le="0.025"} 1', body)
+
+    def test_flush_is_rate_limited(self):
+        with override_settings(METRICS_MULTIPROC_DIR=self.tmpdir.name, METRICS_FLUSH_INTERVAL=60):
+            worker = Registry()
+            worker.record('users:sign-up', 'POST', 0.01, RequestTimings())
+            worker.record('users:sign-up', 'POST', 0.01, RequestTimings())
+
+        with open(os.path.join(self.tmpdir.name, f'metrics-{os.getpid()}.json')) as f:
+            snapshot = json.load(f)
+        self.assertEqual(snapshot['http_request_duration_seconds']['["users:sign-up", "POST"]'][-1], 0.01)
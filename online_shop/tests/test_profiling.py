@@ -0,0 +1,96 @@
+import io
+import os
+import pstats
+import shutil
+import tempfile
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from online_shop.profiling import endpoint_of, enforce_budget, profile_token, profiles
+
+
+class ProfilingMiddlewareTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        settings = override_settings(PROFILE_DIR=self.directory, PROFILE_SAMPLE_RATE=0)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def request_code(self, **headers):
+        return self.client.post(reverse('users:request-code'), {'email': 'testuser@example.com'}, headers=headers)
+
+    def test_signed_header_profiles_the_request(self):
+        response = self.request_code(**{'X-Profile': profile_token()})
+
+        self.assertEqual(response.status_code, 201)
+        [path] = profiles(self.directory)
+        self.assertEqual(response['X-Profile'], path.name)
+        self.assertEqual(endpoint_of(path), 'users:request-code')
+
+    def test_unsigned_header_is_ignored(self):
+        response = self.request_code(**{'X-Profile': 'profile'})
+
+        self.assertNotIn('X-Profile', response)
+        self.assertEqual(profiles(self.directory), [])
+
+    @override_settings(PROFILE_SAMPLE_RATE=1)
+    def test_sampling_covers_only_the_users_endpoints(self):
+        self.request_code()
+        self.client.get(reverse('metrics'), REMOTE_ADDR='127.0.0.1')
+
+        self.assertEqual([endpoint_of(path) for path in profiles(self.directory)], ['users:request-code'])
+
+    async def test_async_views(self):
+        response = await self.async_client.post(
+            reverse('users-async:request-code'), {'email': 'testuser@example.com'},
+            content_type='application/json', headers={'X-Profile': profile_token()},
+        )
+        self.assertEqual(endpoint_of(response['X-Profile']), 'users-async:request-code')
+
+    async def test_sync_views_under_asgi(self):
+        """Test that the profile covers a sync view, which runs in sync_to_async's thread"""
+        response = await self.async_client.post(
+            reverse('users:request-code'), {'email': 'testuser@example.com'},
+            content_type='application/json', headers={'X-Profile': profile_token()},
+        )
+
+        self.assertEqual(response.status_code, 201)
+        stats = pstats.Stats(os.path.join(self.directory, response['X-Profile']))
+        self.assertTrue(any(
+            name == 'post' and filename.endswith(os.path.join('apps', 'users', 'views.py'))
+            for filename, line, name in stats.stats
+        ))
+
+    def test_oldest_profiles_are_deleted_over_budget(self):
+        for name in ('100-1-users.logout.prof', '200-1-users.logout.prof', '300-1-users.logout.prof'):
+            with open(os.path.join(self.directory, name), 'wb') as f:
+                f.write(b'x' * 100)
+
+        enforce_budget(self.directory, 250)
+
+        self.assertEqual([path.name for path in profiles(self.directory)],
+                         ['200-1-users.logout.prof', '300-1-users.logout.prof'])
+
+    @override_settings(PROFILE_SAMPLE_RATE=1)
+    def test_report_aggregates_per_endpoint(self):
+        self.request_code()
+        self.request_code()
+        self.client.post(reverse('users:verify-code'), {'email': 'testuser@example.com', 'code': '00000000'})
+
+        out = io.StringIO()
+        call_command('profile_report', '--sort', 'cumtime', stdout=out)
+        report = out.getvalue()
+
+        self.assertIn('users:request-code: 2 requests', report)
+        self.assertIn('users:verify-code: 1 requests', report)
+        self.assertIn('apps/users/views.py', report)
+
+        out = io.StringIO()
+        call_command('profile_report', '--endpoint', 'users:verify-code', '--limit', '3', stdout=out)
+        self.assertNotIn('users:request-code', out.getvalue())
+        self.assertEqual(len(out.getvalue().strip().splitlines()), 5)
@@ -0,0 +1,128 @@
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.db import connections, router
+from django.test import TransactionTestCase, override_settings
+from django.urls import reverse
+
+from apps.users.models import User
+from apps.users.revocation import revocation_index, revoke_family
+from apps.users.tokens import UserRefreshToken, get_token_version, revoke_tokens
+from online_shop.db import routers
+
+CODE = '12345678'
+
+
+# A second SQLite database standing in for a replica. It is registered when the
+# test runner imports this module, so the runner creates and migrates it too.
+connections.settings.setdefault('replica', connections.configure_settings({'default': {}, 'replica': {
+    'ENGINE': 'django.db.backends.sqlite3', 'NAME': ':memory:',
+}})['replica'])
+
+
+@override_settings(REPLICA_DATABASES=['replica'])
+class PrimaryReplicaRouterTests(TransactionTestCase):
+    """
+    Runs against two SQLite databases. The replica never receives the
+    primary's writes, so every read that goes to it is visibly stale.
+    """
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        cache.clear()
+        _, token = routers.start_request()
+        self.addCleanup(routers.end_request, token)
+        User.objects.using('default').create(email='primary@example.com', username='primary@example.com')
+
+    def copy_to_replica(self, user):
+        """Copies the user to the replica, which the test runner does not flush since it is never migrated"""
+        User.objects.using('replica').create(pk=user.pk, email=user.email, username=user.email)
+        self.addCleanup(User.objects.using('replica').filter(pk=user.pk).delete)
+
+    def test_reads_go_to_replica(self):
+        self.assertFalse(User.objects.filter(email='primary@example.com').exists())
+        self.assertTrue(User.objects.using('default').filter(email='primary@example.com').exists())
+
+    def test_write_pins_request(self):
+        """Test that a request reads its own writes"""
+        User.objects.create(email='new@example.com', username='new@example.com')
+        self.assertTrue(User.objects.filter(email='primary@example.com').exists())
+
+    def test_pin_is_followed_by_later_requests(self):
+        routers.pin_primary('primary@example.com')
+
+        routers.start_request()
+        routers.follow_pin('other@example.com')
+        self.assertFalse(User.objects.filter(email='primary@example.com').exists())
+
+        routers.start_request()
+        routers.follow_pin('primary@example.com')
+        self.assertTrue(User.objects.filter(email='primary@example.com').exists())
+
+    def test_token_version_is_read_from_primary(self):
+        """Test that a revocation is not undone by a replica that has not seen it yet"""
+        user = User.objects.using('default').get(email='primary@example.com')
+        self.copy_to_replica(user)
+
+        revoke_tokens(user.pk)
+        self.assertEqual(get_token_version(user.pk), 1)
+        cache.clear()
+        self.assertEqual(get_token_version(user.pk), 1)
+
+    def test_refresh_reads_from_primary(self):
+        """Test that a refresh is refused once the primary has deactivated the user or revoked the token"""
+        user = User.objects.using('default').get(email='primary@example.com')
+        self.copy_to_replica(user)
+        url = reverse('users:token-refresh')
+
+        refresh = UserRefreshToken.for_user(user)
+        revocation_index.reset()
+        revoke_family(refresh)
+        revocation_index.reset()
+        response = self.client.post(url, {'refresh': str(refresh)}, content_type='application/json')
+        self.assertEqual(response.status_code, 401)
+
+        refresh = UserRefreshToken.for_user(user)
+        User.objects.using('default').filter(pk=user.pk).update(is_active=False)
+        response = self.client.post(url, {'refresh': str(refresh)}, content_type='application/json')
+        self.assertEqual(response.status_code, 401)
+
+    def test_replicas_are_not_migrated(self):
+        self.assertFalse(router.allow_migrate('replica', 'users'))
+        self.assertTrue(router.allow_migrate('default', 'users'))
+
+    def request_code(self, email):
+        with patch('apps.users.otp.generate_code', return_value=CODE):
+            response = self.client.post(reverse('users:request-code'), {'email': email})
+        self.assertEqual(response.status_code, 201)
+        return response
+
+    def verify_code(self, email):
+        return self.client.post(reverse('users:verify-code'), {'email': email, 'code': CODE})
+
+    def test_verify_code_reads_from_primary_after_request_code(self):
+        """Test that verify-code never reads the user or code from a stale replica"""
+        self.request_code('login@example.com')
+        self.client.cookies.clear()
+
+        response = self.verify_code('login@example.com')
+
+        self.assertEqual(response.status_code, 200)
+
+    def test_verify_code_without_pin_reads_replica(self):
+        self.request_code('login@example.com')
+        self.client.cookies.clear()
+        cache.clear()
+
+        response = self.verify_code('login@example.com')
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_cookie_pins_client(self):
+        response = self.request_code('login@example.com')
+        self.assertIn(routers.PIN_COOKIE, response.cookies)
+        cache.clear()
+
+        response = self.verify_code('login@example.com')
+
+        self.assertEqual(response.status_code, 200)
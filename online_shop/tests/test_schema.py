@@ -0,0 +1,86 @@
+import json
+import tempfile
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from online_shop.schema import SchemaView, schema_cache
+
+
+class SchemaViewTests(TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.cache_dir.cleanup)
+        settings = override_settings(SCHEMA_CACHE_DIR=self.cache_dir.name, CODE_VERSION='v1')
+        settings.enable()
+        self.addCleanup(settings.disable)
+        schema_cache.reset()
+        self.addCleanup(schema_cache.reset)
+
+    def test_schema_is_generated_once(self):
+        """Test that the schema is introspected on the first hit only"""
+        with patch.object(schema_cache, 'build', wraps=schema_cache.build) as build:
+            first = self.client.get('/swagger.json')
+            second = self.client.get('/swagger.json')
+
+        self.assertEqual(build.call_count, 1)
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first.content, second.content)
+        schema = json.loads(first.content)
+        self.assertTrue(any(path.endswith('/request-code/') for path in schema['paths']))
+
+    def test_not_modified(self):
+        """Test that a matching ETag or Last-Modified is answered with a 304"""
+        response = self.client.get('/swagger.json')
+        self.assertIn('ETag', response.headers)
+        self.assertIn('Last-Modified', response.headers)
+
+        by_etag = self.client.get('/swagger.json', headers={'If-None-Match': response.headers['ETag']})
+        self.assertEqual(by_etag.status_code, 304)
+        self.assertEqual(by_etag.content, b'')
+
+        by_date = self.client.get('/swagger.json', headers={'If-Modified-Since': response.headers['Last-Modified']})
+        self.assertEqual(by_date.status_code, 304)
+
+    def test_formats_have_their_own_etag(self):
+        json_response = self.client.get('/swagger.json')
+        yaml_response = self.client.get('/swagger.yaml')
+
+        self.assertEqual(yaml_response.status_code, 200)
+        self.assertTrue(yaml_response.content.startswith(b'swagger:'))
+        self.assertNotEqual(json_response.headers['ETag'], yaml_response.headers['ETag'])
+
+    def test_ui_fetches_cached_schema(self):
+        """Test that the UI pages never run the generator; only the schema they fetch is generated"""
+        with patch.object(SchemaView.generator_class, 'get_schema', side_effect=AssertionError) as get_schema:
+            self.assertEqual(self.client.get(reverse('schema-swagger-ui')).status_code, 200)
+            self.assertEqual(self.client.get(reverse('schema-redoc')).status_code, 200)
+        get_schema.assert_not_called()
+
+        response = self.client.get(reverse('schema-swagger-ui'), {'format': 'openapi'})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('ETag', response.headers)
+
+    def test_build_command_is_used_by_workers(self):
+        """Test that a schema built at deploy time is loaded instead of regenerated"""
+        call_command('build_schema', stdout=StringIO())
+        schema_cache.reset()
+
+        with patch.object(schema_cache, 'build') as build:
+            response = self.client.get('/swagger.json')
+
+        build.assert_not_called()
+        self.assertEqual(response.status_code, 200)
+
+    def test_new_code_version_invalidates(self):
+        call_command('build_schema', stdout=StringIO())
+        schema_cache.reset()
+
+        with override_settings(CODE_VERSION='v2'), \
+                patch.object(schema_cache, 'build', wraps=schema_cache.build) as build:
+            self.client.get('/swagger.json')
+
+        build.assert_called_once()
@@ -17,31 +17,22 @@ Including another URLconf
 
 from django.contrib import admin
 from django.urls import path, include, re_path
-from rest_framework import permissions
-from drf_yasg.views import get_schema_view
-from drf_yasg import openapi
-from rest_framework import permissions
 
 from apps import users
+from . import views
+from .schema import SchemaView as schema_view
 
-
-schema_view = get_schema_view(
-    openapi.Info(
-        title="Online Shop API",
-        default_version='v1',
-        description="Online Shop API",
-        terms_of_service="https://www.google.com/policies/terms/",
-        contact=openapi.Contact(email="r.amirh.bd@gmail.com"),
-        license=openapi.License(name="BSD License"),
-    ),
-    public=True,
-    permission_classes=[permissions.AllowAny],
-)
 urlpatterns = [
     path("admin/", admin.site.urls),
+    path("metrics", views.metrics, name='metrics'),
+    path(".well-known/jwks.json", views.jwks, name='jwks'),
+    path("api/users/async/", include("apps.users.async_urls", namespace="users-async")),
     path("api/users/", include("apps.users.urls", namespace="users")),
+    path("api/catalog/", include("apps.catalog.urls", namespace="catalog")),
+    path("api/search/", include("apps.search.urls", namespace="search")),
+    path("api/orders/", include("apps.orders.urls", namespace="orders")),
 
-    re_path(r'^swagger(?P<format>\.json|\.yaml)$', schema_view.without_ui(cache_timeout=0), name='schema-json'),
-    path("swagger/", schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
-    path("redoc/", schema_view.with_ui('redoc', cache_timeout=0), name='schema-redoc'),
+    re_path(r'^swagger(?P<format>\.json|\.yaml)$', schema_view.without_ui(), name='schema-json'),
+    path("swagger/", schema_view.with_ui('swagger'), name='schema-swagger-ui'),
+    path("redoc/", schema_view.with_ui('redoc'), name='schema-redoc'),
 ]
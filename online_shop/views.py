@@ -0,0 +1,27 @@
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.views.decorators.http import require_safe
+
+from apps.users.keys import key_set
+
+from .metrics import registry
+
+
+def metrics(request):
+    """Exposes the request histograms in the Prometheus text format"""
+    if request.META.get('REMOTE_ADDR') not in settings.METRICS_ALLOWED_IPS:
+        return HttpResponseForbidden()
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+@require_safe
+def jwks(request):
+    """Publishes the public keys that verify our JWTs, as kept in memory by apps/users/keys.py"""
+    body, etag = key_set()
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = HttpResponse(body, content_type='application/jwk-set+json')
+    response.headers['ETag'] = etag
+    patch_cache_control(response, public=True, max_age=settings.JWKS_MAX_AGE)
+    return response
@@ -2,6 +2,7 @@
 WSGI config for online_shop project.
 
 It exposes the WSGI callable as a module-level variable named ``application``.
+Requests under API_URL_PREFIXES run through API_MIDDLEWARE, see handlers.py.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.1/howto/deployment/wsgi/
@@ -9,7 +10,7 @@ https://docs.djangoproject.com/en/5.1/howto/deployment/wsgi/
 
 import os
 
-from django.core.wsgi import get_wsgi_application
+from online_shop.handlers import get_wsgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "online_shop.settings")
 